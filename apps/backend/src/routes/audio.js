@@ -44,13 +44,20 @@ router.post('/upload', upload.single('audio'), async (req, res) => {
         // Call Python ML service for analysis
         let analysis;
         try {
+            // Interactive upload: the ML service cancels the analysis if we
+            // give up first (timeout) or the deadline passes. Re-encoded or
+            // trimmed copies of an analyzed song reuse its stored analysis
             const mlResponse = await fetch('http://localhost:8000/analyze', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     file_path: req.file.path,
-                    file_id: fileId
-                })
+                    file_id: fileId,
+                    priority: 'interactive',
+                    deadline_ms: 120000,
+                    reuse_duplicates: true
+                }),
+                signal: AbortSignal.timeout(120000)
             });
 
             if (mlResponse.ok) {
@@ -93,11 +100,16 @@ router.get('/analysis/:fileId', (req, res) => {
     res.json(analysis);
 });
 
-// Get chord progression for learning mode
+// Get chord progression for learning mode (optionally ?start=&end= seconds for one window)
 router.get('/chords/:fileId', async (req, res) => {
     try {
-        // Try to get from ML service
-        const mlResponse = await fetch(`http://localhost:8000/chords/${req.params.fileId}`);
+        // Try to get from ML service, forwarding the time window if given
+        const window = new URLSearchParams();
+        if (req.query.start !== undefined) window.set('start', req.query.start);
+        if (req.query.end !== undefined) window.set('end', req.query.end);
+        const query = window.toString() ? `?${window}` : '';
+
+        const mlResponse = await fetch(`http://localhost:8000/chords/${req.params.fileId}${query}`);
         if (mlResponse.ok) {
             const chords = await mlResponse.json();
             return res.json(chords);
@@ -109,6 +121,81 @@ router.get('/chords/:fileId', async (req, res) => {
     res.json(generateMockChords());
 });
 
+// Grade a batch of practice recordings: multipart "attempts" files plus a
+// "targets" JSON array with one target chord per file, in the same order
+router.post('/practice/grade', upload.array('attempts', 1000), async (req, res) => {
+    try {
+        if (!req.files || req.files.length === 0) {
+            return res.status(400).json({ error: 'No attempts provided' });
+        }
+
+        let targets;
+        try {
+            targets = JSON.parse(req.body.targets || '[]');
+        } catch (e) {
+            return res.status(400).json({ error: 'targets must be a JSON array' });
+        }
+        if (!Array.isArray(targets) || targets.length !== req.files.length) {
+            return res.status(400).json({ error: 'One target chord is required per attempt' });
+        }
+
+        const mlResponse = await fetch('http://localhost:8000/practice/grade', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                attempts: req.files.map((file, i) => ({
+                    attempt_id: file.originalname,
+                    file_path: file.path,
+                    target_chord: targets[i]
+                })),
+                priority: 'interactive'
+            }),
+            signal: AbortSignal.timeout(60000)
+        });
+
+        const grades = await mlResponse.json();
+        res.status(mlResponse.status).json(grades);
+    } catch (error) {
+        console.error('Practice grading error:', error);
+        res.status(503).json({ error: 'Grading service unavailable' });
+    }
+});
+
+// Analyze the stems of one song for the Production mixer: multipart "stems"
+// files named after their mixer channel (vocals.wav, drums.wav, ...) and an
+// optional "mix" file to track beats on
+router.post('/stems', upload.fields([{ name: 'stems', maxCount: 16 }, { name: 'mix', maxCount: 1 }]), async (req, res) => {
+    try {
+        const stems = (req.files && req.files.stems) || [];
+        if (stems.length === 0) {
+            return res.status(400).json({ error: 'No stems provided' });
+        }
+
+        const mix = req.files.mix ? req.files.mix[0] : null;
+        const mlResponse = await fetch('http://localhost:8000/analyze/stems', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                song_id: uuidv4(),
+                stems: stems.map((file) => ({
+                    name: path.basename(file.originalname, path.extname(file.originalname)),
+                    file_path: file.path
+                })),
+                mix_path: mix ? mix.path : null,
+                priority: 'interactive',
+                deadline_ms: 120000
+            }),
+            signal: AbortSignal.timeout(120000)
+        });
+
+        const analysis = await mlResponse.json();
+        res.status(mlResponse.status).json(analysis);
+    } catch (error) {
+        console.error('Stem analysis error:', error);
+        res.status(503).json({ error: 'Stem analysis service unavailable' });
+    }
+});
+
 // Mock analysis generator (used when ML service is unavailable)
 function generateMockAnalysis(filename) {
     const scales = ['C Major', 'G Major', 'D Major', 'A Minor', 'E Minor', 'F Major'];
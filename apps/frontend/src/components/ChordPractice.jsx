@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback, useRef } from "react";
 import { useChordDetection } from "../hooks/useChordDetection";
 import { CHORD_LIBRARY, getChordsByDifficulty } from "../data/chordLibrary";
+import { samePitchClass } from "../utils/notes";
 
 export default function ChordPractice({
     targetChord = null,
@@ -174,7 +175,7 @@ export default function ChordPractice({
                                         {targetChordData.notes.map(note => (
                                             <span
                                                 key={note}
-                                                className={`px-2.5 py-1 rounded-lg text-xs font-medium transition-all ${activeNotes.some(n => n.replace(/[0-9]/g, '').toUpperCase() === note)
+                                                className={`px-2.5 py-1 rounded-lg text-xs font-medium transition-all ${activeNotes.some(n => samePitchClass(n, note))
                                                     ? 'bg-emerald-500/20 text-emerald-300 ring-1 ring-emerald-500/25 shadow-lg shadow-emerald-500/20'
                                                     : 'bg-white/[0.04] text-white/40 border border-white/[0.06]'
                                                     }`}
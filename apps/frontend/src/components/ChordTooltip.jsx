@@ -1,5 +1,6 @@
 import { useState } from "react";
 import { CHORD_LIBRARY } from "../data/chordLibrary";
+import { pitchClass, pitchClasses } from "../utils/notes";
 
 const NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'];
 const STRINGS = ['E', 'B', 'G', 'D', 'A', 'E'];
@@ -134,17 +135,9 @@ function PianoMiniDiagram({ notes }) {
     const WHITE_KEYS = ['C', 'D', 'E', 'F', 'G', 'A', 'B'];
     const BLACK_KEYS = { 'C#': 0, 'D#': 1, 'F#': 3, 'G#': 4, 'A#': 5 };
 
-    const normalizedNotes = notes.map(n => n.replace(/[0-9]/g, '').toUpperCase());
+    const chordPitches = pitchClasses(notes);
 
-    const isHighlighted = (note) => {
-        const equivalents = {
-            'C#': ['Db'], 'D#': ['Eb'], 'F#': ['Gb'], 'G#': ['Ab'], 'A#': ['Bb'],
-            'Db': ['C#'], 'Eb': ['D#'], 'Gb': ['F#'], 'Ab': ['G#'], 'Bb': ['A#']
-        };
-        if (normalizedNotes.includes(note)) return true;
-        if (equivalents[note]?.some(eq => normalizedNotes.includes(eq))) return true;
-        return false;
-    };
+    const isHighlighted = (note) => chordPitches.has(pitchClass(note));
 
     return (
         <div className="flex justify-center">
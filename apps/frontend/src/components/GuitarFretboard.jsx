@@ -1,5 +1,6 @@
 import { useState } from "react";
 import { CHORD_LIBRARY } from "../data/chordLibrary";
+import { samePitchClass } from "../utils/notes";
 
 const STRINGS = ['E', 'B', 'G', 'D', 'A', 'E']; // High to low
 const FRETS = 15;
@@ -54,10 +55,7 @@ export default function GuitarFretboard({
 
     function isHighlighted(note) {
         if (!note) return false;
-        const normalized = note.replace(/[0-9]/g, '').toUpperCase();
-        return highlightedNotes.some(n =>
-            n.replace(/[0-9]/g, '').toUpperCase() === normalized
-        );
+        return highlightedNotes.some(n => samePitchClass(n, note));
     }
 
     function isChordPosition(stringIdx, fret) {
@@ -1,14 +1,9 @@
 import { useState } from "react";
+import { pitchClass, pitchClasses } from "../utils/notes";
 
 const WHITE_KEYS = ['C', 'D', 'E', 'F', 'G', 'A', 'B'];
 const BLACK_KEYS = ['C#', 'D#', null, 'F#', 'G#', 'A#', null];
 
-const NOTE_TO_INDEX = {
-    'C': 0, 'C#': 1, 'Db': 1, 'D': 2, 'D#': 3, 'Eb': 3,
-    'E': 4, 'F': 5, 'F#': 6, 'Gb': 6, 'G': 7, 'G#': 8,
-    'Ab': 8, 'A': 9, 'A#': 10, 'Bb': 10, 'B': 11
-};
-
 export default function PianoKeyboard({
     highlightedNotes = [],
     scaleNotes = [],
@@ -22,26 +17,22 @@ export default function PianoKeyboard({
 }) {
     const [pressedKeys, setPressedKeys] = useState(new Set());
 
-    const normalizedHighlights = highlightedNotes.map(n =>
-        n.replace(/[0-9]/g, '').toUpperCase()
-    );
-
-    const normalizedScaleNotes = scaleNotes.map(n =>
-        n.replace(/[0-9]/g, '').toUpperCase()
-    );
-
-    const detectedNoteName = detectedNote?.name?.toUpperCase();
+    // Chord notes may be spelled with flats or double sharps (Ab Cb Eb,
+    // A# C## E#); keys are matched by pitch class
+    const highlightedPitches = pitchClasses(highlightedNotes);
+    const scalePitches = pitchClasses(scaleNotes);
+    const detectedPitch = pitchClass(detectedNote?.name);
 
     function isHighlighted(note) {
-        return normalizedHighlights.includes(note.toUpperCase());
+        return highlightedPitches.has(pitchClass(note));
     }
 
     function isInScale(note) {
-        return normalizedScaleNotes.includes(note.toUpperCase());
+        return scalePitches.has(pitchClass(note));
     }
 
     function isDetected(note) {
-        return detectedNoteName === note.toUpperCase();
+        return detectedPitch !== null && detectedPitch === pitchClass(note);
     }
 
     function handleKeyPress(note, octave) {
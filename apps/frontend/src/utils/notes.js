@@ -0,0 +1,34 @@
+/**
+ * Note names for Loopify Live
+ * Compares notes by pitch class, so enharmonic spellings match
+ */
+
+const LETTER_PITCH = { C: 0, D: 2, E: 4, F: 5, G: 7, A: 9, B: 11 };
+
+/**
+ * Pitch class (0-11) of a note name such as "C", "f#4", "Bb" or "C##";
+ * null for anything that is not a note name
+ */
+export function pitchClass(name) {
+    const match = /^([A-Ga-g])(#{1,2}|b{1,2})?-?\d*$/.exec(name?.trim() ?? '');
+    if (!match) return null;
+
+    const [, letter, accidentals = ''] = match;
+    const shift = accidentals.startsWith('#') ? accidentals.length : -accidentals.length;
+    return (LETTER_PITCH[letter.toUpperCase()] + shift + 12) % 12;
+}
+
+/**
+ * Pitch classes of a list of note names, e.g. a chord's notes
+ */
+export function pitchClasses(names = []) {
+    return new Set(names.map(pitchClass).filter(pc => pc !== null));
+}
+
+/**
+ * Whether two note names sound the same pitch class: "A#", "Bb" and "bb3" all do
+ */
+export function samePitchClass(a, b) {
+    const pc = pitchClass(a);
+    return pc !== null && pc === pitchClass(b);
+}
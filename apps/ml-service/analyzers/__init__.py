@@ -3,6 +3,9 @@ from .audio_features import extract_audio_features
 from .scale_detector import detect_scale, detect_raga
 from .emotion_genre import classify_emotion, classify_genre
 from .chord_detector import detect_chords
+from .chroma import compute_chroma, CHROMA_BACKENDS
+from .practice import grade_attempts
+from .stems import analyze_stems
 
 __all__ = [
     'extract_audio_features',
@@ -10,5 +13,9 @@ __all__ = [
     'detect_raga', 
     'classify_emotion',
     'classify_genre',
-    'detect_chords'
+    'detect_chords',
+    'compute_chroma',
+    'CHROMA_BACKENDS',
+    'grade_attempts',
+    'analyze_stems'
 ]
@@ -0,0 +1,187 @@
+"""
+Offline catalog analysis: runs extract_audio_features and every analyzer
+over a directory tree without the HTTP service, across a process pool.
+Results are appended to a JSONL file as they finish (one versioned record
+per line, as stored by the service). A manifest next to the output lists
+finished files, so an interrupted run picks up where it stopped.
+
+Usage: python -m analyzers /path/to/catalog -o catalog.jsonl [--workers 8]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, Optional, Set
+
+from .audio_features import FEATURE_STAGES, extract_audio_features
+from .chroma import CHROMA_BACKENDS
+from .pipeline import build_record, run_analyzers
+
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".flac", ".ogg")
+
+# Files submitted ahead of the workers; their bytes are prefetched into the
+# page cache so decoding does not wait on disk
+PREFETCH_PER_WORKER = 2
+
+# Seconds between progress lines
+REPORT_INTERVAL = 10.0
+
+
+def iter_audio_files(root: str) -> Iterator[str]:
+    """Audio files under root, in a stable (sorted) order"""
+
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                yield os.path.join(directory, name)
+
+
+def manifest_key(root: str, path: str) -> str:
+    """Relative path, size and mtime: a file edited since its run is redone"""
+
+    stat = os.stat(path)
+    return f"{os.path.relpath(path, root)}\t{stat.st_size}\t{int(stat.st_mtime)}"
+
+
+def read_manifest(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def prefetch(path: str):
+    """Ask the OS to start reading a file ahead of its decode"""
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            while os.read(fd, 1 << 20):
+                pass
+    finally:
+        os.close(fd)
+
+
+def analyze_file(path: str, file_id: str, chroma_backend: Optional[str]) -> Dict:
+    """Worker: full feature extraction and every analyzer for one file"""
+
+    stages = []
+    start = time.perf_counter()
+    features = extract_audio_features(path, chroma_backend, on_stage=lambda stage, _: stages.append(stage))
+
+    # extract_audio_features falls back to mock features on errors
+    if len(stages) != len(FEATURE_STAGES):
+        raise RuntimeError("feature extraction failed")
+
+    record = build_record(file_id, path, features, stages, run_analyzers(features))
+    record["elapsed"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m analyzers", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("root", help="directory tree to analyze")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--manifest", help="finished-file manifest (default: OUTPUT.manifest)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chroma-backend", choices=sorted(CHROMA_BACKENDS))
+    parser.add_argument("--limit", type=int, help="stop after this many files")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    manifest_path = args.manifest or f"{args.output}.manifest"
+    done = read_manifest(manifest_path)
+
+    pending = []
+    skipped = 0
+    for path in iter_audio_files(root):
+        key = manifest_key(root, path)
+        if key in done:
+            skipped += 1
+        else:
+            pending.append((path, key))
+    if args.limit is not None:
+        pending = pending[:args.limit]
+
+    print(f"{len(pending)} files to analyze, {skipped} already in {manifest_path}", file=sys.stderr)
+
+    stats = {"files": 0, "failed": 0, "analyzed_seconds": 0.0, "track_seconds": 0.0}
+    start = last_report = time.perf_counter()
+    max_in_flight = args.workers * (1 + PREFETCH_PER_WORKER)
+
+    with open(args.output, "a") as output, open(manifest_path, "a") as manifest, \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        queue = iter(pending)
+        in_flight = {}
+
+        def submit_next():
+            for path, key in queue:
+                prefetch(path)
+                file_id = key.split("\t")[0]
+                in_flight[pool.submit(analyze_file, path, file_id, args.chroma_backend)] = (path, key)
+                return
+
+        for _ in range(max_in_flight):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path, key = in_flight.pop(future)
+                submit_next()
+
+                try:
+                    record = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"failed: {path}: {e}", file=sys.stderr)
+                    continue
+
+                # Output first, then manifest: a crash in between re-runs
+                # the file rather than losing it
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                manifest.write(key + "\n")
+                manifest.flush()
+
+                stats["files"] += 1
+                # Only an excerpt of long tracks is analyzed: throughput
+                # counts the analyzed audio, the catalog's length is reported beside it
+                stats["analyzed_seconds"] += record["features"].get("duration", 0.0)
+                stats["track_seconds"] += record["features"].get("track_duration", 0.0)
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL:
+                report(stats, now - start, len(in_flight))
+                last_report = now
+
+    report(stats, time.perf_counter() - start, 0, final=True)
+
+
+def report(stats: Dict, elapsed: float, in_flight: int, final: bool = False):
+    elapsed = max(elapsed, 1e-9)
+    hours = stats["analyzed_seconds"] / 3600
+    print(
+        f"{'done' if final else 'progress'}: {stats['files']} files ({stats['failed']} failed) "
+        f"in {elapsed:.1f}s, {stats['files'] / elapsed:.2f} files/s, "
+        f"{hours:.3f} analyzed audio-hours ({hours / elapsed:.4f} audio-hours/s) "
+        f"of {stats['track_seconds'] / 3600:.3f} track-hours"
+        + ("" if final else f", {in_flight} in flight"),
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
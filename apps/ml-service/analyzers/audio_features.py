@@ -3,6 +3,7 @@ Audio Feature Extraction using librosa
 """
 
 import numpy as np
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
 
 try:
     import librosa
@@ -10,81 +11,244 @@ try:
 except ImportError:
     LIBROSA_AVAILABLE = False
 
+from .chroma import DEFAULT_CHROMA_BACKEND, HOP_LENGTH, N_FFT, compute_chroma
+from .decoding import ANALYSIS_SAMPLE_RATE, load_audio, resampler_for
+from .fingerprint import fingerprint_features
+from .structure import segment_structure
 
-def extract_audio_features(file_path: str) -> dict:
+
+# Extraction stages in the order they run. Cheap stages come first so
+# progressive consumers (e.g. the streaming /analyze endpoint) can report
+# tempo and energy before the slow chroma and pitch passes finish.
+FEATURE_STAGES = ("rhythm", "chroma", "timbre", "structure", "pitch")
+
+# Version of each stage's output; bump when a stage's features would change
+# for the same audio so stored results are recomputed by re-analysis
+FEATURE_STAGE_VERSIONS = {"rhythm": 1, "chroma": 1, "timbre": 1, "structure": 1, "pitch": 1}
+
+# Chroma is also kept as means over blocks of this many seconds, compact
+# enough to store with the features, for time-varying analyzers such as
+# the key tracker
+CHROMA_BLOCK_SECONDS = 1.0
+
+# Pitch tracking runs over blocks of STFT frames to keep peak memory flat;
+# 256 frames of a 2048-point FFT is ~1 MB per intermediate matrix.
+PITCH_BLOCK_FRAMES = 256
+
+
+class FeatureExtractionCancelled(Exception):
+    """Raised from an on_stage hook to abandon extraction between stages"""
+
+
+def extract_audio_features(file_path: str, chroma_backend: Optional[str] = None,
+                           on_stage: Optional[Callable[[str, Dict], None]] = None) -> dict:
     """
     Extract audio features from an audio file.
     Returns a dictionary of features used by other analyzers.
+    chroma_backend selects an entry of CHROMA_BACKENDS (default: CHROMA_BACKEND env).
+    on_stage is called with each stage name and its features as the stage
+    completes; it may raise FeatureExtractionCancelled, which is propagated
+    instead of falling back to mock features.
     """
-    
+
     if not LIBROSA_AVAILABLE:
         # Return mock features if librosa is not installed
         return generate_mock_features()
-    
+
     try:
-        # Load audio file
-        y, sr = librosa.load(file_path, sr=22050, duration=120)  # Limit to 2 minutes
-        
-        # Tempo and beat tracking
-        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
-        
-        # Pitch/chroma features for scale detection
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        chroma_mean = np.mean(chroma, axis=1)
-        
-        # Spectral features
-        spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-        spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
-        spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(y=y, sr=sr))
-        
-        # Zero crossing rate
-        zcr = np.mean(librosa.feature.zero_crossing_rate(y))
-        
-        # RMS energy
-        rms = np.mean(librosa.feature.rms(y=y))
-        
-        # MFCCs for genre/emotion classification
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfcc_mean = np.mean(mfccs, axis=1)
-        mfcc_std = np.std(mfccs, axis=1)
-        
-        # Pitch contour
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_mean = np.mean(pitches[pitches > 0]) if np.any(pitches > 0) else 440
-        
-        # Onset detection for rhythm analysis
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        
-        return {
-            "tempo": float(tempo),
-            "chroma_mean": chroma_mean.tolist(),
-            "spectral_centroid": float(spectral_centroid),
-            "spectral_rolloff": float(spectral_rolloff),
-            "spectral_bandwidth": float(spectral_bandwidth),
-            "zero_crossing_rate": float(zcr),
-            "rms_energy": float(rms),
-            "mfcc_mean": mfcc_mean.tolist(),
-            "mfcc_std": mfcc_std.tolist(),
-            "pitch_mean": float(pitch_mean),
-            "onset_strength": float(np.mean(onset_env)),
-            "duration": float(len(y) / sr),
-            "sample_rate": sr
-        }
-        
+        features = {}
+        for stage, stage_features in iter_feature_stages(file_path, chroma_backend):
+            features.update(stage_features)
+            if on_stage is not None:
+                on_stage(stage, stage_features)
+        return features
+
+    except FeatureExtractionCancelled:
+        raise
+
     except Exception as e:
         print(f"Error extracting features: {e}")
         return generate_mock_features()
 
 
+def iter_feature_stages(file_path: str, chroma_backend: Optional[str] = None,
+                        stages: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Extract audio features stage by stage.
+    Yields (stage_name, features) as each stage in FEATURE_STAGES completes;
+    merging every yielded dict gives the same result as extract_audio_features.
+    stages limits extraction to a subset of FEATURE_STAGES (used to
+    recompute only stale stages). Errors are raised to the caller.
+    """
+
+    if not LIBROSA_AVAILABLE:
+        yield "mock", generate_mock_features()
+        return
+
+    stages = set(FEATURE_STAGES if stages is None else stages)
+
+    # Load audio file, limited to 2 minutes, with the tier's resampler
+    sr = ANALYSIS_SAMPLE_RATE
+    quality = resampler_for(chroma_backend or DEFAULT_CHROMA_BACKEND)
+    y, track_duration = load_audio(file_path, sr, duration=120, quality=quality)
+
+    # One magnitude spectrogram and one log-mel spectrogram shared by every
+    # stage, instead of each librosa feature running its own STFT
+    S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    if stages & {"rhythm", "timbre", "structure"}:
+        mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+    if stages & {"rhythm", "structure"}:
+        beats = track_beats(mel_db, sr)
+
+    if "rhythm" in stages:
+        # track_duration is the full length of the file, beyond the analyzed
+        # excerpt, for timelines
+        yield "rhythm", {**extract_rhythm_features(y, sr, S, mel_db, beats), "track_duration": track_duration}
+    if "chroma" in stages:
+        yield "chroma", extract_chroma_features(y, sr, S, chroma_backend)
+    if "timbre" in stages:
+        yield "timbre", extract_timbre_features(mel_db)
+    if "structure" in stages:
+        yield "structure", {"sections": segment_structure(S, mel_db, sr, HOP_LENGTH, beats[1])}
+    if "pitch" in stages:
+        yield "pitch", extract_pitch_features(y, sr, S)
+
+
+def track_beats(mel_db: np.ndarray, sr: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Tempo and beat frames (beat_track's own envelope uses median aggregation)"""
+
+    beat_env = librosa.onset.onset_strength(S=mel_db, sr=sr, aggregate=np.median)
+    return librosa.beat.beat_track(onset_envelope=beat_env, sr=sr)
+
+
+def extract_rhythm_features(y: np.ndarray, sr: int, S: np.ndarray, mel_db: np.ndarray,
+                            beats: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Dict:
+    """Tempo, energy, spectral shape and the landmark fingerprint - the cheap, early features"""
+
+    # Tempo and beat tracking, unless the caller already tracked beats
+    tempo, _ = beats if beats is not None else track_beats(mel_db, sr)
+
+    # Spectral features
+    spectral_centroid = np.mean(librosa.feature.spectral_centroid(S=S, sr=sr))
+    spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(S=S, sr=sr))
+    spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(S=S, sr=sr))
+
+    # Zero crossing rate
+    zcr = np.mean(librosa.feature.zero_crossing_rate(y))
+
+    # RMS energy
+    rms = np.mean(librosa.feature.rms(y=y))
+
+    # Onset detection for rhythm analysis
+    onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr)
+
+    return {
+        "tempo": float(np.atleast_1d(tempo)[0]),
+        "spectral_centroid": float(spectral_centroid),
+        "spectral_rolloff": float(spectral_rolloff),
+        "spectral_bandwidth": float(spectral_bandwidth),
+        "zero_crossing_rate": float(zcr),
+        "rms_energy": float(rms),
+        "onset_strength": float(np.mean(onset_env)),
+        "duration": float(len(y) / sr),
+        "sample_rate": sr,
+        **fingerprint_features(S, sr)
+    }
+
+
+def extract_chroma_features(y: np.ndarray, sr: int, S: Optional[np.ndarray] = None,
+                            backend: Optional[str] = None) -> Dict:
+    """Pitch-class profile for scale, raga and chord detection, overall and per block"""
+
+    backend = backend or DEFAULT_CHROMA_BACKEND
+    chroma = compute_chroma(y, sr, S, backend)
+    chroma_mean = np.mean(chroma, axis=1)
+
+    # Every backend produces frames at sr / HOP_LENGTH
+    frames_per_block = CHROMA_BLOCK_SECONDS * sr / HOP_LENGTH
+    starts = np.unique(np.round(np.arange(0, chroma.shape[1], frames_per_block)).astype(int))
+    starts = starts[starts < chroma.shape[1]]
+    counts = np.diff(np.append(starts, chroma.shape[1]))
+    blocks = np.add.reduceat(chroma, starts, axis=1) / counts
+
+    return {
+        "chroma_mean": chroma_mean.tolist(),
+        "chroma_blocks": np.round(blocks.T, 4).tolist(),
+        "chroma_block_seconds": CHROMA_BLOCK_SECONDS,
+        "chroma_backend": backend
+    }
+
+
+def extract_timbre_features(mel_db: np.ndarray) -> Dict:
+    """MFCCs for genre/emotion classification"""
+
+    mfccs = librosa.feature.mfcc(S=mel_db, n_mfcc=13)
+
+    return {
+        "mfcc_mean": np.mean(mfccs, axis=1).tolist(),
+        "mfcc_std": np.std(mfccs, axis=1).tolist()
+    }
+
+
+def extract_pitch_features(y: np.ndarray, sr: int, S: Optional[np.ndarray] = None) -> Dict:
+    """Pitch contour summary"""
+
+    pitch_sum, pitch_count = 0.0, 0
+    for pitches in iter_pitch_blocks(y, sr, S):
+        voiced = pitches[pitches > 0]
+        pitch_sum += float(np.sum(voiced, dtype=np.float64))
+        pitch_count += voiced.size
+
+    pitch_mean = pitch_sum / pitch_count if pitch_count else 440
+
+    return {"pitch_mean": float(pitch_mean)}
+
+
+def iter_pitch_blocks(y: np.ndarray, sr: int, S: Optional[np.ndarray] = None,
+                      block_frames: int = PITCH_BLOCK_FRAMES) -> Iterator[np.ndarray]:
+    """
+    Run piptrack over the signal in fixed-size blocks of STFT frames.
+    Yields the pitch matrix of each block. Frames match a single
+    librosa.piptrack(y=y, sr=sr) call exactly (piptrack thresholds each
+    frame independently), but only one (1 + n_fft/2) x block_frames slice
+    is alive at a time, so memory no longer grows with track length.
+    Blocks are sliced from S when the shared spectrogram is available.
+    """
+
+    n_fft, hop_length = N_FFT, HOP_LENGTH
+    half = n_fft // 2
+    n_frames = 1 + len(y) // hop_length
+
+    for start in range(0, n_frames, block_frames):
+        stop = min(start + block_frames, n_frames)
+
+        if S is not None:
+            pitches, _ = librosa.piptrack(S=S[:, start:stop], sr=sr, n_fft=n_fft, hop_length=hop_length)
+            yield pitches
+            continue
+
+        # Centered framing: zero-pad only the block that runs off either end
+        lo = start * hop_length - half
+        hi = (stop - 1) * hop_length + half
+        segment = y[max(lo, 0):min(hi, len(y))]
+        if lo < 0 or hi > len(y):
+            segment = np.pad(segment, (max(-lo, 0), max(hi - len(y), 0)), mode="constant")
+
+        block = np.abs(librosa.stft(segment, n_fft=n_fft, hop_length=hop_length, center=False))
+        pitches, _ = librosa.piptrack(S=block, sr=sr, n_fft=n_fft, hop_length=hop_length)
+        yield pitches
+
+
 def generate_mock_features():
     """Generate mock features when librosa is unavailable"""
-    
+
     # Simulated chroma for C Major
     chroma_c_major = [1.0, 0.2, 0.8, 0.2, 0.9, 0.7, 0.2, 0.9, 0.2, 0.7, 0.2, 0.3]
-    
+
     return {
         "tempo": 120.0,
         "chroma_mean": chroma_c_major,
+        "chroma_blocks": [],  # no key timeline; track_keys falls back to one key
         "spectral_centroid": 2200.0,
         "spectral_rolloff": 4500.0,
         "spectral_bandwidth": 2000.0,
@@ -95,5 +259,7 @@ def generate_mock_features():
         "pitch_mean": 440.0,
         "onset_strength": 0.5,
         "duration": 180.0,
+        "track_duration": 180.0,
+        "sections": [],
         "sample_rate": 22050
     }
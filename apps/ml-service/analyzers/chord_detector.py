@@ -7,78 +7,126 @@ Enhanced with data from Kaggle datasets:
 - CHORDONOMICON (666K song chord progressions)
 """
 
+import bisect
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import json
 
 
-# Enhanced chord templates based on Kaggle Musical Instrument Chord Classification
-# and Guitar Chords V3 datasets - weighted chroma profiles from real audio analysis
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+FLAT_TO_SHARP = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#"}
+
+# Chord qualities as semitone intervals above the root, most important
+# tone first; every quality exists on all 12 roots. Chord names are the
+# root followed by the suffix ("C#m7", "Gsus4")
+CHORD_QUALITIES = {
+    "": (0, 4, 7),
+    "m": (0, 3, 7),
+    "5": (0, 7),
+    "7": (0, 4, 7, 10),
+    "m7": (0, 3, 7, 10),
+    "maj7": (0, 4, 7, 11),
+    "mmaj7": (0, 3, 7, 11),
+    "6": (0, 4, 7, 9),
+    "m6": (0, 3, 7, 9),
+    "sus2": (0, 7, 2),
+    "sus4": (0, 7, 5),
+    "7sus4": (0, 7, 5, 10),
+    "dim": (0, 3, 6),
+    "dim7": (0, 3, 6, 9),
+    "m7b5": (0, 3, 6, 10),
+    "aug": (0, 4, 8),
+    "add9": (0, 4, 7, 14),
+    "9": (0, 4, 7, 10, 14),
+    "maj9": (0, 4, 7, 11, 14),
+    "m9": (0, 3, 7, 10, 14),
+}
+
+# Chroma weight of each chord tone by position: root, third, fifth, seventh, extension
+TONE_WEIGHTS = (1.0, 0.9, 0.8, 0.7, 0.6)
+
+# Score handicap per tone a chord has more or fewer than a triad. Overtones
+# of a triad land on sevenths and ninths, and a power chord is a subset of
+# every triad on its root; near-ties go to the plainer chord
+COMPLEXITY_PENALTY = 0.02
+
+CHORD_TYPES = {
+    "": "major", "m": "minor", "5": "power", "7": "dominant7", "m7": "minor7",
+    "maj7": "major7", "mmaj7": "minormajor7", "6": "major6", "m6": "minor6",
+    "sus2": "suspended", "sus4": "suspended", "7sus4": "suspended", "dim": "diminished",
+    "dim7": "diminished7", "m7b5": "halfdiminished", "aug": "augmented",
+    "add9": "added9", "9": "dominant9", "maj9": "major9", "m9": "minor9",
+}
+
+# Letter steps above the root used to spell each interval (thirds as
+# thirds, ninths as seconds, ...)
+LETTERS = "CDEFGAB"
+LETTER_PITCHES = (0, 2, 4, 5, 7, 9, 11)
+INTERVAL_STEPS = {0: 0, 2: 1, 3: 2, 4: 2, 5: 3, 6: 4, 7: 4, 8: 4, 9: 5, 10: 6, 11: 6, 14: 1}
+
+# Qualities whose intervals are other degrees than INTERVAL_STEPS says
+# (a diminished seventh is a seventh, not a sixth)
+QUALITY_STEPS = {"dim7": {9: 6}}
+
+# Accidental for each semitone offset from the letter's natural pitch
+ACCIDENTALS = {-2: "bb", -1: "b", 0: "", 1: "#", 2: "##"}
+
+
+def _spell(root: str, interval: int, suffix: str = "") -> str:
+    """
+    Name of the note an interval above root, spelled by degree from the
+    root's letter: the third of Abm is Cb, the fifth of Dbm7b5 is Abb.
+    """
+
+    step = QUALITY_STEPS.get(suffix, {}).get(interval, INTERVAL_STEPS[interval])
+    pitch = (NOTE_NAMES.index(FLAT_TO_SHARP.get(root, root)) + interval) % 12
+    letter = (LETTERS.index(root[0]) + step) % 7
+    return LETTERS[letter] + ACCIDENTALS[(pitch - LETTER_PITCHES[letter] + 6) % 12 - 6]
+
+
+def _quality_prototypes() -> np.ndarray:
+    """(qualities, 12) chroma templates of every quality rooted on C"""
+
+    prototypes = np.zeros((len(CHORD_QUALITIES), 12))
+    for q, intervals in enumerate(CHORD_QUALITIES.values()):
+        for weight, interval in zip(TONE_WEIGHTS, intervals):
+            prototypes[q, interval % 12] = weight
+    return prototypes
+
+
+QUALITY_PROTOTYPES = _quality_prototypes()
+
+# Every root of every quality, in quality-major order (all major chords,
+# then all minor chords, ...): chord q * 12 + r is quality q on root r
+CHORD_NAMES = [root + suffix for suffix in CHORD_QUALITIES for root in NOTE_NAMES]
+
+# Weighted chroma templates, format: [C, C#, D, D#, E, F, F#, G, G#, A, A#, B];
+# each root's template is its quality prototype rotated up by the root
 CHORD_TEMPLATES = {
-    # === MAJOR CHORDS ===
-    # Format: [C, C#, D, D#, E, F, F#, G, G#, A, A#, B]
-    # Root = 1.0, Third = 0.9, Fifth = 0.8, octave harmonics = 0.3
-    "C":  [1.0, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0],
-    "C#": [0.0, 1.0, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0],
-    "D":  [0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.8, 0.0, 0.0],
-    "D#": [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.8, 0.0],
-    "E":  [0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.8],
-    "F":  [0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0],
-    "F#": [0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.9, 0.0],
-    "G":  [0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.9],
-    "G#": [0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0],
-    "A":  [0.0, 0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0],
-    "A#": [0.0, 0.0, 0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0],
-    "B":  [0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0],
-    
-    # === MINOR CHORDS ===
-    # Minor third (3 semitones) instead of major third (4 semitones)
-    "Cm":  [1.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0],
-    "C#m": [0.0, 1.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0],
-    "Dm":  [0.0, 0.0, 1.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0],
-    "D#m": [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.8, 0.0],
-    "Em":  [0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.8],
-    "Fm":  [0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0],
-    "F#m": [0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.9, 0.0, 0.0],
-    "Gm":  [0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.9, 0.0],
-    "G#m": [0.9, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0],
-    "Am":  [0.8, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0],
-    "A#m": [0.0, 0.8, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0],
-    "Bm":  [0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.9, 0.0, 0.0, 0.0, 0.0, 1.0],
-
-    # === DOMINANT 7TH CHORDS ===
-    # Root + Major 3rd + 5th + Minor 7th (10 semitones)
-    "C7":  [1.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.75, 0.0, 0.0, 0.7, 0.0],
-    "D7":  [0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.75, 0.0, 0.0],
-    "E7":  [0.0, 0.0, 0.7, 0.0, 1.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.75],
-    "G7":  [0.0, 0.0, 0.75, 0.0, 0.0, 0.7, 0.0, 1.0, 0.0, 0.0, 0.0, 0.85],
-    "A7":  [0.0, 0.85, 0.0, 0.0, 0.75, 0.0, 0.0, 0.7, 0.0, 1.0, 0.0, 0.0],
-
-    # === MINOR 7TH CHORDS ===
-    "Am7": [0.75, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.7, 0.0, 1.0, 0.0, 0.0],
-    "Dm7": [0.7, 0.0, 1.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.0, 0.75, 0.0, 0.0],
-    "Em7": [0.0, 0.0, 0.7, 0.0, 1.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.0, 0.75],
-    "Bm7": [0.0, 0.0, 0.75, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.7, 0.0, 1.0],
-
-    # === MAJOR 7TH CHORDS ===
-    "Cmaj7": [1.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.75, 0.0, 0.0, 0.0, 0.7],
-    "Fmaj7": [0.75, 0.0, 0.0, 0.0, 0.7, 1.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0],
-    "Gmaj7": [0.0, 0.0, 0.75, 0.0, 0.0, 0.0, 0.7, 1.0, 0.0, 0.0, 0.0, 0.85],
-
-    # === SUSPENDED CHORDS ===
-    "Dsus2": [0.0, 0.0, 1.0, 0.0, 0.85, 0.0, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0],
-    "Dsus4": [0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.8, 0.0, 0.0],
-    "Asus2": [0.0, 0.0, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.85],
-    "Asus4": [0.0, 0.0, 0.85, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0],
-
-    # === DIMINISHED CHORDS ===
-    "Bdim": [0.0, 0.0, 0.8, 0.0, 0.0, 0.85, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
-    "Cdim": [1.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.8, 0.0, 0.0, 0.0, 0.0, 0.0],
-
-    # === AUGMENTED CHORDS ===
-    "Caug": [1.0, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.0, 0.85, 0.0, 0.0, 0.0],
+    name: np.roll(QUALITY_PROTOTYPES[i // 12], i % 12).tolist() for i, name in enumerate(CHORD_NAMES)
 }
 
+# Unit-norm templates as one (chords, 12) matrix, rows in CHORD_NAMES order
+CHORD_MATRIX = np.array([CHORD_TEMPLATES[name] for name in CHORD_NAMES])
+CHORD_MATRIX /= np.linalg.norm(CHORD_MATRIX, axis=1, keepdims=True)
+
+# Added to template scores when picking the best chord (see COMPLEXITY_PENALTY)
+CHORD_PRIORS = np.array([
+    -COMPLEXITY_PENALTY * abs(len(CHORD_QUALITIES[name[len(root):]]) - 3)
+    for name, root in zip(CHORD_NAMES, NOTE_NAMES * len(CHORD_QUALITIES))
+])
+
+# CHORD_MATRIX with the priors as a 13th column, in single precision: unit-norm
+# chroma extended by a constant 1 scores every chord, prior included, in one product
+SCORING_MATRIX = np.hstack([CHORD_MATRIX, CHORD_PRIORS[:, None]]).astype(np.float32)
+# The same, transposed and contiguous for the (frames, 13) @ (13, chords) product
+SCORING_COLUMNS = np.ascontiguousarray(SCORING_MATRIX.T)
+
+# Frames scored per block in match_chords. A block's (frames, chords) score
+# matrix (240 KB) stays in cache for the argmax instead of going out to
+# memory, which keeps the per-frame cost flat as the vocabulary grows.
+MATCH_BLOCK_FRAMES = 256
+
 # Common chord progressions from CHORDONOMICON (666K songs analysis)
 # Ranked by frequency of occurrence in popular music
 COMMON_PROGRESSIONS = {
@@ -124,56 +172,90 @@ COMMON_PROGRESSIONS = {
     ],
 }
 
-# Chord to notes mapping (comprehensive from Piano Chords Dataset)
+# Chord to notes mapping, for sharp roots and their flat spellings ("Bb", "Ebm7")
 CHORD_NOTES = {
-    # Major triads
-    "C": ["C", "E", "G"], "C#": ["C#", "F", "G#"], "Db": ["Db", "F", "Ab"],
-    "D": ["D", "F#", "A"], "D#": ["D#", "G", "A#"], "Eb": ["Eb", "G", "Bb"],
-    "E": ["E", "G#", "B"], "F": ["F", "A", "C"], "F#": ["F#", "A#", "C#"],
-    "Gb": ["Gb", "Bb", "Db"], "G": ["G", "B", "D"], "G#": ["G#", "C", "D#"],
-    "Ab": ["Ab", "C", "Eb"], "A": ["A", "C#", "E"], "A#": ["A#", "D", "F"],
-    "Bb": ["Bb", "D", "F"], "B": ["B", "D#", "F#"],
-    
-    # Minor triads
-    "Cm": ["C", "Eb", "G"], "C#m": ["C#", "E", "G#"],
-    "Dm": ["D", "F", "A"], "D#m": ["D#", "F#", "A#"], "Ebm": ["Eb", "Gb", "Bb"],
-    "Em": ["E", "G", "B"], "Fm": ["F", "Ab", "C"], "F#m": ["F#", "A", "C#"],
-    "Gm": ["G", "Bb", "D"], "G#m": ["G#", "B", "D#"], "Am": ["A", "C", "E"],
-    "A#m": ["A#", "C#", "F"], "Bbm": ["Bb", "Db", "F"], "Bm": ["B", "D", "F#"],
-    
-    # Dominant 7ths
-    "C7": ["C", "E", "G", "Bb"], "D7": ["D", "F#", "A", "C"],
-    "E7": ["E", "G#", "B", "D"], "G7": ["G", "B", "D", "F"],
-    "A7": ["A", "C#", "E", "G"],
-    
-    # Minor 7ths
-    "Am7": ["A", "C", "E", "G"], "Dm7": ["D", "F", "A", "C"],
-    "Em7": ["E", "G", "B", "D"], "Bm7": ["B", "D", "F#", "A"],
-    
-    # Major 7ths
-    "Cmaj7": ["C", "E", "G", "B"], "Fmaj7": ["F", "A", "C", "E"],
-    "Gmaj7": ["G", "B", "D", "F#"],
-    
-    # Suspended
-    "Dsus2": ["D", "E", "A"], "Dsus4": ["D", "G", "A"],
-    "Asus2": ["A", "B", "E"], "Asus4": ["A", "D", "E"],
-    
-    # Diminished
-    "Bdim": ["B", "D", "F"], "Cdim": ["C", "Eb", "Gb"],
-    
-    # Augmented
-    "Caug": ["C", "E", "G#"],
+    root + suffix: [_spell(root, interval, suffix) for interval in sorted(intervals)]
+    for suffix, intervals in CHORD_QUALITIES.items()
+    for root in NOTE_NAMES + list(FLAT_TO_SHARP)
 }
 
+# Bump when templates, progressions or timeline construction change so
+# stored results are recomputed
+CHORD_DETECTOR_VERSION = 1
+
+
+class ChordTimeline:
+    """
+    Run-length encoded chord timeline.
+    Consecutive slots of the same chord are stored as one run, and runs are
+    kept in time order in parallel lists, so the runs overlapping any time
+    window are found by binary search instead of scanning every slot.
+    """
+
+    def __init__(self):
+        self.starts: List[float] = []
+        self.ends: List[float] = []
+        self.chords: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.chords)
+
+    @property
+    def end_time(self) -> float:
+        return self.ends[-1] if self.ends else 0.0
+
+    def append(self, chord: str, start: float, duration: float):
+        """Add a slot; it extends the last run if it continues the same chord"""
+        end = start + duration
+        if self.chords and self.chords[-1] == chord and abs(self.ends[-1] - start) < 1e-6:
+            self.ends[-1] = end
+        else:
+            self.starts.append(start)
+            self.ends.append(end)
+            self.chords.append(chord)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        """Timeline entries for the runs overlapping [start, end), whole timeline by default"""
+        lo = 0 if start is None else bisect.bisect_right(self.ends, start)
+        hi = len(self.chords) if end is None else bisect.bisect_left(self.starts, end)
+
+        return [
+            {
+                "chord": self.chords[i],
+                "startTime": round(self.starts[i], 2),
+                "duration": round(self.ends[i] - self.starts[i], 2),
+                "notes": CHORD_NOTES.get(self.chords[i], ["C", "E", "G"])
+            }
+            for i in range(lo, hi)
+        ]
+
+    @classmethod
+    def from_rows(cls, timeline: List[Dict]) -> "ChordTimeline":
+        """Build from row-wise timeline entries ({"chord", "startTime", "duration"})"""
+        runs = cls()
+        for entry in timeline:
+            runs.append(entry["chord"], entry["startTime"], entry["duration"])
+        return runs
+
 
 def detect_chords(features: Dict) -> Dict:
     """
     Detect chord progression from audio features using enhanced
     Kaggle dataset-trained templates
     """
+    summary, timeline = detect_chord_timeline(features)
+    return {**summary, "timeline": timeline.query()}
+
+
+def detect_chord_timeline(features: Dict) -> Tuple[Dict, ChordTimeline]:
+    """
+    Chord detection returning the summary fields (progression, key, tempo,
+    difficulty, mode) and the run-length encoded timeline separately.
+    The timeline spans the whole track, not just the analyzed excerpt.
+    """
     chroma = features.get("chroma_mean", [1.0] * 12)
     tempo = features.get("tempo", 120)
-    duration = features.get("duration", 120)
+    duration = features.get("track_duration", features.get("duration", 120))
     
     # Detect the key using weighted chroma analysis
     detected_key, is_minor = detect_key_from_chroma(chroma)
@@ -188,32 +270,25 @@ def detect_chords(features: Dict) -> Dict:
     chord_duration = seconds_per_bar * 2  # 2 bars per chord
     
     # Create timeline
-    timeline = []
-    current_time = 0
+    timeline = ChordTimeline()
     chord_index = 0
     
-    while current_time < min(duration, 300):  # Cap at 5 minutes
+    while chord_index * chord_duration < duration:
         chord = progression[chord_index % len(progression)]
-        timeline.append({
-            "chord": chord,
-            "startTime": round(current_time, 2),
-            "duration": round(chord_duration, 2),
-            "notes": CHORD_NOTES.get(chord, ["C", "E", "G"])
-        })
-        current_time += chord_duration
+        timeline.append(chord, chord_index * chord_duration, chord_duration)
         chord_index += 1
     
     # Assess difficulty
     difficulty = assess_difficulty(progression)
     
-    return {
+    summary = {
         "progression": progression,
-        "timeline": timeline,
         "key": f"{detected_key}{'m' if is_minor else ''}",
         "tempo": tempo,
         "difficulty": difficulty,
         "mode": "minor" if is_minor else "major"
     }
+    return summary, timeline
 
 
 def detect_key_from_chroma(chroma: List[float]) -> Tuple[str, bool]:
@@ -281,6 +356,45 @@ def select_progression(key: str, is_minor: bool, chroma: List[float]) -> List[st
         return ["C", "G", "Am", "F"]
 
 
+def parse_chord(chord_name: str) -> Optional[Tuple[int, str]]:
+    """(root pitch class, quality suffix) of a chord name, accepting flat roots; None if unknown"""
+
+    root_length = 2 if chord_name[1:2] in ("#", "b") else 1
+    root = FLAT_TO_SHARP.get(chord_name[:root_length], chord_name[:root_length])
+    suffix = chord_name[root_length:]
+    if root not in NOTE_NAMES or suffix not in CHORD_QUALITIES:
+        return None
+    return NOTE_NAMES.index(root), suffix
+
+
+def match_chords(chroma: np.ndarray) -> List[Tuple[str, float]]:
+    """
+    Best chord and its cosine similarity for each row of a (frames, 12)
+    chroma matrix. Templates are rotations of the quality prototypes, so one
+    product with SCORING_MATRIX is the circular correlation of each frame
+    with every prototype at every root. Scoring [chroma, |chroma|] instead
+    of [chroma / |chroma|, 1] scales each frame's scores by its norm, which
+    leaves the argmax alone and skips normalizing every frame; only the
+    winners are divided back.
+    """
+
+    chroma = np.atleast_2d(np.asarray(chroma, dtype=np.float32))
+    extended = np.empty((len(chroma), 13), dtype=np.float32)
+    extended[:, :12] = chroma
+    extended[:, 12] = np.sqrt(np.einsum("ij,ij->i", chroma, chroma))
+
+    best = np.empty(len(chroma), dtype=np.intp)
+    top = np.empty(len(chroma), dtype=np.float32)
+    for start in range(0, len(chroma), MATCH_BLOCK_FRAMES):
+        block = slice(start, start + MATCH_BLOCK_FRAMES)
+        scores = extended[block] @ SCORING_COLUMNS
+        np.argmax(scores, axis=1, out=best[block])
+        top[block] = np.take_along_axis(scores, best[block, None], axis=1)[:, 0]
+
+    cosine = np.clip(top / np.maximum(extended[:, 12], 1e-8) - CHORD_PRIORS[best], 0.0, 1.0)
+    return list(zip([CHORD_NAMES[i] for i in best.tolist()], cosine.tolist()))
+
+
 def match_chord_from_chroma(chroma_vector: List[float]) -> Tuple[str, float]:
     """
     Match a chroma vector to the best chord template
@@ -289,22 +403,7 @@ def match_chord_from_chroma(chroma_vector: List[float]) -> Tuple[str, float]:
     if not chroma_vector or len(chroma_vector) != 12:
         return "C", 0.0
     
-    chroma = np.array(chroma_vector)
-    chroma = chroma / (np.max(chroma) + 1e-8)
-    
-    best_chord = "C"
-    best_score = -1
-    
-    for chord_name, template in CHORD_TEMPLATES.items():
-        template = np.array(template)
-        score = np.dot(chroma, template) / (np.linalg.norm(chroma) * np.linalg.norm(template) + 1e-8)
-        
-        if score > best_score:
-            best_score = score
-            best_chord = chord_name
-    
-    confidence = min(1.0, max(0.0, best_score))
-    return best_chord, confidence
+    return match_chords(chroma_vector)[0]
 
 
 def assess_difficulty(progression: List[str]) -> str:
@@ -340,28 +439,14 @@ def assess_difficulty(progression: List[str]) -> str:
 
 def get_chord_info(chord_name: str) -> Dict:
     """Get comprehensive chord information"""
-    notes = CHORD_NOTES.get(chord_name, [])
-    template = CHORD_TEMPLATES.get(chord_name, [0]*12)
-    
-    # Determine chord type
-    if 'maj7' in chord_name:
-        chord_type = "major7"
-    elif '7' in chord_name:
-        chord_type = "dominant7" if 'm' not in chord_name else "minor7"
-    elif 'dim' in chord_name:
-        chord_type = "diminished"
-    elif 'aug' in chord_name:
-        chord_type = "augmented"
-    elif 'sus' in chord_name:
-        chord_type = "suspended"
-    elif 'm' in chord_name:
-        chord_type = "minor"
-    else:
-        chord_type = "major"
+    parsed = parse_chord(chord_name)
+    if parsed is None:
+        return {"name": chord_name, "notes": [], "type": "unknown", "template": [0] * 12}
     
+    root, suffix = parsed
     return {
         "name": chord_name,
-        "notes": notes,
-        "type": chord_type,
-        "template": template
+        "notes": CHORD_NOTES[chord_name],
+        "type": CHORD_TYPES[suffix],
+        "template": CHORD_TEMPLATES[NOTE_NAMES[root] + suffix]
     }
@@ -0,0 +1,191 @@
+"""
+Chroma Extraction Backends
+Every backend returns a (12, frames) chroma matrix. Filter banks are built
+once per process and reused across requests, keyed on sample rate (and on
+tuning for the CQT, which librosa estimates to a 0.01-bin resolution).
+"""
+
+import os
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+
+# Shared spectrogram geometry (librosa defaults)
+N_FFT = 2048
+HOP_LENGTH = 512
+
+# CQT geometry matching librosa.feature.chroma_cqt defaults: 7 octaves from
+# C1 at 3 bins per semitone
+CQT_FMIN = 32.70319566257483  # C1
+CQT_BINS_PER_OCTAVE = 36
+CQT_OCTAVES = 7
+
+# Blocks of spectrogram frames used for tuning estimation, so piptrack's
+# two full-size output matrices are never materialized at once
+TUNING_BLOCK_FRAMES = 256
+
+DEFAULT_CHROMA_BACKEND = os.environ.get("CHROMA_BACKEND", "cqt")
+
+
+def compute_chroma(y: np.ndarray, sr: int, S: Optional[np.ndarray] = None,
+                   backend: Optional[str] = None) -> np.ndarray:
+    """
+    Compute a (12, frames) chroma matrix with the selected backend.
+    S is the shared magnitude spectrogram (N_FFT / HOP_LENGTH); it is
+    computed here if the caller has none.
+    """
+
+    backend = backend or DEFAULT_CHROMA_BACKEND
+    if backend not in CHROMA_BACKENDS:
+        raise ValueError(f"Unknown chroma backend: {backend}")
+
+    if S is None:
+        S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+
+    return CHROMA_BACKENDS[backend](y, sr, S)
+
+
+def chroma_cqt(y: np.ndarray, sr: int, S: np.ndarray) -> np.ndarray:
+    """
+    Full-quality constant-Q chroma, equivalent to librosa.feature.chroma_cqt.
+    Tuning is estimated from the shared spectrogram.
+    """
+
+    tuning = estimate_tuning(S, sr)
+    return _multirate_cqt_chroma(y, sr, HOP_LENGTH, tuning)
+
+
+def chroma_cqt_decimated(y: np.ndarray, sr: int, S: np.ndarray) -> np.ndarray:
+    """
+    Constant-Q chroma computed on a 2x decimated signal, assuming A440 tuning.
+    The CQT tops out near 4 kHz, so halving the rate loses no bins while
+    halving the work of every octave and skipping tuning estimation.
+    """
+
+    y_half = librosa.resample(y, orig_sr=2, target_sr=1, res_type="soxr_hq", scale=True)
+    return _multirate_cqt_chroma(y_half, sr // 2, HOP_LENGTH // 2, 0.0)
+
+
+def chroma_stft(y: np.ndarray, sr: int, S: np.ndarray) -> np.ndarray:
+    """
+    STFT chroma from the shared spectrogram, assuming A440 tuning.
+    The cheapest backend: one matrix product over a spectrogram that the
+    rest of the pipeline computes anyway.
+    """
+
+    chroma = chroma_filter_bank(sr, (S.shape[0] - 1) * 2).dot(S ** 2)
+    return librosa.util.normalize(chroma, norm=np.inf, axis=0)
+
+
+CHROMA_BACKENDS: Dict[str, Callable[[np.ndarray, int, np.ndarray], np.ndarray]] = {
+    "cqt": chroma_cqt,
+    "cqt_decimated": chroma_cqt_decimated,
+    "stft": chroma_stft,
+}
+
+# A misspelt CHROMA_BACKEND would otherwise fail every extraction, which
+# falls back to mock features; refuse to start instead
+if DEFAULT_CHROMA_BACKEND not in CHROMA_BACKENDS:
+    raise ValueError(
+        f"Unknown CHROMA_BACKEND '{DEFAULT_CHROMA_BACKEND}', expected one of {sorted(CHROMA_BACKENDS)}"
+    )
+
+
+def estimate_tuning(S: np.ndarray, sr: int, bins_per_octave: int = CQT_BINS_PER_OCTAVE) -> float:
+    """
+    Tuning deviation in fractions of a bin, as librosa.estimate_tuning,
+    computed block-wise over a magnitude spectrogram.
+    """
+
+    pitches, magnitudes = [], []
+    for start in range(0, S.shape[1], TUNING_BLOCK_FRAMES):
+        block = S[:, start:start + TUNING_BLOCK_FRAMES]
+        block_pitches, block_mags = librosa.piptrack(S=block, sr=sr, n_fft=(S.shape[0] - 1) * 2)
+        voiced = block_pitches > 0
+        pitches.append(block_pitches[voiced])
+        magnitudes.append(block_mags[voiced])
+
+    pitches = np.concatenate(pitches)
+    magnitudes = np.concatenate(magnitudes)
+    threshold = np.median(magnitudes) if magnitudes.size else 0.0
+
+    return float(librosa.pitch_tuning(
+        pitches[magnitudes >= threshold], resolution=0.01, bins_per_octave=bins_per_octave
+    ))
+
+
+def _multirate_cqt_chroma(y: np.ndarray, sr: int, hop_length: int, tuning: float) -> np.ndarray:
+    """
+    Octave-by-octave CQT folded straight into chroma: each octave's filter
+    response is taken at half the previous sample rate, and its magnitude is
+    mapped onto the 12 pitch classes before moving on, so the full
+    (252, frames) CQT is never stacked.
+    """
+
+    bank = _cqt_filter_bank(sr, round(tuning, 2))
+
+    responses = []
+    my_y, my_hop = y, hop_length
+    for i, (fft_basis, n_fft, to_chroma) in enumerate(bank):
+        D = librosa.stft(my_y, n_fft=n_fft, hop_length=my_hop, window="ones", pad_mode="constant")
+        responses.append(to_chroma.dot(np.abs(fft_basis.dot(D))))
+
+        if i < len(bank) - 1:
+            my_hop //= 2
+            my_y = librosa.resample(my_y, orig_sr=2, target_sr=1, res_type="soxr_hq", scale=True)
+
+    n_frames = min(response.shape[1] for response in responses)
+    chroma = sum(response[:, :n_frames] for response in responses)
+
+    return librosa.util.normalize(chroma, norm=np.inf, axis=0)
+
+
+@lru_cache(maxsize=128)
+def _cqt_filter_bank(sr: int, tuning: float) -> List[Tuple[object, int, np.ndarray]]:
+    """
+    Per-octave frequency-domain CQT filters, highest octave first, as
+    (fft_basis, n_fft, cq_to_chroma) triples. The downsampling gain and
+    librosa's 1/sqrt(length) scaling are folded into the basis rows.
+    """
+
+    fmin = CQT_FMIN * 2.0 ** (tuning / CQT_BINS_PER_OCTAVE)
+    n_bins = CQT_OCTAVES * CQT_BINS_PER_OCTAVE
+    freqs = librosa.cqt_frequencies(n_bins=n_bins, fmin=fmin, bins_per_octave=CQT_BINS_PER_OCTAVE)
+    lengths, _ = librosa.filters.wavelet_lengths(freqs=freqs, sr=sr)
+
+    cq_to_chroma = librosa.filters.cq_to_chroma(
+        n_bins, bins_per_octave=CQT_BINS_PER_OCTAVE, n_chroma=12, fmin=CQT_FMIN
+    )
+
+    bank = []
+    my_sr = float(sr)
+    for octave in range(CQT_OCTAVES - 1, -1, -1):
+        sl = slice(octave * CQT_BINS_PER_OCTAVE, (octave + 1) * CQT_BINS_PER_OCTAVE)
+
+        basis, octave_lengths = librosa.filters.wavelet(freqs=freqs[sl], sr=my_sr, pad_fft=True)
+        n_fft = basis.shape[1]
+        basis *= octave_lengths[:, np.newaxis] / float(n_fft)
+
+        fft_basis = np.fft.fft(basis, n=n_fft, axis=1)[:, :(n_fft // 2) + 1]
+        fft_basis *= (np.sqrt(sr / my_sr) / np.sqrt(lengths[sl]))[:, np.newaxis]
+        fft_basis = librosa.util.sparsify_rows(fft_basis, quantile=0.01, dtype=np.complex64)
+
+        bank.append((fft_basis, n_fft, cq_to_chroma[:, sl]))
+        my_sr /= 2.0
+
+    return bank
+
+
+@lru_cache(maxsize=16)
+def chroma_filter_bank(sr: int, n_fft: int) -> np.ndarray:
+    """(12, 1 + n_fft // 2) STFT-to-chroma projection for A440 tuning, cached per (sr, n_fft)"""
+
+    return librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=0.0)
@@ -0,0 +1,116 @@
+"""
+Audio Decoding
+Decodes uploads to mono float32 at the analysis sample rate. Only the
+analyzed excerpt is read, channels are mixed down before resampling, and
+the file's length comes from the same open file instead of a second pass.
+Resampler quality is chosen per analysis tier: the full-quality CQT tier
+keeps librosa's default (soxr HQ), cheaper tiers use shorter filters.
+"""
+
+import os
+from math import gcd
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+try:
+    import soxr
+    SOXR_AVAILABLE = True
+except ImportError:
+    SOXR_AVAILABLE = False
+
+from scipy.signal import resample_poly
+
+
+ANALYSIS_SAMPLE_RATE = 22050
+
+# soxr recipe for each resampler quality; "high" is what librosa.load uses
+SOXR_RECIPES = {"fast": "LQ", "balanced": "MQ", "high": "HQ"}
+
+# Without soxr: polyphase FIR (scipy.signal.resample_poly) with a Kaiser
+# window per quality; integer ratios such as 44.1k -> 22.05k need one phase
+POLYPHASE_WINDOWS = {"fast": ("kaiser", 5.0), "balanced": ("kaiser", 8.0), "high": ("kaiser", 12.0)}
+
+RESAMPLER_QUALITIES = tuple(SOXR_RECIPES)
+
+# Resampler quality for each chroma backend (analysis tier); RESAMPLER_QUALITY
+# in the environment overrides it for every tier
+TIER_RESAMPLERS = {"cqt": "high", "cqt_decimated": "balanced", "stft": "fast"}
+RESAMPLER_OVERRIDE = os.environ.get("RESAMPLER_QUALITY")
+
+# A misspelt RESAMPLER_QUALITY would otherwise be ignored and leave every
+# tier on its default; refuse to start instead
+if RESAMPLER_OVERRIDE is not None and RESAMPLER_OVERRIDE not in SOXR_RECIPES:
+    raise ValueError(
+        f"Unknown RESAMPLER_QUALITY '{RESAMPLER_OVERRIDE}', expected one of {list(RESAMPLER_QUALITIES)}"
+    )
+
+
+def resampler_for(chroma_backend: Optional[str]) -> str:
+    """Resampler quality for an analysis tier (chroma backend name)"""
+
+    if RESAMPLER_OVERRIDE is not None:
+        return RESAMPLER_OVERRIDE
+    return TIER_RESAMPLERS.get(chroma_backend, "high")
+
+
+def load_audio(file_path: str, sr: int = ANALYSIS_SAMPLE_RATE, duration: Optional[float] = None,
+               quality: str = "high") -> Tuple[np.ndarray, float]:
+    """
+    Mono float32 samples of the first `duration` seconds at sr, and the
+    length of the whole file in seconds. Formats libsndfile cannot read
+    fall back to librosa's decoder.
+    """
+
+    try:
+        y, native_sr, file_duration = _read_soundfile(file_path, duration)
+    except (RuntimeError, ImportError):
+        y, native_sr = librosa.load(file_path, sr=None, mono=True, duration=duration)
+        file_duration = float(librosa.get_duration(path=file_path))
+
+    return resample(y, native_sr, sr, quality), file_duration
+
+
+def resample(y: np.ndarray, orig_sr: int, target_sr: int, quality: str = "high") -> np.ndarray:
+    """Resample mono audio with the given quality (one of RESAMPLER_QUALITIES)"""
+
+    if quality not in SOXR_RECIPES:
+        raise ValueError(f"Unknown resampler quality: {quality}")
+    if orig_sr == target_sr:
+        return y
+
+    if SOXR_AVAILABLE:
+        return soxr.resample(y, orig_sr, target_sr, quality=SOXR_RECIPES[quality])
+
+    divisor = gcd(int(orig_sr), int(target_sr))
+    resampled = resample_poly(y, target_sr // divisor, orig_sr // divisor, window=POLYPHASE_WINDOWS[quality])
+    return resampled.astype(np.float32)
+
+
+def _read_soundfile(file_path: str, duration: Optional[float]) -> Tuple[np.ndarray, int, float]:
+    if not SOUNDFILE_AVAILABLE:
+        raise ImportError("soundfile is not installed")
+
+    with soundfile.SoundFile(file_path) as f:
+        frames = -1 if duration is None else min(f.frames, int(round(duration * f.samplerate)))
+        y = f.read(frames, dtype="float32", always_2d=True)
+        native_sr, file_duration = f.samplerate, f.frames / f.samplerate
+
+    # Mix down before resampling, so only one channel is resampled. Frames
+    # are interleaved; a product with equal weights is ~10x faster than
+    # mean(axis=1) over the short channel axis
+    channels = y.shape[1]
+    y = y[:, 0] if channels == 1 else y.dot(np.full(channels, 1.0 / channels, dtype=np.float32))
+    return np.ascontiguousarray(y), native_sr, float(file_duration)
@@ -31,6 +31,10 @@ GENRE_PROFILES = {
     "Fusion": {"tempo_range": (90, 130), "mfcc_pattern": "mixed"},
 }
 
+# Bump when the profiles or heuristics change so stored results are recomputed
+EMOTION_CLASSIFIER_VERSION = 1
+GENRE_CLASSIFIER_VERSION = 1
+
 
 def classify_emotion(features: Dict) -> Dict:
     """
@@ -0,0 +1,293 @@
+"""
+Landmark Fingerprinting
+A recording is fingerprinted as pairs of spectral peaks ("landmarks"):
+each strong peak of the shared magnitude spectrogram is paired with a few
+peaks shortly after it, and every pair is hashed from the two frequencies
+and the time between them, together with the anchor's frame. Peaks survive
+lossy re-encoding, and a trimmed copy shifts every landmark by the same
+number of frames, so two recordings of the same audio share many hashes at
+one consistent time offset while different songs, even on the same chords,
+share few and at scattered offsets.
+
+A hash match only nominates a candidate: before a stored analysis is
+reused, its tempo, length, mean chroma and the match offset are checked
+against the new upload.
+"""
+
+import base64
+import binascii
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.ndimage import maximum_filter
+
+from .chroma import HOP_LENGTH, chroma_filter_bank
+
+
+# Spectrogram bins searched for peaks (~50 Hz to ~5.5 kHz at 22.05 kHz / 2048)
+MIN_PEAK_BIN = 5
+MAX_PEAK_BIN = 512
+
+# A peak is the loudest point within this many bins and frames around it
+PEAK_FREQ_RADIUS = 10
+PEAK_TIME_RADIUS = 8
+
+# Peaks quieter than this (dB below the loudest bin) are ignored
+PEAK_FLOOR_DB = 60.0
+
+# Strongest peaks kept per second of audio, so dense mixes do not flood the index
+PEAKS_PER_SECOND = 6
+
+# Each anchor peak is paired with up to this many later peaks within the target zone
+FAN_OUT = 3
+MAX_PAIR_FRAMES = 63  # 6 bits
+MAX_PAIR_BINS = 127  # frequency difference, stored with an offset of 128 in 8 bits
+
+# Landmarks of a match must agree on the time offset within this many frames
+OFFSET_TOLERANCE = 1
+
+# Recordings with fewer landmarks than this are too short to match safely
+MIN_LANDMARKS = 50
+
+# A match needs this many offset-consistent landmarks, and this share of the
+# smaller fingerprint's landmarks
+MIN_MATCHES = 20
+MIN_MATCH_RATIO = 0.5
+
+# Hashes shared by more stored landmarks than this carry no information
+MAX_POSTINGS = 500
+
+# Verification of a candidate before its analysis is reused
+TEMPO_TOLERANCE = 0.04  # ratio
+DURATION_TOLERANCE = 3.0  # seconds, between the two files' full lengths
+MAX_OFFSET_SECONDS = 3.0  # reused timelines are off by the trim offset
+MIN_CHROMA_SIMILARITY = 0.97  # cosine of the mean STFT chroma
+
+
+def fingerprint_features(S: np.ndarray, sr: int) -> Dict:
+    """
+    Landmark fingerprint and mean chroma of the shared magnitude
+    spectrogram S (N_FFT / HOP_LENGTH), as stored with the rhythm features.
+    The chroma is a cheap STFT chroma, independent of the chroma backend,
+    used to verify fingerprint matches.
+    """
+
+    chroma = chroma_filter_bank(sr, (S.shape[0] - 1) * 2).dot(S ** 2).mean(axis=1) if S.shape[1] else np.ones(12)
+    chroma = chroma / max(float(chroma.max()), 1e-10)
+
+    return {
+        "fingerprint": encode_fingerprint(landmarks(S, sr)),
+        "fingerprint_chroma": np.round(chroma, 4).tolist(),
+    }
+
+
+def landmarks(S: np.ndarray, sr: int) -> np.ndarray:
+    """(n, 2) uint32 array of (hash, anchor frame) rows, in time order"""
+
+    bins = S[MIN_PEAK_BIN:MAX_PEAK_BIN]
+    if bins.size == 0:
+        return np.zeros((0, 2), dtype=np.uint32)
+
+    db = 20 * np.log10(np.maximum(bins, 1e-10))
+    size = (2 * PEAK_FREQ_RADIUS + 1, 2 * PEAK_TIME_RADIUS + 1)
+    is_peak = (db == maximum_filter(db, size=size, mode="constant", cval=-np.inf)) & (db > db.max() - PEAK_FLOOR_DB)
+    freqs, frames = np.nonzero(is_peak)
+    strength = db[freqs, frames]
+
+    # Keep the strongest PEAKS_PER_SECOND peaks of every second
+    second = (frames * HOP_LENGTH) // sr
+    order = np.lexsort((-strength, second))
+    group_start = np.searchsorted(second[order], second[order])
+    kept = order[np.arange(len(order)) - group_start < PEAKS_PER_SECOND]
+
+    peaks = sorted(zip(frames[kept].tolist(), (freqs[kept] + MIN_PEAK_BIN).tolist()))
+    rows = []
+    for i, (t1, f1) in enumerate(peaks):
+        paired = 0
+        for t2, f2 in peaks[i + 1:]:
+            dt = t2 - t1
+            if dt > MAX_PAIR_FRAMES or paired == FAN_OUT:
+                break
+            if dt == 0 or abs(f2 - f1) > MAX_PAIR_BINS:
+                continue
+            rows.append(((f1 << 14) | ((f2 - f1 + 128) << 6) | dt, t1))
+            paired += 1
+
+    return np.array(rows, dtype=np.uint32).reshape(-1, 2)
+
+
+def encode_fingerprint(rows: np.ndarray) -> str:
+    """Landmark rows as a base64 string, compact enough to store with the features"""
+    return base64.b64encode(np.ascontiguousarray(rows, dtype="<u4").tobytes()).decode("ascii")
+
+
+def decode_fingerprint(fingerprint: Optional[str]) -> np.ndarray:
+    """Inverse of encode_fingerprint; empty for missing or unreadable fingerprints"""
+
+    try:
+        data = base64.b64decode(fingerprint or "", validate=True)
+    except (binascii.Error, ValueError):
+        return np.zeros((0, 2), dtype=np.uint32)
+    if len(data) % 8:
+        return np.zeros((0, 2), dtype=np.uint32)
+    return np.frombuffer(data, dtype="<u4").reshape(-1, 2).astype(np.uint32)
+
+
+def _profile(features: Dict) -> Dict:
+    """What a candidate is verified on: tempo, full length and mean chroma"""
+
+    return {
+        "tempo": float(features.get("tempo", 0.0)),
+        "duration": float(features.get("track_duration", features.get("duration", 0.0))),
+        "chroma": np.asarray(features.get("fingerprint_chroma") or np.ones(12), dtype=float),
+    }
+
+
+def verify_match(query: Dict, stored: Dict, offset_seconds: float) -> bool:
+    """
+    Whether two fingerprint-matched recordings are the same song, cut
+    the same way: tempo, length and mean chroma agree, and the match is
+    not offset by more than a trimmed lead-in.
+    """
+
+    tempo = max(query["tempo"], stored["tempo"])
+    chroma_similarity = float(query["chroma"] @ stored["chroma"]) / max(
+        float(np.linalg.norm(query["chroma"]) * np.linalg.norm(stored["chroma"])), 1e-10
+    )
+    return (
+        abs(query["tempo"] - stored["tempo"]) <= TEMPO_TOLERANCE * tempo
+        and abs(query["duration"] - stored["duration"]) <= DURATION_TOLERANCE
+        and abs(offset_seconds) <= MAX_OFFSET_SECONDS
+        and chroma_similarity >= MIN_CHROMA_SIMILARITY
+    )
+
+
+class FingerprintIndex:
+    """
+    Landmark hashes of stored recordings in a few hash-sorted segments, so a
+    lookup is a binary search per query landmark and segment. A new
+    recording becomes its own segment, merged with the newest older segment
+    while it is at least half that size: there are O(log n) segments and
+    each landmark is re-sorted O(log n) times. Safe to use from worker threads.
+    """
+
+    def __init__(self):
+        # (hashes, slots, anchor frames) per segment, each sorted by hash, oldest and largest first
+        self._segments: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._ids: List[Optional[str]] = []  # slot -> file_id, None once replaced
+        self._live = bytearray()  # slot -> 1 until replaced
+        self._entries: Dict[str, Tuple[int, int, Dict]] = {}  # file_id -> (slot, landmarks, profile)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, file_id: str, features: Dict):
+        """Index a recording's rhythm features, replacing any earlier fingerprint of the same file_id"""
+
+        rows = decode_fingerprint(features.get("fingerprint"))
+        with self._lock:
+            self._remove(file_id)
+            if len(rows) < MIN_LANDMARKS:
+                return
+
+            slot = len(self._ids)
+            self._ids.append(file_id)
+            self._live.append(1)
+            self._entries[file_id] = (slot, len(rows), _profile(features))
+
+            order = np.argsort(rows[:, 0], kind="stable")
+            self._segments.append((rows[order, 0], np.full(len(rows), slot, dtype=np.uint32), rows[order, 1]))
+            while len(self._segments) > 1 and 2 * len(self._segments[-1][0]) >= len(self._segments[-2][0]):
+                self._segments[-2:] = [self._merge(self._segments[-2], self._segments[-1])]
+
+    def lookup(self, features: Dict, exclude: Iterable[str] = ()) -> Optional[Tuple[str, float]]:
+        """
+        Best verified near-duplicate of a recording's rhythm features as
+        (file_id, share of landmarks matched), or None
+        """
+
+        rows = decode_fingerprint(features.get("fingerprint"))
+        if len(rows) < MIN_LANDMARKS:
+            return None
+
+        query = _profile(features)
+        frame_seconds = HOP_LENGTH / features.get("sample_rate", 22050)
+        exclude = set(exclude)
+
+        with self._lock:
+            slots, offsets = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+            for hashes, owners, frames in self._segments:
+                positions, query_frames = _postings(hashes, rows)
+                slots.append(owners[positions].astype(np.int64))
+                offsets.append(frames[positions].astype(np.int64) - query_frames)
+
+            for slot, matches, offset in _offset_votes(np.concatenate(slots), np.concatenate(offsets)):
+                file_id = self._ids[slot]
+                if file_id is None or file_id in exclude:
+                    continue
+                _, count, profile = self._entries[file_id]
+                ratio = matches / min(len(rows), count)
+                if (matches >= MIN_MATCHES and ratio >= MIN_MATCH_RATIO
+                        and verify_match(query, profile, offset * frame_seconds)):
+                    return file_id, min(ratio, 1.0)
+
+        return None
+
+    def _merge(self, older: Tuple[np.ndarray, ...], newer: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, ...]:
+        """One hash-sorted segment from two, without the landmarks of replaced recordings"""
+
+        hashes, slots, frames = (np.concatenate([a, b]) for a, b in zip(older, newer))
+        live = np.frombuffer(self._live, dtype=bool)[slots]
+        order = np.argsort(hashes[live], kind="stable")
+        return hashes[live][order], slots[live][order], frames[live][order]
+
+    def _remove(self, file_id: str):
+        entry = self._entries.pop(file_id, None)
+        if entry is not None:
+            self._ids[entry[0]] = None
+            self._live[entry[0]] = 0
+
+
+def _postings(hashes: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions in a hash-sorted segment matching the query landmarks, and
+    the query frame of each; hashes with more than MAX_POSTINGS entries are skipped
+    """
+
+    lo = np.searchsorted(hashes, rows[:, 0], side="left")
+    hi = np.searchsorted(hashes, rows[:, 0], side="right")
+    counts = hi - lo
+    keep = (counts > 0) & (counts <= MAX_POSTINGS)
+    counts, lo = counts[keep], lo[keep]
+
+    # Expand the [lo, hi) ranges into one index array
+    positions = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+    return positions, np.repeat(rows[keep, 1].astype(np.int64), counts)
+
+
+def _offset_votes(slots: np.ndarray, offsets: np.ndarray) -> List[Tuple[int, int, int]]:
+    """
+    (slot, matches, offset) for every recording with shared landmarks,
+    most matches first. matches counts the landmarks at the recording's
+    most common time offset, give or take OFFSET_TOLERANCE frames.
+    """
+
+    if len(slots) == 0:
+        return []
+
+    keys, counts = np.unique(np.stack([slots, offsets], axis=1), axis=0, return_counts=True)
+    votes = counts.copy()
+    for shift in range(1, OFFSET_TOLERANCE + 1):
+        # keys are sorted by slot, then offset: neighbours within the tolerance are nearby rows
+        same = (keys[shift:, 0] == keys[:-shift, 0]) & (keys[shift:, 1] - keys[:-shift, 1] <= OFFSET_TOLERANCE)
+        votes[shift:] += np.where(same, counts[:-shift], 0)
+        votes[:-shift] += np.where(same, counts[shift:], 0)
+
+    best: Dict[int, Tuple[int, int]] = {}
+    for (slot, offset), count in zip(keys.tolist(), votes.tolist()):
+        if slot not in best or count > best[slot][0]:
+            best[slot] = (count, offset)
+
+    return sorted(((slot, count, offset) for slot, (count, offset) in best.items()), key=lambda vote: -vote[1])
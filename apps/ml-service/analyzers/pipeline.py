@@ -0,0 +1,117 @@
+"""
+Versioned Analysis Pipeline
+Stored results record the version of every feature stage and analyzer that
+produced them. Re-analysis compares those against the current versions and
+recomputes only stale feature stages, then only the analyzers that depend
+on a recomputed stage or whose own version changed; everything else is
+reused from the stored record.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from .audio_features import FEATURE_STAGES, FEATURE_STAGE_VERSIONS, iter_feature_stages
+from .scale_detector import (
+    detect_scale, detect_raga, track_keys, SCALE_DETECTOR_VERSION, RAGA_DETECTOR_VERSION, KEY_TRACKER_VERSION
+)
+from .emotion_genre import (
+    classify_emotion, classify_genre, EMOTION_CLASSIFIER_VERSION, GENRE_CLASSIFIER_VERSION
+)
+from .chord_detector import detect_chords, CHORD_DETECTOR_VERSION
+
+
+# name -> (analyzer, version, feature stages it reads)
+ANALYZERS = {
+    "scale": (detect_scale, SCALE_DETECTOR_VERSION, ("chroma",)),
+    "raga": (detect_raga, RAGA_DETECTOR_VERSION, ("chroma",)),
+    "keys": (track_keys, KEY_TRACKER_VERSION, ("chroma",)),
+    "emotion": (classify_emotion, EMOTION_CLASSIFIER_VERSION, ("rhythm",)),
+    "genre": (classify_genre, GENRE_CLASSIFIER_VERSION, ("rhythm", "timbre")),
+    "chords": (detect_chords, CHORD_DETECTOR_VERSION, ("rhythm", "chroma")),
+}
+
+
+def run_analyzers(features: Dict, names: Optional[Iterable[str]] = None) -> Dict:
+    """Run the named analyzers (all by default) on a feature dict"""
+
+    names = ANALYZERS if names is None else names
+    return {name: ANALYZERS[name][0](features) for name in names}
+
+
+def build_record(file_id: str, file_path: str, features: Dict,
+                 stages: Iterable[str], results: Dict) -> Dict:
+    """
+    Storable analysis record. stages lists the feature stages that were
+    actually extracted. With none extracted the features are a mock
+    fallback; such records are marked with mockFeatures, since
+    re-analysis has nothing to refresh them from.
+    """
+
+    stages = set(stages)
+    record = {
+        "fileId": file_id,
+        "filePath": file_path,
+        "features": features,
+        "results": results,
+        "versions": {
+            "features": {stage: FEATURE_STAGE_VERSIONS[stage] for stage in FEATURE_STAGES if stage in stages},
+            "analyzers": {name: ANALYZERS[name][1] for name in results},
+        },
+    }
+    if not stages:
+        record["mockFeatures"] = True
+    return record
+
+
+def stale_feature_stages(record: Dict) -> List[str]:
+    """Feature stages missing from a record or extracted by an older version"""
+
+    versions = record.get("versions", {}).get("features", {})
+    return [stage for stage in FEATURE_STAGES if versions.get(stage) != FEATURE_STAGE_VERSIONS[stage]]
+
+
+def stale_analyzers(record: Dict, stages: Iterable[str] = ()) -> List[str]:
+    """Analyzers with an older stored version or reading any of the given stages"""
+
+    versions = record.get("versions", {}).get("analyzers", {})
+    stages = set(stages)
+
+    return [
+        name for name, (_, version, inputs) in ANALYZERS.items()
+        if versions.get(name) != version or stages.intersection(inputs)
+    ]
+
+
+def refresh_record(record: Dict, on_stage: Optional[Callable[[str, Dict], None]] = None) -> Optional[Dict]:
+    """
+    Bring a stored record up to date with the current versions.
+    Only stale feature stages are extracted again (from the original file,
+    with the chroma backend it was analyzed with), and only the analyzers
+    affected by them or by their own version change are re-run.
+    Returns the updated record, or None if it was already current.
+    Extraction errors are raised to the caller.
+    """
+
+    stages = stale_feature_stages(record)
+    analyzers = stale_analyzers(record, stages)
+    if not stages and not analyzers:
+        return None
+
+    features = dict(record.get("features", {}))
+    extracted: Set[str] = {stage for stage in FEATURE_STAGES if stage not in stages}
+
+    if stages:
+        chroma_backend = features.get("chroma_backend")
+        for stage, stage_features in iter_feature_stages(record["filePath"], chroma_backend, stages):
+            features.update(stage_features)
+            if stage in FEATURE_STAGE_VERSIONS:
+                extracted.add(stage)
+            if on_stage is not None:
+                on_stage(stage, stage_features)
+
+    results = {**record.get("results", {}), **run_analyzers(features, analyzers)}
+    refreshed = build_record(record["fileId"], record["filePath"], features, extracted, results)
+
+    # A known duplicate stays one, so it is not indexed as an original
+    if "duplicateOf" in record:
+        refreshed["duplicateOf"] = record["duplicateOf"]
+    return refreshed
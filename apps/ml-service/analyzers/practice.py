@@ -0,0 +1,206 @@
+"""
+Chord Practice Grading
+Grades recorded practice attempts against their target chords in batches.
+Attempts are decoded, padded to a common length and transformed in one
+STFT call; each attempt's chroma is then scored against every chord
+template in one matrix product, and the verdict is taken among the target
+chord and the chords most easily confused with it.
+"""
+
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+from .chord_detector import CHORD_NAMES, CHORD_PRIORS, CHORD_TEMPLATES, NOTE_NAMES, parse_chord
+from .chroma import HOP_LENGTH, N_FFT, chroma_filter_bank
+from .decoding import load_audio
+
+
+PRACTICE_SAMPLE_RATE = 22050
+
+# Attempts are short; anything longer is cut so one slow upload cannot
+# dominate a batch
+ATTEMPT_MAX_DURATION = 10.0
+
+# Attempts only need chroma below a few kHz; the cheapest resampler is enough
+PRACTICE_RESAMPLER = "fast"
+
+# Attempts per STFT call; bounds the padded (batch, bins, frames) matrix
+GRADE_BATCH = 32
+
+# Cosine similarity the target chord needs to count as played
+MATCH_THRESHOLD = 0.8
+
+# Recorded notes carry overtones that land on other pitch classes (the 3rd
+# harmonic on the fifth, the 5th on the major third), which pulls plain
+# triads toward their 7th chords; templates are spread over the first
+# HARMONICS partials with geometrically decaying weight to match
+HARMONICS = 6
+HARMONIC_DECAY = 0.6
+
+# Softmax temperature for confidence over the target and its confusables
+CONFIDENCE_TEMPERATURE = 0.05
+
+# Attempts quieter than this RMS are graded as silent
+SILENCE_RMS = 1e-3
+
+# Chords sharing at least this many notes with the target are its confusables
+CONFUSABLE_SHARED_NOTES = 2
+
+# Row of each chord in CHORD_NAMES
+CHORD_INDEX = {name: i for i, name in enumerate(CHORD_NAMES)}
+
+
+@lru_cache(maxsize=1024)
+def template_name(chord: str) -> Optional[str]:
+    """Name of the CHORD_TEMPLATES entry for a chord, accepting flat roots"""
+
+    parsed = parse_chord(chord)
+    if parsed is None:
+        return None
+    root, suffix = parsed
+    return NOTE_NAMES[root] + suffix
+
+
+@lru_cache(maxsize=1)
+def _template_matrix() -> np.ndarray:
+    """(chords, 12) unit-norm, harmonic-spread chord templates in CHORD_NAMES order"""
+
+    templates = np.array([CHORD_TEMPLATES[name] for name in CHORD_NAMES], dtype=np.float32)
+    spread = sum(
+        HARMONIC_DECAY ** (h - 1) * np.roll(templates, int(round(12 * np.log2(h))) % 12, axis=1)
+        for h in range(1, HARMONICS + 1)
+    )
+    return spread / np.linalg.norm(spread, axis=1, keepdims=True)
+
+
+@lru_cache(maxsize=1)
+def _confusable_mask() -> np.ndarray:
+    """(chords, chords) mask of each chord's candidates: itself and its confusables"""
+
+    notes = np.array([CHORD_TEMPLATES[name] for name in CHORD_NAMES]) >= 0.5
+    shared = notes.astype(int) @ notes.T.astype(int)
+    sizes = notes.sum(axis=1)
+
+    # Symmetric chords (aug, dim7) have the same notes as chords on other
+    # roots; those spellings cannot be told apart, so they are not rivals
+    same_notes = (shared == sizes[:, None]) & (shared == sizes[None, :])
+    return ((shared >= CONFUSABLE_SHARED_NOTES) & ~same_notes) | np.eye(len(CHORD_NAMES), dtype=bool)
+
+
+@lru_cache(maxsize=1)
+def _candidate_columns() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Each chord's candidates as a (chords, width) matrix of CHORD_NAMES
+    indices, the chord itself first, padded to the largest candidate set,
+    and the mask of real (unpadded) entries.
+    """
+
+    mask = _confusable_mask()
+    width = int(mask.sum(axis=1).max())
+    columns = np.zeros((len(CHORD_NAMES), width), dtype=np.intp)
+    valid = np.zeros((len(CHORD_NAMES), width), dtype=bool)
+    for i, row in enumerate(mask):
+        others = np.flatnonzero(row & (np.arange(len(row)) != i))
+        columns[i, :len(others) + 1] = np.concatenate([[i], others])
+        valid[i, :len(others) + 1] = True
+    return columns, valid
+
+
+def load_attempt(file_path: str) -> np.ndarray:
+    y, _ = load_audio(file_path, PRACTICE_SAMPLE_RATE, ATTEMPT_MAX_DURATION, PRACTICE_RESAMPLER)
+    return y
+
+
+def batch_chroma(clips: Sequence[np.ndarray], sr: int = PRACTICE_SAMPLE_RATE) -> np.ndarray:
+    """
+    Energy-weighted mean chroma of each clip, as a (clips, 12) matrix.
+    Clips are sorted by length and transformed GRADE_BATCH at a time, zero
+    padded to the longest clip of their batch; padding adds no energy, so
+    summing chroma energy over frames needs no per-clip masking.
+    """
+
+    chroma = np.zeros((len(clips), 12), dtype=np.float32)
+    filter_bank = chroma_filter_bank(sr, N_FFT).astype(np.float32)
+    order = np.argsort([len(clip) for clip in clips])
+
+    for start in range(0, len(order), GRADE_BATCH):
+        indices = order[start:start + GRADE_BATCH]
+        length = max(N_FFT, max(len(clips[i]) for i in indices))
+
+        batch = np.zeros((len(indices), length), dtype=np.float32)
+        for row, i in enumerate(indices):
+            batch[row, :len(clips[i])] = clips[i]
+
+        power = np.abs(librosa.stft(batch, n_fft=N_FFT, hop_length=HOP_LENGTH)) ** 2
+        chroma[indices] = power.sum(axis=-1) @ filter_bank.T
+
+    peak = chroma.max(axis=1, keepdims=True)
+    return chroma / np.maximum(peak, 1e-10)
+
+
+def grade_chroma(chroma: np.ndarray, targets: Sequence[str],
+                 silent: Optional[np.ndarray] = None) -> List[Dict]:
+    """
+    Grade (attempts, 12) chroma against each attempt's target chord.
+    All attempts are scored against all templates in one product; each
+    verdict is the best-scoring chord among the target and its confusables
+    (with CHORD_PRIORS favouring plainer chords on near-ties),
+    and confidence is that chord's softmax share among those candidates.
+    """
+
+    indices = np.array([CHORD_INDEX[template_name(target)] for target in targets], dtype=np.intp)
+    rows = np.arange(len(indices))
+
+    # Only each attempt's candidates are ranked and softmaxed: a target
+    # has 30 to 126 candidates among the 240 chords
+    columns, valid = (matrix[indices] for matrix in _candidate_columns())
+    norms = np.linalg.norm(chroma, axis=1, keepdims=True)
+    scores = (chroma / np.maximum(norms, 1e-10)) @ _template_matrix().T
+    scores = np.take_along_axis(scores, columns, axis=1)
+
+    masked = np.where(valid, scores + CHORD_PRIORS[columns], -np.inf)
+    best = np.argmax(masked, axis=1)
+    detected = columns[rows, best]
+
+    weights = np.exp((masked - masked[rows, best][:, None]) / CONFIDENCE_TEMPERATURE)
+    confidence = 1.0 / weights.sum(axis=1)
+
+    # The target is every attempt's first candidate
+    target_scores = scores[:, 0]
+    correct = (best == 0) & (target_scores >= MATCH_THRESHOLD)
+
+    if silent is None:
+        silent = np.zeros(len(indices), dtype=bool)
+
+    return [
+        {
+            "target": targets[i],
+            "detected": None if silent[i] else CHORD_NAMES[detected[i]],
+            "correct": bool(correct[i] and not silent[i]),
+            "confidence": 0.0 if silent[i] else round(float(confidence[i]), 3),
+            "score": 0.0 if silent[i] else round(float(target_scores[i]), 3),
+        }
+        for i in range(len(indices))
+    ]
+
+
+def grade_attempts(clips: Sequence[np.ndarray], targets: Sequence[str],
+                   sr: int = PRACTICE_SAMPLE_RATE) -> List[Dict]:
+    """Grade decoded practice attempts (mono clips at sr) against their target chords"""
+
+    unknown = [target for target in targets if template_name(target) is None]
+    if unknown:
+        raise ValueError(f"Unknown target chords: {sorted(set(unknown))}")
+
+    silent = np.array([
+        len(clip) == 0 or float(np.sqrt(np.mean(clip ** 2))) < SILENCE_RMS for clip in clips
+    ], dtype=bool)
+
+    return grade_chroma(batch_chroma(clips, sr), targets, silent)
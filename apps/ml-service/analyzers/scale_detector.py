@@ -93,6 +93,19 @@ RAGA_TEMPLATES = {
     },
 }
 
+# Versions of the detectors' output; bump when the profiles, templates or
+# scoring change so stored results are recomputed by re-analysis
+SCALE_DETECTOR_VERSION = 1
+RAGA_DETECTOR_VERSION = 1
+KEY_TRACKER_VERSION = 1
+
+# Key tracking: each block's key is scored on the chroma of the window
+# centred on it, then smoothed so a change of key must pay this penalty
+# (in summed correlation) and brief tonicizations do not count as
+# modulations
+KEY_WINDOW_SECONDS = 16.0
+KEY_CHANGE_PENALTY = 2.0
+
 
 def detect_scale(features: Dict) -> Dict:
     """
@@ -161,6 +174,109 @@ def krumhansl_kessler_key(chroma: np.ndarray) -> Tuple[str, str, float]:
     return best_key, best_mode, confidence
 
 
+def _key_profile_matrix() -> np.ndarray:
+    """(24, 12) z-scored profiles: 12 major keys, then 12 minor keys"""
+    profiles = np.array(
+        [np.roll(MAJOR_PROFILE, i) for i in range(12)] + [np.roll(MINOR_PROFILE, i) for i in range(12)]
+    )
+    profiles = profiles - profiles.mean(axis=1, keepdims=True)
+    return profiles / profiles.std(axis=1, keepdims=True)
+
+
+KEY_PROFILES = _key_profile_matrix()
+
+
+def key_correlations(chroma: np.ndarray) -> np.ndarray:
+    """
+    Krumhansl-Kessler scores of many chroma vectors at once: Pearson
+    correlation of each (n, 12) row with all 24 key profiles, as (n, 24)
+    """
+    centered = chroma - chroma.mean(axis=1, keepdims=True)
+    std = centered.std(axis=1, keepdims=True)
+    return (centered / np.maximum(std, 1e-10)) @ KEY_PROFILES.T / 12
+
+
+def track_keys(features: Dict) -> Dict:
+    """
+    Key timeline with modulation points from per-block chroma.
+    Window sums come from a cumulative sum over blocks, so each window is
+    O(1); all windows are scored against the 24 key profiles in one
+    product, and a Viterbi pass with a key-change penalty smooths the
+    per-block keys. Cost is linear in track length.
+    """
+    blocks = np.array(features.get("chroma_blocks") or [], dtype=float)
+    block_seconds = features.get("chroma_block_seconds", 1.0)
+    duration = features.get("duration", len(blocks) * block_seconds)
+
+    if blocks.ndim != 2 or blocks.shape[0] == 0 or blocks.shape[1] != 12:
+        # No block chroma (e.g. mock features): one key for the whole track
+        scale = detect_scale(features)
+        segment = _key_segment(scale["key"], scale["mode"], 0.0, duration, scale["confidence"])
+        return {"timeline": [segment], "modulations": []}
+
+    n = blocks.shape[0]
+    half = max(1, int(round(KEY_WINDOW_SECONDS / block_seconds / 2)))
+
+    # Window around block i: blocks [i - half, i + half), clipped
+    cumulative = np.vstack([np.zeros(12), np.cumsum(blocks, axis=0)])
+    lo = np.clip(np.arange(n) - half, 0, n)
+    hi = np.clip(np.arange(n) + half, 0, n)
+    windows = cumulative[hi] - cumulative[lo]
+
+    scores = key_correlations(windows)
+    path = _viterbi(scores, KEY_CHANGE_PENALTY)
+
+    timeline = []
+    start = 0
+    for i in range(1, n + 1):
+        if i == n or path[i] != path[start]:
+            state = path[start]
+            confidence = float(np.clip((scores[start:i, state].mean() + 1) / 2, 0.0, 1.0))
+            timeline.append(_key_segment(
+                NOTE_NAMES[state % 12], "major" if state < 12 else "minor",
+                start * block_seconds, min(i * block_seconds, duration), confidence
+            ))
+            start = i
+
+    modulations = [
+        {"time": after["startTime"], "from": before["scale"], "to": after["scale"]}
+        for before, after in zip(timeline, timeline[1:])
+    ]
+    return {"timeline": timeline, "modulations": modulations}
+
+
+def _viterbi(scores: np.ndarray, penalty: float) -> np.ndarray:
+    """Best state path maximizing summed scores minus penalty per state change"""
+    n, states = scores.shape
+    backpointers = np.zeros((n, states), dtype=int)
+    total = scores[0].copy()
+
+    for i in range(1, n):
+        # Either stay in the same key, or switch from the best key so far
+        best = int(np.argmax(total))
+        switch = total[best] - penalty
+        stay = total >= switch
+        backpointers[i] = np.where(stay, np.arange(states), best)
+        total = np.where(stay, total, switch) + scores[i]
+
+    path = np.zeros(n, dtype=int)
+    path[-1] = int(np.argmax(total))
+    for i in range(n - 1, 0, -1):
+        path[i - 1] = backpointers[i, path[i]]
+    return path
+
+
+def _key_segment(key: str, mode: str, start: float, end: float, confidence: float) -> Dict:
+    return {
+        "key": key,
+        "mode": mode,
+        "scale": f"{key} {mode.capitalize()}",
+        "startTime": round(start, 2),
+        "duration": round(end - start, 2),
+        "confidence": round(confidence, 3)
+    }
+
+
 def detect_mode(features: Dict) -> Dict:
     """
     Detect extended modes (Dorian, Lydian, etc.) beyond major/minor
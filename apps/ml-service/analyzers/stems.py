@@ -0,0 +1,195 @@
+"""
+Multi-Stem Analysis
+Analyzes the stems of one song (vocals, drums, bass, ...) together. Tempo
+and beats are tracked once, from the mix, while every stem gets its own
+energy, chroma and onset features on a worker thread; the per-stem results
+are then aligned to the mix's beats and aggregated into a song-level
+result. Decoding, FFTs, the chroma filter banks and soxr all release the
+GIL, so stems scale across cores without copying audio between processes.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+from .audio_features import track_beats
+from .chroma import DEFAULT_CHROMA_BACKEND, HOP_LENGTH, N_FFT, compute_chroma
+from .decoding import ANALYSIS_SAMPLE_RATE, load_audio, resampler_for
+from .scale_detector import NOTE_NAMES, detect_scale
+
+
+# Seconds of each stem analyzed, matching extract_audio_features
+STEM_MAX_DURATION = 120
+
+# Most threads one stem analysis runs on; callers that bound total
+# concurrency (the scheduler) charge the analysis this many slots
+STEM_WORKERS = int(os.environ.get("STEM_WORKERS", os.cpu_count() or 1))
+
+# A stem is active on a beat whose energy is within this ratio of its loudest beat (-20 dB)
+ACTIVE_ENERGY_RATIO = 0.1
+
+# Onsets within this many seconds of a mix beat count as on the beat
+BEAT_TOLERANCE = 0.07
+
+
+def stem_threads(stems: int, mix: bool = False) -> int:
+    """Threads analyze_stems uses for a number of stems (and an optional mix)"""
+
+    return max(1, min(stems + int(mix), STEM_WORKERS))
+
+
+def analyze_stems(stems: Dict[str, str], mix_path: Optional[str] = None,
+                  chroma_backend: Optional[str] = None,
+                  check: Optional[Callable[[], None]] = None, threads: Optional[int] = None) -> Dict:
+    """
+    Song-level analysis of a set of stems ({name: file path}).
+    Beats come from mix_path, or from the sum of the stems when no mix is
+    given. check is called between phases and may raise to cancel.
+    Work runs on a pool of `threads` threads (default stem_threads()).
+    """
+
+    check = check or (lambda: None)
+    backend = chroma_backend or DEFAULT_CHROMA_BACKEND
+    quality = resampler_for(backend)
+    sr = ANALYSIS_SAMPLE_RATE
+    threads = threads or stem_threads(len(stems), mix_path is not None)
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="stem") as pool:
+        # Decode every stem (and the mix) in parallel
+        paths = dict(stems)
+        if mix_path is not None:
+            paths[None] = mix_path
+        decoded = {name: pool.submit(load_audio, path, sr, STEM_MAX_DURATION, quality)
+                   for name, path in paths.items()}
+        audio = {name: future.result()[0] for name, future in decoded.items()}
+        check()
+
+        mix = audio.pop(None) if mix_path is not None else _mixdown(list(audio.values()))
+
+        # Beat tracking on the mix runs alongside the per-stem features
+        beats = pool.submit(_mix_beats, mix, sr)
+        features = {name: pool.submit(stem_features, y, sr, backend) for name, y in audio.items()}
+        tempo, beat_frames = beats.result()
+        features = {name: future.result() for name, future in features.items()}
+        check()
+
+    beat_frames = np.asarray(beat_frames, dtype=int)
+    results = {name: align_to_beats(stem, beat_frames, sr) for name, stem in features.items()}
+    return aggregate_stems(results, tempo, beat_frames, len(mix) / sr, sr)
+
+
+def stem_features(y: np.ndarray, sr: int, chroma_backend: str) -> Dict:
+    """Frame-level energy, onset envelope and onsets, and mean chroma of one stem"""
+
+    S = np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    rms = librosa.feature.rms(S=S, frame_length=N_FFT, hop_length=HOP_LENGTH)[0]
+    mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+    onset_env = librosa.onset.onset_strength(S=mel_db, sr=sr)
+    onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=sr, hop_length=HOP_LENGTH)
+
+    # Energy-weighted chroma, so a stem's silent stretches do not flatten it
+    chroma = compute_chroma(y, sr, S, chroma_backend)
+    weights = rms[:chroma.shape[1]]
+    chroma_mean = chroma[:, :len(weights)] @ weights / max(float(weights.sum()), 1e-10)
+
+    return {
+        "rms": rms,
+        "onset_env": onset_env,
+        "onsets": onsets,
+        "chroma_mean": chroma_mean,
+        "duration": len(y) / sr,
+    }
+
+
+def align_to_beats(stem: Dict, beat_frames: np.ndarray, sr: int) -> Dict:
+    """Per-beat energy, activity and onset timing of a stem against the mix's beats"""
+
+    # beat_energy[i] is the mean energy from beat i to the next (or the end);
+    # without beats the whole stem is one span. Beats past the end of a
+    # shorter stem get zero energy, so every stem has one value per mix beat
+    rms = stem["rms"]
+    starts = beat_frames[beat_frames < len(rms)] if len(beat_frames) else np.zeros(1, dtype=int)
+    beat_energy = np.zeros(max(len(beat_frames), 1))
+    if len(rms) and len(starts):
+        counts = np.diff(np.append(starts, len(rms)))
+        beat_energy[:len(starts)] = np.add.reduceat(rms, starts) / np.maximum(counts, 1)
+    active = beat_energy >= ACTIVE_ENERGY_RATIO * max(float(beat_energy.max()), 1e-10)
+
+    onsets = stem["onsets"]
+    if len(onsets) and len(beat_frames):
+        tolerance = BEAT_TOLERANCE * sr / HOP_LENGTH
+        distance = np.abs(onsets[:, None] - beat_frames[None, :]).min(axis=1)
+        on_beat = float(np.mean(distance <= tolerance))
+    else:
+        on_beat = 0.0
+
+    chroma = stem["chroma_mean"]
+    peak = max(float(chroma.max()), 1e-10)
+    return {
+        "rmsEnergy": float(rms.mean()) if len(rms) else 0.0,
+        "beatEnergy": np.round(beat_energy, 5).tolist(),
+        "activeRatio": round(float(active.mean()), 3),
+        "chroma": np.round(chroma / peak, 4).tolist(),
+        "dominantPitchClass": NOTE_NAMES[int(np.argmax(chroma))],
+        # How far the strongest pitch class stands above the rest: near 0
+        # for drums and noise, higher for tonal parts
+        "tonality": round(float(1.0 - chroma.mean() / peak), 3),
+        "onsetRate": round(len(onsets) / max(stem["duration"], 1e-10), 3),
+        "onsetStrength": float(stem["onset_env"].mean()) if len(stem["onset_env"]) else 0.0,
+        "onBeatRatio": round(on_beat, 3),
+    }
+
+
+def aggregate_stems(stems: Dict[str, Dict], tempo: float, beat_frames: np.ndarray,
+                    duration: float, sr: int) -> Dict:
+    """
+    Song-level result: tempo and beats of the mix, each stem's share of the
+    energy, and a key from the stems' chroma weighted by energy and tonality
+    (so drums barely count).
+    """
+
+    names = list(stems)
+    energy = np.array([stems[name]["rmsEnergy"] for name in names])
+    shares = energy / max(float(energy.sum()), 1e-10)
+    for name, share in zip(names, shares):
+        stems[name]["energyShare"] = round(float(share), 3)
+
+    weights = np.array([stems[name]["rmsEnergy"] * stems[name]["tonality"] for name in names])
+    chroma = np.array([stems[name]["chroma"] for name in names])
+    song_chroma = weights @ chroma / max(float(weights.sum()), 1e-10) if len(names) else np.ones(12)
+    scale = detect_scale({"chroma_mean": song_chroma.tolist()})
+
+    return {
+        "tempo": float(np.atleast_1d(tempo)[0]),
+        "beats": np.round(librosa.frames_to_time(beat_frames, sr=sr, hop_length=HOP_LENGTH), 3).tolist(),
+        "duration": round(duration, 2),
+        "key": scale["key"],
+        "scale": scale["scale"],
+        "confidence": scale["confidence"],
+        "chroma": np.round(song_chroma, 4).tolist(),
+        "leadStem": max(names, key=lambda name: stems[name]["rmsEnergy"] * stems[name]["tonality"], default=None),
+        "stems": stems,
+    }
+
+
+def _mix_beats(mix: np.ndarray, sr: int):
+    S = np.abs(librosa.stft(mix, n_fft=N_FFT, hop_length=HOP_LENGTH))
+    mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=sr))
+    return track_beats(mel_db, sr)
+
+
+def _mixdown(stems: List[np.ndarray]) -> np.ndarray:
+    """Sum of the stems, padded to the longest"""
+
+    mix = np.zeros(max((len(y) for y in stems), default=0), dtype=np.float32)
+    for y in stems:
+        mix[:len(y)] += y
+    return mix
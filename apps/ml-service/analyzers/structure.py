@@ -0,0 +1,194 @@
+"""
+Song Structure Segmentation
+Splits a track into labeled sections (intro, verse, chorus, bridge, outro)
+from beat-synchronous chroma and MFCC. Boundaries come from a novelty
+curve: a checkerboard kernel slid along the diagonal of the self-similarity
+matrix. The kernel only ever sees beats within KERNEL_BEATS of each other,
+so only that band of the matrix is computed and memory grows linearly with
+song length instead of quadratically.
+"""
+
+import numpy as np
+from typing import Dict, List
+
+try:
+    import librosa
+    LIBROSA_AVAILABLE = True
+except ImportError:
+    LIBROSA_AVAILABLE = False
+
+from .chroma import chroma_filter_bank
+
+
+# Checkerboard kernel width in beats (four bars either side of a boundary)
+KERNEL_BEATS = 32
+
+# Shortest section, and the gap enforced between boundaries, in beats
+MIN_SECTION_BEATS = 8
+
+# Sections whose mean features are at least this similar share a label
+GROUP_SIMILARITY = 0.9
+
+# Relative weight of harmony (chroma) against timbre (MFCC) in similarity
+CHROMA_WEIGHT = 0.6
+
+N_MFCC = 13
+
+
+def segment_structure(S: np.ndarray, mel_db: np.ndarray, sr: int, hop_length: int,
+                      beat_frames: np.ndarray) -> List[Dict]:
+    """
+    Labeled sections with times in seconds, covering the analyzed audio.
+    S is the shared magnitude spectrogram, mel_db the log-mel spectrogram
+    and beat_frames the frames returned by beat tracking.
+    """
+
+    n_frames = S.shape[1]
+    duration = n_frames * hop_length / sr
+    beat_frames = np.unique(np.clip(beat_frames, 0, n_frames - 1))
+
+    if len(beat_frames) < 2 * MIN_SECTION_BEATS:
+        return [_section("verse", "A", 0.0, duration)]
+
+    features, loudness = beat_features(S, mel_db, sr, beat_frames)
+    novelty = novelty_curve(features)
+
+    boundaries = librosa.util.peak_pick(
+        novelty, pre_max=MIN_SECTION_BEATS // 2, post_max=MIN_SECTION_BEATS // 2,
+        pre_avg=MIN_SECTION_BEATS, post_avg=MIN_SECTION_BEATS, delta=0.05, wait=MIN_SECTION_BEATS
+    )
+    n_beats = features.shape[1]
+    boundaries = [b for b in boundaries if MIN_SECTION_BEATS <= b <= n_beats - MIN_SECTION_BEATS]
+    bounds = [0] + boundaries + [n_beats]
+
+    groups = group_sections(features, bounds)
+    labels = name_sections(groups, loudness, bounds)
+
+    # Beat-synchronous column i spans from beat i-1 to beat i (column 0 is
+    # the lead-in before the first beat), so column b starts at beat b-1
+    times = np.concatenate([[0.0], librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length)])
+    starts = [0.0] + [float(times[b]) for b in bounds[1:-1]]
+    ends = starts[1:] + [duration]
+
+    # Chord changes inside a section also register as novelty; adjacent
+    # pieces that got the same name are one section
+    sections = []
+    for label, group, start, end in zip(labels, groups, starts, ends):
+        if sections and sections[-1]["label"] == label:
+            sections[-1]["end"] = end
+        else:
+            sections.append({"label": label, "group": chr(ord("A") + group), "start": start, "end": end})
+
+    return [_section(s["label"], s["group"], s["start"], s["end"]) for s in sections]
+
+
+def beat_features(S: np.ndarray, mel_db: np.ndarray, sr: int, beat_frames: np.ndarray):
+    """
+    Unit-norm stacked chroma/MFCC per beat, as a (dims, beats + 1) matrix,
+    and the mean log-mel loudness of each beat.
+    """
+
+    chroma = chroma_filter_bank(sr, (S.shape[0] - 1) * 2).dot(S ** 2)
+    chroma = librosa.util.sync(chroma, beat_frames, aggregate=np.median)
+    chroma = librosa.util.normalize(chroma, norm=2, axis=0)
+
+    # The first coefficient is overall loudness; leave it out of timbre
+    mfcc = librosa.feature.mfcc(S=mel_db, sr=sr, n_mfcc=N_MFCC)[1:]
+    mfcc = librosa.util.sync(mfcc, beat_frames, aggregate=np.mean)
+    mfcc = mfcc - mfcc.mean(axis=1, keepdims=True)
+    mfcc = librosa.util.normalize(mfcc, norm=2, axis=0)
+
+    features = np.vstack([np.sqrt(CHROMA_WEIGHT) * chroma, np.sqrt(1 - CHROMA_WEIGHT) * mfcc])
+    loudness = librosa.util.sync(mel_db.mean(axis=0, keepdims=True), beat_frames, aggregate=np.mean)[0]
+
+    return features, loudness
+
+
+def novelty_curve(features: np.ndarray, width: int = KERNEL_BEATS) -> np.ndarray:
+    """
+    Foote novelty of each beat, normalized to [0, 1].
+    Only the similarity band |i - j| < width is formed, one diagonal at a
+    time, so memory is O(width * beats) rather than O(beats^2).
+    """
+
+    half = width // 2
+    n = features.shape[1]
+    padded = np.pad(features, ((0, 0), (half, half)))
+
+    # band[k, i] = similarity of padded beats i and i + k
+    band = np.zeros((width, n + 2 * half))
+    for k in range(width):
+        band[k, :n + 2 * half - k] = np.einsum("di,di->i", padded[:, :n + 2 * half - k], padded[:, k:])
+
+    # Gaussian-tapered checkerboard: + within the same side of the centre
+    # beat, - across it; symmetric, so each off-diagonal pair counts twice
+    offsets = np.arange(-half, half) + 0.5
+    taper = np.exp(-0.5 * (offsets / (0.5 * half)) ** 2)
+
+    novelty = np.zeros(n)
+    for a in range(width):
+        for b in range(a, width):
+            sign = 1.0 if (a < half) == (b < half) else -1.0
+            weight = sign * taper[a] * taper[b] * (1.0 if a == b else 2.0)
+            novelty += weight * band[b - a, a:a + n]
+
+    novelty -= novelty.min()
+    return novelty / max(novelty.max(), 1e-10)
+
+
+def group_sections(features: np.ndarray, bounds: List[int]) -> List[int]:
+    """Group index of each section; sections with similar mean features share one"""
+
+    means = [features[:, start:end].mean(axis=1) for start, end in zip(bounds[:-1], bounds[1:])]
+    means = [mean / max(np.linalg.norm(mean), 1e-10) for mean in means]
+
+    groups, representatives = [], []
+    for mean in means:
+        similarities = [float(mean.dot(rep)) for rep in representatives]
+        if similarities and max(similarities) >= GROUP_SIMILARITY:
+            groups.append(int(np.argmax(similarities)))
+        else:
+            groups.append(len(representatives))
+            representatives.append(mean)
+
+    return groups
+
+
+def name_sections(groups: List[int], loudness: np.ndarray, bounds: List[int]) -> List[str]:
+    """
+    Name sections from their grouping: the loudest repeated group is the
+    chorus and other repeated groups are verses; unrepeated sections are
+    the intro (first), outro (last) or a bridge.
+    """
+
+    if len(groups) == 1:
+        return ["verse"]
+
+    counts = np.bincount(groups)
+    group_loudness = {
+        group: np.mean([loudness[start:end].mean()
+                        for g, start, end in zip(groups, bounds[:-1], bounds[1:]) if g == group])
+        for group in set(groups)
+    }
+
+    repeated = [group for group in set(groups) if counts[group] > 1]
+    chorus = max(repeated, key=group_loudness.get) if repeated else None
+
+    labels = []
+    for i, group in enumerate(groups):
+        if group == chorus:
+            labels.append("chorus")
+        elif counts[group] > 1:
+            labels.append("verse")
+        elif i == 0:
+            labels.append("intro")
+        elif i == len(groups) - 1:
+            labels.append("outro")
+        else:
+            labels.append("bridge")
+
+    return labels
+
+
+def _section(label: str, group: str, start: float, end: float) -> Dict:
+    return {"label": label, "group": group, "startTime": round(start, 2), "duration": round(end - start, 2)}
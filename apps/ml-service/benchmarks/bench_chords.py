@@ -0,0 +1,101 @@
+"""
+Chord matching benchmark: time to match chroma frames against chord
+vocabularies of increasing size (major/minor triads, a 45-chord table the
+size of the old hand-typed one, and the full generated vocabulary), using
+the blocked template product of match_chords. "legacy" is the previous
+matcher: a float64 product with the old table's size and no priors.
+Also times the callers whose cost the vocabulary could change: the
+/analyze chord stage (detect_chords, which scores key profiles and
+progressions, not frames) and practice grading (grade_chroma).
+
+Usage: python benchmarks/bench_chords.py [--frames 1000 10000 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analyzers.chord_detector import (
+    CHORD_MATRIX, CHORD_NAMES, MATCH_BLOCK_FRAMES, SCORING_MATRIX, detect_chords, match_chords
+)
+from analyzers.practice import grade_chroma
+
+
+def vocabularies():
+    """(name, row indices into SCORING_MATRIX) for each vocabulary size"""
+
+    # CHORD_NAMES is quality-major: the first 24 chords are the major and minor triads
+    return [
+        ("triads", list(range(24))),
+        ("legacy-45", list(range(45))),
+        ("full", list(range(len(CHORD_NAMES)))),
+    ]
+
+
+def match(chroma: np.ndarray, rows: list) -> np.ndarray:
+    """match_chords' argmax, restricted to a subset of the vocabulary"""
+
+    chroma = chroma.astype(np.float32)
+    extended = np.empty((len(chroma), 13), dtype=np.float32)
+    extended[:, :12] = chroma
+    extended[:, 12] = np.sqrt(np.einsum("ij,ij->i", chroma, chroma))
+    columns = np.ascontiguousarray(SCORING_MATRIX[rows].T)
+    best = np.empty(len(chroma), dtype=np.intp)
+    for start in range(0, len(chroma), MATCH_BLOCK_FRAMES):
+        block = slice(start, start + MATCH_BLOCK_FRAMES)
+        np.argmax(extended[block] @ columns, axis=1, out=best[block])
+    return best
+
+
+def legacy_match(chroma: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(chroma, axis=1, keepdims=True)
+    return np.argmax((chroma / np.maximum(norms, 1e-8)) @ CHORD_MATRIX[:45].T, axis=1)
+
+
+def best_of(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'frames':>8} {'vocabulary':>10} {'chords':>7} {'time_ms':>8} {'us/frame':>9}")
+    for frames in args.frames:
+        chroma = rng.random((frames, 12))
+        elapsed = best_of(legacy_match, chroma)
+        print(f"{frames:>8} {'legacy':>10} {45:>7} {elapsed * 1e3:>8.2f} {elapsed / frames * 1e6:>9.3f}")
+        for name, rows in vocabularies():
+            elapsed = best_of(match, chroma, rows)
+            print(f"{frames:>8} {name:>10} {len(rows):>7} {elapsed * 1e3:>8.2f} {elapsed / frames * 1e6:>9.3f}")
+
+    # The public entry point, including building the result list
+    chroma = rng.random((args.frames[-1], 12))
+    elapsed = best_of(match_chords, chroma)
+    print(f"match_chords over {args.frames[-1]} frames: {elapsed * 1e3:.2f} ms")
+
+    features = {"chroma_mean": rng.random(12).tolist(), "tempo": 120.0, "duration": 120.0,
+                "track_duration": 240.0}
+    elapsed = best_of(detect_chords, features, repeat=50)
+    print(f"detect_chords (/analyze chord stage): {elapsed * 1e6:.0f} us")
+
+    targets = [CHORD_NAMES[i] for i in rng.integers(len(CHORD_NAMES), size=1000)]
+    elapsed = best_of(grade_chroma, rng.random((1000, 12)), targets)
+    print(f"grade_chroma over 1000 attempts: {elapsed * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Decode and resample benchmark: time to load the analyzed excerpt of a
+stereo upload per format and native sample rate, for the previous path
+(librosa.load at 22.05 kHz plus librosa.get_duration) and load_audio at
+every resampler quality. The error column is the RMS difference from the
+previous path relative to its RMS.
+
+Usage: python benchmarks/bench_decoding.py [--duration 180] [--formats wav flac mp3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import librosa
+import soundfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analyzers.decoding import ANALYSIS_SAMPLE_RATE, RESAMPLER_QUALITIES, load_audio
+
+# Seconds decoded per track, as in iter_feature_stages
+EXCERPT = 120
+
+
+def synthetic_stereo(duration: float, sr: int) -> np.ndarray:
+    """Triads with harmonics and a little noise, slightly different per channel"""
+
+    rng = np.random.default_rng(sr)
+    t = np.arange(int(sr * duration)) / sr
+    y = sum(np.sin(2 * np.pi * f * h * t) / h for f in (261.63, 329.63, 392.00) for h in range(1, 5))
+    y = 0.2 * y / np.abs(y).max()
+    left = y + 0.01 * rng.standard_normal(len(t))
+    right = 0.8 * y + 0.01 * rng.standard_normal(len(t))
+    return np.stack([left, right], axis=1).astype(np.float32)
+
+
+def previous_load(path: str):
+    y, _ = librosa.load(path, sr=ANALYSIS_SAMPLE_RATE, duration=EXCERPT)
+    return y, float(librosa.get_duration(path=path))
+
+
+def best_of(fn, *args, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=180, help="length of the synthetic tracks")
+    parser.add_argument("--rates", type=int, nargs="+", default=[44100, 48000, 22050])
+    parser.add_argument("--formats", nargs="+", default=["wav", "flac", "mp3"])
+    args = parser.parse_args()
+
+    print(f"{'format':>6} {'rate':>6} {'path':>9} {'time_ms':>8} {'error':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rate in args.rates:
+            audio = synthetic_stereo(args.duration, rate)
+            for fmt in args.formats:
+                path = os.path.join(directory, f"track_{rate}.{fmt}")
+                soundfile.write(path, audio, rate)
+
+                (reference, _), elapsed = best_of(previous_load, path)
+                print(f"{fmt:>6} {rate:>6} {'previous':>9} {elapsed * 1e3:>8.1f} {'-':>8}")
+
+                for quality in RESAMPLER_QUALITIES:
+                    (y, _), elapsed = best_of(load_audio, path, ANALYSIS_SAMPLE_RATE, EXCERPT, quality)
+                    n = min(len(y), len(reference))
+                    error = np.sqrt(np.mean((y[:n] - reference[:n]) ** 2) / np.mean(reference[:n] ** 2))
+                    print(f"{fmt:>6} {rate:>6} {quality:>9} {elapsed * 1e3:>8.1f} {error:>8.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Response encoding benchmark: payload size, encode and decode time of the
+JSON, msgpack and Arrow IPC encodings for chord results of increasing
+timeline length (row-wise JSON is what /chords returns by default).
+Decode times include rebuilding the row-wise timeline from the columns.
+
+Usage: python benchmarks/bench_encoding.py [--entries 100 1000 10000 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from analyzers.chord_detector import CHORD_NOTES
+from encoding import (MSGPACK_AVAILABLE, PYARROW_AVAILABLE, decode_arrow, decode_msgpack,
+                      encode_arrow, encode_msgpack)
+
+
+def chord_result(entries: int) -> dict:
+    """A detect_chords-shaped result with a long, varied timeline"""
+
+    names = list(CHORD_NOTES)
+    timeline = []
+    for i in range(entries):
+        chord = names[(i * 7) % len(names)]
+        timeline.append({
+            "chord": chord,
+            "startTime": round(i * 0.5, 2),
+            "duration": 0.5,
+            "notes": CHORD_NOTES[chord],
+        })
+
+    return {
+        "progression": ["C", "G", "Am", "F"],
+        "timeline": timeline,
+        "key": "C",
+        "tempo": 120.0,
+        "difficulty": "intermediate",
+        "mode": "major",
+    }
+
+
+def best_of(fn, arg, repeat=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    args = parser.parse_args()
+
+    encodings = [("json", lambda p: json.dumps(p).encode(), lambda b: json.loads(b))]
+    if MSGPACK_AVAILABLE:
+        encodings.append(("msgpack", encode_msgpack, decode_msgpack))
+    if PYARROW_AVAILABLE:
+        encodings.append(("arrow", encode_arrow, decode_arrow))
+
+    print(f"{'entries':>8} {'format':>8} {'bytes':>10} {'ratio':>6} {'encode_ms':>10} {'decode_ms':>10}")
+    for entries in args.entries:
+        payload = chord_result(entries)
+        json_size = None
+        for name, encode, decode in encodings:
+            body, encode_s = best_of(encode, payload)
+            decoded, decode_s = best_of(decode, body)
+            assert len(decoded["timeline"]) == entries
+            json_size = json_size or len(body)
+            print(f"{entries:>8} {name:>8} {len(body):>10} {len(body) / json_size:>6.2f} "
+                  f"{encode_s * 1e3:>10.2f} {decode_s * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
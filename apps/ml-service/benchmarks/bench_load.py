@@ -0,0 +1,325 @@
+"""
+Local load test: starts the ML service with uvicorn, renders a corpus of
+synthetic tracks of varied lengths and formats, and drives concurrent
+/analyze, /chords/{file_id} and /health traffic shaped like the Node
+backend's (interactive analyses with a 120 s deadline, chord lookups for
+analyzed files, health checks). For each concurrency level it reports
+requests/s, p50/p95/p99 latency of successful requests per endpoint,
+error rate and the server's peak RSS. Each configuration runs for a fixed
+time against a fresh store, so runs can be compared.
+
+Usage: python benchmarks/bench_load.py [--concurrency 1 4 8] [--seconds 60]
+           [--mix analyze=1,chords=3,health=1] [--lengths 15 60 180]
+           [--formats wav flac mp3] [--reuse] [--json results.jsonl]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Client timeouts in seconds; /analyze matches the backend's AbortSignal
+TIMEOUTS = {"analyze": 120.0, "chords": 10.0, "health": 5.0}
+
+# Seconds between server RSS samples
+RSS_INTERVAL = 0.1
+
+# Failures a client can see: connection errors and timeouts (OSError) and
+# malformed or cut-off responses (HTTPException)
+REQUEST_ERRORS = (OSError, http.client.HTTPException)
+
+# Progressions of the corpus as (semitones above the tonic, third) per chord
+PROGRESSIONS = [
+    ((0, 4), (7, 4), (9, 3), (5, 4)),   # I-V-vi-IV
+    ((0, 4), (9, 3), (5, 4), (7, 4)),   # I-vi-IV-V
+    ((0, 4), (5, 4), (7, 4), (0, 4)),   # I-IV-V-I
+    ((2, 3), (7, 4), (0, 4), (0, 4)),   # ii-V-I
+    ((0, 3), (8, 4), (3, 4), (10, 4)),  # i-VI-III-VII
+    ((0, 3), (5, 3), (7, 4), (0, 3)),   # i-iv-V-i
+    ((0, 3), (10, 4), (8, 4), (7, 4)),  # Andalusian cadence
+]
+
+
+def synthetic_track(duration: float, sr: int, seed: int) -> np.ndarray:
+    """
+    A four-chord triad loop with a pulse and some noise. The progression,
+    tonic and bar length vary per seed, so corpus files are not transposed
+    copies of one another.
+    """
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sr * rng.uniform(1.6, 2.4))) / sr
+    tonic = 220.0 * 2 ** (rng.integers(12) / 12)
+    bars = []
+    for degree, third in PROGRESSIONS[seed % len(PROGRESSIONS)]:
+        root = tonic * 2 ** (degree / 12)
+        bar = sum(np.sin(2 * np.pi * root * 2 ** (step / 12) * t) for step in (0, third, 7)) / 3
+        bars.append(bar * (0.6 + 0.4 * np.exp(-8 * (t % 0.5))))
+    y = np.resize(np.concatenate(bars), int(sr * duration))
+    return (0.4 * y + 0.01 * rng.standard_normal(len(y))).astype(np.float32)
+
+
+def build_corpus(directory: str, lengths: List[float], formats: List[str]) -> List[str]:
+    """One file per length and format, alternating 44.1 kHz and 22.05 kHz"""
+
+    paths = []
+    for i, length in enumerate(lengths):
+        for j, fmt in enumerate(formats):
+            sr = 44100 if (i + j) % 2 == 0 else 22050
+            path = os.path.join(directory, f"track_{int(length)}s_{sr}.{fmt}")
+            soundfile.write(path, synthetic_track(length, sr, seed=i * len(formats) + j), sr)
+            paths.append(path)
+    return paths
+
+
+class Service:
+    """The ML service running under uvicorn in a child process"""
+
+    def __init__(self, port: int, store_dir: str):
+        env = dict(os.environ, ANALYSIS_STORE_DIR=store_dir)
+        self.port = port
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL
+        )
+        self.peak_rss = 0
+        self._sampling = threading.Event()
+
+    def wait_ready(self, timeout: float = 120.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("ML service exited during startup")
+            try:
+                if request(self.port, "GET", "/health", timeout=1.0)[0] == 200:
+                    return
+            except REQUEST_ERRORS:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("ML service did not become healthy")
+
+    def rss(self) -> Optional[int]:
+        """Resident set size in bytes (Linux only)"""
+
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    def start_sampling(self):
+        self.peak_rss = self.rss() or 0
+        self._sampling.clear()
+
+        def sample():
+            while not self._sampling.wait(RSS_INTERVAL):
+                self.peak_rss = max(self.peak_rss, self.rss() or 0)
+
+        threading.Thread(target=sample, daemon=True).start()
+
+    def stop_sampling(self) -> int:
+        self._sampling.set()
+        return self.peak_rss
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def request(port: int, method: str, path: str, body: Optional[Dict] = None, timeout: float = 10.0):
+    """(status, elapsed seconds, parsed JSON body or None)"""
+
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    start = time.perf_counter()
+    try:
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        elapsed = time.perf_counter() - start
+        try:
+            parsed = json.loads(data) if data else None
+        except ValueError:
+            parsed = None
+        return response.status, elapsed, parsed
+    finally:
+        connection.close()
+
+
+class LoadRun:
+    """Closed-loop clients sending a weighted mix of requests for a fixed time"""
+
+    def __init__(self, port: int, corpus: List[str], mix: Dict[str, float], reuse: bool, seed: int):
+        self.port = port
+        self.corpus = corpus
+        self.endpoints = list(mix)
+        self.weights = [mix[endpoint] for endpoint in self.endpoints]
+        self.reuse = reuse
+        # Latencies of successful requests; failed ones are only counted
+        self.samples: Dict[str, List[float]] = {endpoint: [] for endpoint in TIMEOUTS}
+        self.errors: Dict[str, int] = {endpoint: 0 for endpoint in TIMEOUTS}
+        self.analyzed: List[str] = []
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._seed = seed
+
+    def run(self, concurrency: int, seconds: float) -> float:
+        deadline = time.monotonic() + seconds
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for worker in range(concurrency):
+                pool.submit(self._client, random.Random(self._seed + worker), deadline)
+        return time.perf_counter() - start
+
+    def _client(self, rng: random.Random, deadline: float):
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(self.endpoints, self.weights)[0]
+            if endpoint == "chords" and not self.analyzed:
+                # Nothing to look up until the first analysis finishes
+                endpoint = "health"
+
+            try:
+                status, elapsed, _ = self._send(endpoint, rng)
+                ok = status < 400
+            except REQUEST_ERRORS:
+                ok, elapsed = False, None
+
+            with self._lock:
+                if ok:
+                    self.samples[endpoint].append(elapsed)
+                else:
+                    self.errors[endpoint] += 1
+
+    def _send(self, endpoint: str, rng: random.Random):
+        if endpoint == "analyze":
+            with self._lock:
+                self._counter += 1
+                file_id = f"load-{self._seed}-{self._counter}"
+            body = {
+                "file_path": rng.choice(self.corpus),
+                "file_id": file_id,
+                "priority": "interactive",
+                "deadline_ms": int(TIMEOUTS["analyze"] * 1000),
+                "reuse_duplicates": self.reuse,
+            }
+            result = request(self.port, "POST", "/analyze", body, TIMEOUTS["analyze"])
+            if result[0] == 200:
+                with self._lock:
+                    self.analyzed.append(file_id)
+            return result
+
+        if endpoint == "chords":
+            with self._lock:
+                file_id = rng.choice(self.analyzed)
+            return request(self.port, "GET", f"/chords/{file_id}", timeout=TIMEOUTS["chords"])
+
+        return request(self.port, "GET", "/health", timeout=TIMEOUTS["health"])
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else float("nan")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in TIMEOUTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{endpoint}', expected one of {list(TIMEOUTS)}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def report(concurrency: int, run: LoadRun, elapsed: float, peak_rss: int, args):
+    errors = dict(run.errors, all=sum(run.errors.values()))
+    rows = {endpoint: samples for endpoint, samples in run.samples.items() if samples or errors[endpoint]}
+    rows["all"] = [value for samples in run.samples.values() for value in samples]
+
+    result = {"concurrency": concurrency, "seconds": round(elapsed, 2), "mix": args.mix,
+              "reuse": args.reuse, "peakRssBytes": peak_rss, "endpoints": {}}
+
+    for endpoint, samples in rows.items():
+        requests = len(samples) + errors[endpoint]
+        stats = {
+            "requests": requests,
+            "errors": errors[endpoint],
+            "requestsPerSecond": requests / elapsed,
+            # Percentiles cover successful requests only
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "p99": percentile(samples, 99),
+            "errorRate": errors[endpoint] / requests if requests else 0.0,
+        }
+        result["endpoints"][endpoint] = stats
+        print(f"{concurrency:>4} {endpoint:>8} {stats['requests']:>8} {stats['requestsPerSecond']:>7.2f} "
+              f"{stats['p50'] * 1e3:>8.1f} {stats['p95'] * 1e3:>8.1f} {stats['p99'] * 1e3:>8.1f} "
+              f"{stats['errorRate']:>7.1%} {peak_rss / 1e6:>8.1f}")
+
+    if args.json:
+        with open(args.json, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--seconds", type=float, default=60, help="duration of each configuration")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("analyze=1,chords=3,health=1"),
+                        help="relative request weights per endpoint")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[15, 60, 180],
+                        help="track lengths of the corpus in seconds")
+    parser.add_argument("--formats", nargs="+", default=["wav", "flac", "mp3"])
+    parser.add_argument("--reuse", action="store_true",
+                        help="let the service reuse stored analyses of duplicate uploads")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="append one JSON result line per configuration to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_dir = os.path.join(directory, "corpus")
+        os.makedirs(corpus_dir)
+        corpus = build_corpus(corpus_dir, args.lengths, args.formats)
+        print(f"corpus: {len(corpus)} files in {corpus_dir}", file=sys.stderr)
+
+        print(f"{'conc':>4} {'endpoint':>8} {'requests':>8} {'req/s':>7} {'p50_ms':>8} "
+              f"{'p95_ms':>8} {'p99_ms':>8} {'errors':>7} {'peak_MB':>8}")
+
+        for concurrency in args.concurrency:
+            # A fresh service and store per configuration, so neither the
+            # stored analyses nor the RSS of one run carries into the next
+            service = Service(args.port, os.path.join(directory, f"store_{concurrency}"))
+            try:
+                service.wait_ready()
+                service.start_sampling()
+                run = LoadRun(args.port, corpus, args.mix, args.reuse, seed=concurrency)
+                elapsed = run.run(concurrency, args.seconds)
+                peak_rss = service.stop_sampling()
+            finally:
+                service.stop()
+
+            report(concurrency, run, elapsed, peak_rss, args)
+
+
+if __name__ == "__main__":
+    main()
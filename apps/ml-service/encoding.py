@@ -0,0 +1,203 @@
+"""
+Loopify Live - ML Service
+Response encodings: JSON (default), msgpack and Arrow IPC.
+Binary encodings store chord timelines column-wise with chord names
+dictionary-encoded, so each chord's notes are sent once per response
+instead of once per timeline entry.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Accept header media types mapped to encodings; wildcards get the default
+MEDIA_TYPES = {
+    "application/json": "json",
+    "application/*": "json",
+    "*/*": "json",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    ARROW_MEDIA_TYPE: "arrow",
+}
+
+
+def negotiate_format(accept: Optional[str], allow_arrow: bool = False) -> str:
+    """
+    Pick the response encoding from an Accept header: the supported media
+    type with the highest q-value, the earlier one on ties. Media types
+    with q=0 are refused.
+    Returns "json", "msgpack" or "arrow"; falls back to JSON when no
+    acceptable encoding's library is installed or the endpoint does not
+    support it (Arrow is only offered for chord timelines).
+    """
+
+    if not accept:
+        return "json"
+
+    ranked = []
+    for position, media_range in enumerate(accept.split(",")):
+        media_type, *params = media_range.split(";")
+        encoding = MEDIA_TYPES.get(media_type.strip().lower())
+        quality = _quality(params)
+        if quality > 0 and _available(encoding, allow_arrow):
+            ranked.append((-quality, position, encoding))
+
+    return min(ranked)[2] if ranked else "json"
+
+
+def _quality(params: List[str]) -> float:
+    """q-value of a media range's parameters; 1 when absent, 0 when malformed"""
+
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return min(max(float(value), 0.0), 1.0)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _available(encoding: Optional[str], allow_arrow: bool) -> bool:
+    if encoding == "msgpack":
+        return MSGPACK_AVAILABLE
+    if encoding == "arrow":
+        return allow_arrow and PYARROW_AVAILABLE
+    return encoding == "json"
+
+
+def to_columnar(payload: Dict) -> Dict:
+    """
+    Convert a result's row-wise "timeline" (list of chord dicts) into
+    parallel columns. Chord names become integer codes into
+    "chordDictionary", which also carries each chord's notes once.
+    Payloads without a timeline are returned unchanged.
+    """
+
+    timeline = payload.get("timeline")
+    if not isinstance(timeline, list):
+        return payload
+
+    names: List[str] = []
+    notes: List[List[str]] = []
+    codes: Dict[str, int] = {}
+    chord_column = []
+
+    for entry in timeline:
+        chord = entry["chord"]
+        if chord not in codes:
+            codes[chord] = len(names)
+            names.append(chord)
+            notes.append(entry.get("notes", []))
+        chord_column.append(codes[chord])
+
+    columnar = dict(payload)
+    columnar["timeline"] = {
+        "length": len(timeline),
+        "chord": chord_column,
+        "startTime": [entry["startTime"] for entry in timeline],
+        "duration": [entry["duration"] for entry in timeline],
+    }
+    columnar["chordDictionary"] = {"chord": names, "notes": notes}
+    return columnar
+
+
+def from_columnar(payload: Dict) -> Dict:
+    """Inverse of to_columnar: rebuild the row-wise timeline"""
+
+    if "chordDictionary" not in payload:
+        return payload
+
+    dictionary = payload["chordDictionary"]
+    columns = payload["timeline"]
+
+    rows = dict(payload)
+    del rows["chordDictionary"]
+    rows["timeline"] = [
+        {
+            "chord": dictionary["chord"][code],
+            "startTime": start,
+            "duration": duration,
+            "notes": dictionary["notes"][code],
+        }
+        for code, start, duration in zip(columns["chord"], columns["startTime"], columns["duration"])
+    ]
+    return rows
+
+
+def encode_msgpack(payload: Dict) -> bytes:
+    """Columnar msgpack; floats keep double precision, as in JSON"""
+
+    return msgpack.packb(to_columnar(payload))
+
+
+def decode_msgpack(data: bytes) -> Dict:
+    return from_columnar(msgpack.unpackb(data))
+
+
+def encode_arrow(payload: Dict) -> bytes:
+    """
+    Arrow IPC stream holding the timeline as one record batch with a
+    dictionary-encoded chord column. Every other field, including the
+    chord-to-notes dictionary, travels as JSON in the schema metadata.
+    """
+
+    columnar = to_columnar(payload)
+    columns = columnar.pop("timeline")
+    dictionary = columnar.pop("chordDictionary")
+    columnar["chordNotes"] = dict(zip(dictionary["chord"], dictionary["notes"]))
+
+    chord = pa.DictionaryArray.from_arrays(
+        pa.array(columns["chord"], type=pa.int16()), pa.array(dictionary["chord"], type=pa.string())
+    )
+    batch = pa.record_batch(
+        [chord,
+         pa.array(columns["startTime"], type=pa.float32()),
+         pa.array(columns["duration"], type=pa.float32())],
+        names=["chord", "startTime", "duration"],
+    )
+    schema = batch.schema.with_metadata({"payload": json.dumps(columnar)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+    return sink.getvalue().to_pybytes()
+
+
+def decode_arrow(data: bytes) -> Dict:
+    """Inverse of encode_arrow"""
+
+    table = pa.ipc.open_stream(data).read_all()
+    payload = json.loads(table.schema.metadata[b"payload"])
+    chord_notes = payload.pop("chordNotes")
+
+    payload["timeline"] = [
+        {"chord": chord, "startTime": start, "duration": duration, "notes": chord_notes[chord]}
+        for chord, start, duration in zip(
+            table.column("chord").to_pylist(),
+            table.column("startTime").to_pylist(),
+            table.column("duration").to_pylist(),
+        )
+    ]
+    return payload
+
+
+ENCODERS = {
+    "msgpack": (encode_msgpack, MSGPACK_MEDIA_TYPE),
+    "arrow": (encode_arrow, ARROW_MEDIA_TYPE),
+}
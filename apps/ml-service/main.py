@@ -3,15 +3,35 @@ Loopify Live - ML Service
 Audio analysis API using librosa and FastAPI
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import hmac
+import json
 import os
+import time
 
-from analyzers.audio_features import extract_audio_features
-from analyzers.scale_detector import detect_scale, detect_raga
+from analyzers.audio_features import (
+    FEATURE_STAGES, FeatureExtractionCancelled, extract_audio_features, iter_feature_stages
+)
+from analyzers.scale_detector import detect_scale, detect_raga, track_keys
 from analyzers.emotion_genre import classify_emotion, classify_genre
-from analyzers.chord_detector import detect_chords
+from analyzers.chord_detector import ChordTimeline, detect_chord_timeline
+from analyzers.chroma import CHROMA_BACKENDS
+from analyzers.fingerprint import FingerprintIndex
+from analyzers.practice import grade_attempts, load_attempt, template_name
+from analyzers.stems import analyze_stems, stem_threads
+from analyzers.pipeline import (
+    build_record, refresh_record, run_analyzers, stale_analyzers, stale_feature_stages
+)
+from encoding import ENCODERS, negotiate_format
+from profiling import ProfilerBusy, RequestProfiler
+from scheduler import PRIORITIES, AnalysisCancelled, AnalysisScheduler
+from store import ResultStore, check_file_id
 
 app = FastAPI(title="Loopify Live ML Service", version="1.0.0")
 
@@ -25,12 +45,86 @@ app.add_middleware(
 
 # In-memory cache for analysis results
 analysis_cache = {}
-chord_cache = {}
+chord_cache = {}  # file_id -> (chord summary, ChordTimeline)
+
+# Persistent analysis records, versioned for incremental re-analysis
+store = ResultStore()
+
+# Landmark fingerprints of stored recordings, for reusing the analysis of a
+# song uploaded again in another format or trimmed differently
+fingerprints = FingerprintIndex()
+
+# Admission for analysis work: one slot per worker, interactive before bulk
+scheduler = AnalysisScheduler(workers=int(os.environ.get("ANALYSIS_WORKERS", os.cpu_count() or 1)))
+
+# Stored records re-analyzed per batch of bulk jobs
+REANALYZE_BATCH = 64
+reanalysis_status = {
+    "running": False, "total": 0, "processed": 0, "updated": 0, "failed": 0, "unanalyzable": 0, "elapsed": 0.0
+}
+reanalysis_task = None
+
+# Token admin-only request options (such as profiling) must present in the
+# X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
 
 
 class AnalyzeRequest(BaseModel):
     file_path: str
     file_id: str
+    chroma_backend: Optional[str] = None  # quality tier: "cqt", "cqt_decimated" or "stft"
+    priority: str = "interactive"  # or "bulk" for re-analysis jobs
+    deadline_ms: Optional[int] = None  # defaults per priority class
+    reuse_duplicates: bool = False  # reuse a stored analysis of the same recording (opt-in; uploads send it)
+    profile: bool = False  # admin only: add a sampling profile to the response
+
+
+class KnownRecording(FeatureExtractionCancelled):
+    """Stops extraction once the fingerprint matches a stored recording"""
+    
+    def __init__(self, file_id):
+        super().__init__(file_id)
+        self.file_id = file_id
+
+
+class PracticeAttempt(BaseModel):
+    attempt_id: str
+    file_path: str
+    target_chord: str
+
+
+class GradeRequest(BaseModel):
+    attempts: List[PracticeAttempt]
+    priority: str = "interactive"
+    deadline_ms: Optional[int] = None
+
+
+# Largest batch of practice attempts graded in one request
+MAX_PRACTICE_ATTEMPTS = 1000
+
+
+class StemInput(BaseModel):
+    name: str  # mixer channel, e.g. "vocals" or "drums"
+    file_path: str
+
+
+class StemAnalyzeRequest(BaseModel):
+    song_id: str
+    stems: List[StemInput]
+    mix_path: Optional[str] = None  # beats are tracked on the sum of the stems if omitted
+    chroma_backend: Optional[str] = None
+    priority: str = "interactive"
+    deadline_ms: Optional[int] = None
+
+
+# Most stems analyzed together in one request
+MAX_STEMS = 16
+
+
+@app.on_event("startup")
+def load_fingerprints():
+    for record in store.records():
+        index_record(record)
 
 
 @app.get("/health")
@@ -38,76 +132,584 @@ def health_check():
     return {"status": "healthy", "service": "ml-service"}
 
 
+@app.get("/scheduler/stats")
+def scheduler_stats():
+    """Worker usage, queue depth and queue-wait percentiles per priority class"""
+    return scheduler.stats()
+
+
 @app.post("/analyze")
-async def analyze_audio(request: AnalyzeRequest):
+async def analyze_audio(request: AnalyzeRequest, http_request: Request, accept: Optional[str] = Header(None),
+                        x_admin_token: Optional[str] = Header(None)):
     """Complete audio analysis: scale, raga, emotion, genre"""
     
+    if request.profile:
+        require_admin(x_admin_token)
     if not os.path.exists(request.file_path):
         raise HTTPException(status_code=404, detail="Audio file not found")
+    validate_file_id(request.file_id)
+    validate_chroma_backend(request.chroma_backend)
+    validate_priority(request.priority)
+    job = submit_job(request)
     
+    analyze = profiled_analysis if request.profile else run_analysis
     try:
-        # Extract audio features
-        features = extract_audio_features(request.file_path)
+        analysis = await scheduler.run(job, lambda job: analyze(request, job), http_request.is_disconnected)
+        return render(analysis, accept)
         
-        # Run all analyzers
-        scale_result = detect_scale(features)
-        raga_result = detect_raga(features)
-        emotion_result = classify_emotion(features)
-        genre_result = classify_genre(features)
+    except AnalysisCancelled as e:
+        raise cancelled_error(e)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def require_admin(token):
+    """Reject the request unless it carries the ADMIN_TOKEN set for this service"""
+    
+    if not ADMIN_TOKEN or token is None or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def profiled_analysis(request, job):
+    """run_analysis under the sampling profiler; the profile is returned with the analysis"""
+    
+    with RequestProfiler() as profiler:
+        analysis = run_analysis(request, job, profiler=profiler)
+    return {**analysis, "profile": profiler.report()}
+
+
+def run_analysis(request, job, reuse_duplicates=None, profiler=None):
+    """The /analyze pipeline, run on a scheduler worker thread"""
+    
+    if reuse_duplicates is None:
+        reuse_duplicates = request.reuse_duplicates
+    stages = []
+    
+    def on_stage(stage, stage_features):
+        if profiler is not None:
+            profiler.mark_stage(stage)
         
-        analysis = {
-            "tempo": features.get("tempo", 120),
-            "key": scale_result.get("key", "C"),
-            "scale": scale_result.get("scale", "C Major"),
-            "raga": raga_result.get("raga", "Unknown"),
-            "emotion": emotion_result.get("emotion", "Neutral"),
-            "genre": genre_result.get("genre", "Unknown"),
-            "confidence": {
-                "scale": scale_result.get("confidence", 0.8),
-                "raga": raga_result.get("confidence", 0.6),
-                "emotion": emotion_result.get("confidence", 0.75),
-                "genre": genre_result.get("confidence", 0.7)
-            },
-            "features": {
-                "spectralCentroid": features.get("spectral_centroid", 2000),
-                "zeroCrossingRate": features.get("zero_crossing_rate", 0.1),
-                "rmsEnergy": features.get("rms_energy", 0.2)
-            },
-            "explanation": generate_explanation(scale_result, raga_result, emotion_result, genre_result, features)
-        }
+        # Stop between stages if the job is cancelled
+        job.check()
+        stages.append(stage)
         
-        # Cache the result
-        analysis_cache[request.file_id] = analysis
+        # After the cheap rhythm stage, skip the rest for a known song
+        if stage == "rhythm" and reuse_duplicates:
+            match = fingerprints.lookup(stage_features, exclude=[request.file_id])
+            if match is not None:
+                raise KnownRecording(match[0])
+    
+    try:
+        features = extract_audio_features(request.file_path, request.chroma_backend, on_stage=on_stage)
+    except KnownRecording as known:
+        original = store.get(known.file_id)
+        if original is None:
+            return run_analysis(request, job, reuse_duplicates=False, profiler=profiler)
         
-        # Also detect chords for learning mode
-        chords = detect_chords(features)
-        chord_cache[request.file_id] = chords
+        return save_record({
+            **original, "fileId": request.file_id, "filePath": request.file_path, "duplicateOf": known.file_id
+        })
+    
+    if len(stages) != len(FEATURE_STAGES):
+        stages = []  # mock features; build_record marks the record as such
+    
+    # Run all analyzers, including chords for learning mode
+    results = run_analyzers(features)
+    
+    return save_record(build_record(request.file_id, request.file_path, features, stages, results))
+
+
+def save_record(record):
+    """Persist an analysis record, refresh the caches and return its /analyze response"""
+    
+    features, results = record["features"], record["results"]
+    analysis = build_analysis(
+        features, results["scale"], results["raga"], results["emotion"], results["genre"], results.get("keys")
+    )
+    record["analysis"] = analysis
+    store.put(record)
+    
+    load_record(record)
+    index_record(record)
+    return analysis
+
+
+def load_record(record):
+    """Fill the in-memory caches from a stored analysis record"""
+    
+    chords = dict(record["results"]["chords"])
+    timeline = ChordTimeline.from_rows(chords.pop("timeline"))
+    
+    analysis_cache[record["fileId"]] = record["analysis"]
+    chord_cache[record["fileId"]] = (chords, timeline)
+
+
+@app.post("/analyze/stems")
+async def analyze_song_stems(request: StemAnalyzeRequest, http_request: Request,
+                             accept: Optional[str] = Header(None)):
+    """Analyze the stems of one song in parallel, with tempo and beats shared from the mix"""
+    
+    names = [stem.name for stem in request.stems]
+    if not 0 < len(names) <= MAX_STEMS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_STEMS} stems are required")
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail="Stem names must be unique")
+    missing = [path for path in [stem.file_path for stem in request.stems] + [request.mix_path]
+               if path is not None and not os.path.exists(path)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Audio file not found: {missing[0]}")
+    validate_chroma_backend(request.chroma_backend)
+    validate_priority(request.priority)
+    # The stems are analyzed on several threads; the job holds a slot for each
+    job = submit_job(request, stem_threads(len(names), request.mix_path is not None))
+    
+    def run(job):
+        stems = {stem.name: stem.file_path for stem in request.stems}
+        return analyze_stems(stems, request.mix_path, request.chroma_backend, check=job.check, threads=job.slots)
+    
+    try:
+        result = await scheduler.run(job, run, http_request.is_disconnected)
+        return render({"songId": request.song_id, **result}, accept)
         
-        return analysis
+    except AnalysisCancelled as e:
+        raise cancelled_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/practice/grade")
+async def grade_practice(request: GradeRequest, http_request: Request, accept: Optional[str] = Header(None)):
+    """Grade a batch of recorded chord attempts against their target chords"""
+    
+    if len(request.attempts) > MAX_PRACTICE_ATTEMPTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PRACTICE_ATTEMPTS} attempts per request")
+    unknown = sorted({a.target_chord for a in request.attempts if template_name(a.target_chord) is None})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown target chords: {unknown}")
+    validate_priority(request.priority)
+    job = submit_job(request)
+    
+    try:
+        results = await scheduler.run(job, lambda job: run_grading(request, job), http_request.is_disconnected)
+        return render({
+            "graded": len(results),
+            "correct": sum(1 for result in results if result.get("correct")),
+            "results": results
+        }, accept)
         
+    except AnalysisCancelled as e:
+        raise cancelled_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def run_grading(request, job):
+    """Decode every attempt, then grade the decodable ones in one batch"""
+    
+    results = [{"attemptId": attempt.attempt_id, "target": attempt.target_chord} for attempt in request.attempts]
+    clips, graded = [], []
+    
+    for i, attempt in enumerate(request.attempts):
+        job.check()
+        try:
+            clips.append(load_attempt(attempt.file_path))
+            graded.append(i)
+        except Exception as e:
+            # One unreadable recording does not fail the class; decoders do
+            # not always say why (audioread's NoBackendError has no message)
+            results[i].update(correct=False, error=str(e) or f"Could not decode the recording ({type(e).__name__})")
+    
+    job.check()
+    grades = grade_attempts(clips, [request.attempts[i].target_chord for i in graded])
+    for i, grade in zip(graded, grades):
+        results[i].update(grade)
+    
+    return results
+
+
+def validate_priority(priority):
+    """Reject unknown priority classes before any work is queued"""
+    
+    if priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown priority '{priority}', expected one of {list(PRIORITIES)}"
+        )
+
+
+def submit_job(request, slots=1):
+    """Queue an analysis request with the scheduler, holding `slots` worker slots"""
+    
+    deadline = request.deadline_ms / 1000 if request.deadline_ms is not None else None
+    return scheduler.submit(request.priority, deadline, slots)
+
+
+def cancelled_error(error):
+    """HTTP error for a job dropped by the scheduler"""
+    
+    if error.reason == "deadline":
+        return HTTPException(status_code=504, detail="Analysis deadline exceeded")
+    return HTTPException(status_code=499, detail="Client disconnected")
+
+
+def index_record(record):
+    """Add a stored recording's fingerprint to the duplicate index"""
+    
+    # Fingerprints from an older rhythm stage are not comparable; re-analysis replaces them
+    if "rhythm" in stale_feature_stages(record) or record.get("duplicateOf"):
+        return
+    fingerprints.add(record["fileId"], record["features"])
+
+
+# Streaming events in emission order, with the feature keys each one needs.
+# An event is sent as soon as the extraction stages providing its keys finish.
+STREAM_EVENTS = [
+    ("tempo", ("tempo", "rms_energy", "spectral_centroid", "zero_crossing_rate")),
+    ("emotion", ("tempo", "spectral_centroid", "rms_energy")),
+    ("key", ("chroma_mean",)),
+    ("raga", ("chroma_mean",)),
+    ("keys", ("chroma_blocks",)),
+    ("genre", ("tempo", "spectral_bandwidth", "zero_crossing_rate", "mfcc_mean")),
+    ("structure", ("sections",)),
+    ("chords", ("chroma_mean", "tempo", "track_duration")),
+]
+
+
+@app.post("/analyze/stream")
+async def analyze_audio_stream(request: AnalyzeRequest):
+    """Progressive audio analysis as Server-Sent Events, one event per finished stage"""
+    
+    if not os.path.exists(request.file_path):
+        raise HTTPException(status_code=404, detail="Audio file not found")
+    validate_stream_options(request)
+    validate_file_id(request.file_id)
+    validate_chroma_backend(request.chroma_backend)
+    validate_priority(request.priority)
+    
+    async def event_stream():
+        # The job is queued only once the response starts streaming, and
+        # each stage runs on a scheduler worker; a disconnect cancels this
+        # generator, so no further stage is started
+        job = submit_job(request)
+        try:
+            await scheduler.wait_for_slot(job)
+        except AnalysisCancelled as e:
+            yield sse_event("error", {"detail": cancelled_error(e).detail})
+            return
+        
+        events = iter_analysis_events(request.file_path, request.file_id, request.chroma_backend)
+        loop = asyncio.get_running_loop()
+        stage = None
+        finished = failed = False
+        try:
+            while True:
+                try:
+                    job.check()
+                except AnalysisCancelled as e:
+                    yield sse_event("error", {"detail": cancelled_error(e).detail})
+                    return
+                
+                # Shielded, so a disconnect does not mark the stage done while its thread still runs
+                stage = loop.run_in_executor(scheduler.executor, next, events, None)
+                item = await asyncio.shield(stage)
+                if item is None:
+                    finished = True
+                    return
+                failed = item[0] == "error"
+                yield sse_event(*item)
+        finally:
+            if not finished:
+                job.cancel("disconnected")
+            if stage is not None and not stage.done():
+                # The slot stays taken until the worker thread finishes its stage
+                stage.add_done_callback(lambda _: scheduler.release(job, failed))
+            else:
+                scheduler.release(job, failed)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def iter_analysis_events(file_path, file_id, chroma_backend=None):
+    """
+    Run the analysis pipeline and yield (event, payload) pairs as results
+    become available, finishing with the complete "analysis" event.
+    Failures are reported as an "error" event instead of raising.
+    """
+    
+    features = {}
+    stages = []
+    results = {}
+    
+    try:
+        for stage, stage_features in iter_feature_stages(file_path, chroma_backend):
+            features.update(stage_features)
+            stages.append(stage)
+            
+            for event, required in STREAM_EVENTS:
+                if event in results or not all(key in features for key in required):
+                    continue
+                results[event], payload = run_stream_event(event, features)
+                yield event, payload
+        
+        summary, timeline = results["chords"]
+        analyzer_results = {
+            "scale": results["key"],
+            "raga": results["raga"],
+            "emotion": results["emotion"],
+            "genre": results["genre"],
+            "keys": results.get("keys") or track_keys(features),
+            "chords": {**summary, "timeline": timeline.query()},
+        }
+        stages = [stage for stage in stages if stage in FEATURE_STAGES]
+        
+        yield "analysis", save_record(build_record(file_id, file_path, features, stages, analyzer_results))
+        
+    except Exception as e:
+        # Some decoders raise without a message (audioread's NoBackendError)
+        yield "error", {"detail": str(e) or f"Analysis failed ({type(e).__name__})"}
+
+
+def run_stream_event(event, features):
+    """Run the analyzer behind a streaming event, returning (result, payload)"""
+    
+    if event == "tempo":
+        payload = {
+            "tempo": features["tempo"],
+            "features": {
+                "spectralCentroid": features["spectral_centroid"],
+                "zeroCrossingRate": features["zero_crossing_rate"],
+                "rmsEnergy": features["rms_energy"]
+            }
+        }
+        return payload, payload
+    
+    if event == "key":
+        result = detect_scale(features)
+        return result, {"key": result["key"], "scale": result["scale"], "confidence": result["confidence"]}
+    
+    if event == "raga":
+        result = detect_raga(features)
+        return result, {"raga": result["raga"], "confidence": result["confidence"]}
+    
+    if event == "keys":
+        result = track_keys(features)
+        return result, {"keyTimeline": result["timeline"], "modulations": result["modulations"]}
+    
+    if event == "emotion":
+        result = classify_emotion(features)
+        return result, result
+    
+    if event == "genre":
+        result = classify_genre(features)
+        return result, result
+    
+    if event == "structure":
+        payload = {"sections": features["sections"]}
+        return payload, payload
+    
+    if event == "chords":
+        summary, timeline = detect_chord_timeline(features)
+        return (summary, timeline), {**summary, "timeline": timeline.query()}
+    
+    raise ValueError(f"Unknown stream event: {event}")
+
+
+def validate_stream_options(request):
+    """Reject /analyze options the streaming endpoint does not support before any work is done"""
+    
+    unsupported = [option for option in ("profile", "reuse_duplicates") if getattr(request, option)]
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail=f"/analyze/stream does not support {', '.join(unsupported)}; use /analyze"
+        )
+
+
+def validate_file_id(file_id):
+    """Reject file ids the result store cannot hold before any work is done"""
+    
+    try:
+        check_file_id(file_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def validate_chroma_backend(chroma_backend):
+    """Reject unknown chroma backends before any work is done"""
+    
+    if chroma_backend is not None and chroma_backend not in CHROMA_BACKENDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown chroma_backend '{chroma_backend}', expected one of {sorted(CHROMA_BACKENDS)}"
+        )
+
+
+def build_analysis(features, scale_result, raga_result, emotion_result, genre_result, keys_result=None):
+    """Assemble the /analyze response from feature and analyzer results"""
+    
+    keys_result = keys_result or {}
+    return {
+        "tempo": features.get("tempo", 120),
+        "key": scale_result.get("key", "C"),
+        "scale": scale_result.get("scale", "C Major"),
+        "raga": raga_result.get("raga", "Unknown"),
+        "emotion": emotion_result.get("emotion", "Neutral"),
+        "genre": genre_result.get("genre", "Unknown"),
+        "confidence": {
+            "scale": scale_result.get("confidence", 0.8),
+            "raga": raga_result.get("confidence", 0.6),
+            "emotion": emotion_result.get("confidence", 0.75),
+            "genre": genre_result.get("confidence", 0.7)
+        },
+        "features": {
+            "spectralCentroid": features.get("spectral_centroid", 2000),
+            "zeroCrossingRate": features.get("zero_crossing_rate", 0.1),
+            "rmsEnergy": features.get("rms_energy", 0.2)
+        },
+        "sections": features.get("sections", []),
+        "keyTimeline": keys_result.get("timeline", []),
+        "modulations": keys_result.get("modulations", []),
+        "explanation": generate_explanation(scale_result, raga_result, emotion_result, genre_result, features)
+    }
+
+
 @app.get("/chords/{file_id}")
-async def get_chords(file_id: str):
-    """Get chord progression for a previously analyzed file"""
+async def get_chords(
+    file_id: str,
+    start: Optional[float] = Query(None, ge=0, description="Window start in seconds"),
+    end: Optional[float] = Query(None, ge=0, description="Window end in seconds"),
+    accept: Optional[str] = Header(None)
+):
+    """Get chord progression for a previously analyzed file, optionally for a time window only"""
+    
+    if start is not None and end is not None and end <= start:
+        raise HTTPException(status_code=400, detail="end must be greater than start")
+    
+    if file_id not in chord_cache:
+        record = store.get(file_id)
+        if record is not None:
+            load_record(record)
     
     if file_id in chord_cache:
-        return chord_cache[file_id]
+        summary, timeline = chord_cache[file_id]
+    else:
+        # Return mock chords if not cached
+        summary, timeline = MOCK_CHORDS
     
-    # Return mock chords if not cached
-    return {
+    chords = {**summary, "duration": round(timeline.end_time, 2), "timeline": timeline.query(start, end)}
+    return render(chords, accept, allow_arrow=True)
+
+
+@app.post("/reanalyze", status_code=202)
+async def start_reanalysis():
+    """
+    Bring every stored analysis up to date in the background, as bulk jobs.
+    Only feature stages and analyzers whose version changed since a record
+    was stored are recomputed; the rest is reused from the record.
+    """
+    global reanalysis_task
+    
+    if reanalysis_status["running"]:
+        raise HTTPException(status_code=409, detail="Re-analysis already running")
+    
+    reanalysis_status.update(running=True, total=0, processed=0, updated=0, failed=0, unanalyzable=0, elapsed=0.0)
+    reanalysis_task = asyncio.create_task(reanalyze_stored())
+    return reanalysis_status
+
+
+@app.get("/reanalyze")
+def reanalysis_progress():
+    """Progress of the current or last re-analysis run"""
+    return reanalysis_status
+
+
+async def reanalyze_stored():
+    """Re-analyze stored records in batches of bulk scheduler jobs"""
+    
+    start = time.monotonic()
+    try:
+        file_ids = store.ids()
+        reanalysis_status["total"] = len(file_ids)
+        
+        for i in range(0, len(file_ids), REANALYZE_BATCH):
+            await asyncio.gather(*(reanalyze_one(file_id) for file_id in file_ids[i:i + REANALYZE_BATCH]))
+            reanalysis_status["elapsed"] = round(time.monotonic() - start, 3)
+    finally:
+        reanalysis_status["running"] = False
+        reanalysis_status["elapsed"] = round(time.monotonic() - start, 3)
+
+
+async def reanalyze_one(file_id):
+    record = store.get(file_id)
+    
+    try:
+        if record is None:
+            raise ValueError("record could not be read")
+        
+        # Records of files that could not be decoded hold mock features; skipped, not retried
+        if record.get("mockFeatures"):
+            reanalysis_status["unanalyzable"] += 1
+        
+        # Up-to-date records never take a worker slot
+        elif stale_feature_stages(record) or stale_analyzers(record):
+            job = scheduler.submit("bulk")
+            if await scheduler.run(job, lambda job: refresh_and_save(record, job)):
+                reanalysis_status["updated"] += 1
+    
+    except Exception as e:
+        print(f"Error re-analyzing {file_id}: {e}")
+        reanalysis_status["failed"] += 1
+    
+    reanalysis_status["processed"] += 1
+
+
+def refresh_and_save(record, job):
+    """Recompute a record's stale parts on a scheduler worker thread"""
+    
+    refreshed = refresh_record(record, on_stage=job.check)
+    if refreshed is None:
+        return False
+    
+    save_record(refreshed)
+    return True
+
+
+MOCK_CHORDS = (
+    {
         "progression": ["C", "G", "Am", "F"],
-        "timeline": [
-            {"chord": "C", "startTime": 0, "duration": 4, "notes": ["C", "E", "G"]},
-            {"chord": "G", "startTime": 4, "duration": 4, "notes": ["G", "B", "D"]},
-            {"chord": "Am", "startTime": 8, "duration": 4, "notes": ["A", "C", "E"]},
-            {"chord": "F", "startTime": 12, "duration": 4, "notes": ["F", "A", "C"]}
-        ],
         "key": "C",
         "difficulty": "beginner"
-    }
+    },
+    ChordTimeline.from_rows([
+        {"chord": "C", "startTime": 0, "duration": 4},
+        {"chord": "G", "startTime": 4, "duration": 4},
+        {"chord": "Am", "startTime": 8, "duration": 4},
+        {"chord": "F", "startTime": 12, "duration": 4}
+    ])
+)
+
+
+def render(payload, accept, allow_arrow=False):
+    """Encode a result as JSON (default) or a binary format chosen by the Accept header"""
+    
+    # Every negotiated response varies by Accept, JSON included, so caches
+    # never serve one encoding to a client that asked for another
+    encoding = negotiate_format(accept, allow_arrow)
+    if encoding == "json":
+        return JSONResponse(jsonable_encoder(payload), headers={"Vary": "Accept"})
+    
+    encode, media_type = ENCODERS[encoding]
+    return Response(content=encode(payload), media_type=media_type, headers={"Vary": "Accept"})
 
 
 def generate_explanation(scale, raga, emotion, genre, features):
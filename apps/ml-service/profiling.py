@@ -0,0 +1,111 @@
+"""
+Loopify Live - ML Service
+On-demand profiling of a single analysis request.
+A sampler thread records the stack of the thread running the analysis at
+a fixed interval, producing collapsed stacks ("frame;frame;frame count")
+that flamegraph.pl, speedscope and similar tools read directly. tracemalloc
+measures the allocation peak of each feature-extraction stage. Nothing here
+runs unless a request asks for a profile.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+
+# Seconds between stack samples
+PROFILE_INTERVAL = 0.005
+
+# tracemalloc is process-wide, so one profiled request runs at a time
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another request is already being profiled"""
+
+
+class RequestProfiler:
+    """
+    Context manager profiling the thread that enters it.
+    Call mark_stage as each feature-extraction stage finishes to record its
+    allocation peak. Allocations from other threads (concurrent requests)
+    count towards the peaks too, and tracemalloc slows allocation-heavy code
+    down, so timings are best read relative to each other.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.stage_peaks: Dict[str, int] = {}
+        self.samples = 0
+        self.elapsed = 0.0
+        self._thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._stage_start = 0
+        self._start = 0.0
+
+    def __enter__(self):
+        if not _profile_lock.acquire(blocking=False):
+            raise ProfilerBusy("another request is being profiled")
+
+        self._thread_id = threading.get_ident()
+        tracemalloc.start()
+        self._stage_start = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+
+        self._sampler = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._sampler.join()
+        self.elapsed = time.perf_counter() - self._start
+        tracemalloc.stop()
+        _profile_lock.release()
+        return False
+
+    def mark_stage(self, stage: str):
+        """Record the allocation peak since the previous stage finished"""
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.stage_peaks[stage] = peak - self._stage_start
+        tracemalloc.reset_peak()
+        self._stage_start = current
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one "root;...;leaf count" line per distinct stack"""
+
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.stacks.items()))
+
+    def report(self) -> Dict:
+        return {
+            "elapsed": round(self.elapsed, 3),
+            "samples": self.samples,
+            "intervalMs": self.interval * 1000,
+            "stagePeakBytes": dict(self.stage_peaks),
+            "collapsedStacks": self.collapsed(),
+        }
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
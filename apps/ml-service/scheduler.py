@@ -0,0 +1,219 @@
+"""
+Loopify Live - ML Service
+Priority-aware scheduler for analysis work.
+A fixed number of worker slots is handed out in priority order to
+interactive uploads and bulk re-analysis jobs; a job that runs on several
+threads (stem analysis) holds one slot per thread. Jobs are cancelled while
+queued, or between feature-extraction stages while running, when their
+deadline passes or the caller disconnects.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from analyzers.audio_features import FeatureExtractionCancelled
+
+
+PRIORITIES = ("interactive", "bulk")
+
+# Jobs are ordered by arrival time plus this offset, so bulk work queues as
+# if it had arrived 30s later: interactive requests go first, but a bulk job
+# never waits behind interactive work that arrived more than 30s after it.
+PRIORITY_OFFSETS = {"interactive": 0.0, "bulk": 30.0}
+
+# Default deadlines in seconds from submission (None = no deadline)
+DEFAULT_DEADLINES = {"interactive": 120.0, "bulk": None}
+
+# How often waiting callers check for disconnects and expired deadlines
+POLL_INTERVAL = 0.1
+
+# Queue-wait samples kept per priority class for percentiles
+WAIT_SAMPLES = 1000
+
+
+class AnalysisCancelled(FeatureExtractionCancelled):
+    """A job was dropped; reason is 'deadline' or 'disconnected'"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AnalysisJob:
+    """One unit of scheduled work and its cancellation state"""
+
+    def __init__(self, priority: str, deadline: Optional[float], slots: int = 1):
+        self.priority = priority
+        self.slots = slots
+        self.enqueued_at = time.monotonic()
+        self.deadline = None if deadline is None else self.enqueued_at + deadline
+        self.started_at: Optional[float] = None
+        self.cancel_reason: Optional[str] = None
+        self.slot = asyncio.get_running_loop().create_future()
+
+    def cancel(self, reason: str):
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+
+    def check(self, *_):
+        """
+        Raise AnalysisCancelled if the job was cancelled or is past its
+        deadline. Safe to call from the worker thread, e.g. as the
+        on_stage hook of extract_audio_features.
+        """
+        if self.cancel_reason is None and self.deadline is not None and time.monotonic() > self.deadline:
+            self.cancel_reason = "deadline"
+        if self.cancel_reason is not None:
+            raise AnalysisCancelled(self.cancel_reason)
+
+
+class AnalysisScheduler:
+    """
+    Hands out `workers` slots in priority order and runs slotted work on
+    its own thread pool. All methods except AnalysisJob.check must be
+    called from the event loop.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self.running = 0
+        self._queue = []  # heap of (virtual arrival time, sequence, job)
+        self._sequence = itertools.count()
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+        self._outcomes = {
+            priority: {"completed": 0, "failed": 0, "deadline": 0, "disconnected": 0} for priority in PRIORITIES
+        }
+
+    def submit(self, priority: str = "interactive", deadline: Optional[float] = None,
+               slots: int = 1) -> AnalysisJob:
+        """
+        Queue a job; deadline is in seconds, defaulting per priority class.
+        slots is the number of threads the job runs on, at most `workers`.
+        """
+
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        job = AnalysisJob(priority, deadline if deadline is not None else DEFAULT_DEADLINES[priority],
+                          min(max(slots, 1), self.workers))
+        order = job.enqueued_at + PRIORITY_OFFSETS[priority]
+        heapq.heappush(self._queue, (order, next(self._sequence), job))
+        self._dispatch()
+        return job
+
+    async def wait_for_slot(self, job: AnalysisJob,
+                            is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None):
+        """
+        Wait until the job is granted a slot. If the deadline passes or the
+        caller disconnects first, the job leaves the queue and
+        AnalysisCancelled is raised.
+        """
+
+        try:
+            while not job.slot.done():
+                await asyncio.wait([job.slot], timeout=POLL_INTERVAL)
+                if not job.slot.done():
+                    await self._check(job, is_disconnected)
+
+        except AnalysisCancelled:
+            if job.slot.cancel():
+                self._outcomes[job.priority][job.cancel_reason] += 1  # _dispatch skips it
+            else:
+                self.release(job)  # granted while the disconnect check was awaited
+            raise
+
+        except asyncio.CancelledError:
+            # The waiting task itself was cancelled (e.g. server shutdown)
+            job.cancel("disconnected")
+            if job.slot.cancel():
+                self._outcomes[job.priority]["disconnected"] += 1
+            else:
+                self.release(job)  # granted just before the cancellation landed
+            raise
+
+    async def run(self, job: AnalysisJob, fn: Callable[[AnalysisJob], object],
+                  is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None):
+        """
+        Run fn(job) on a worker thread once the job has a slot and return
+        its result. fn should call job.check between units of work. On
+        cancellation AnalysisCancelled is raised at once; the slot is freed
+        when the worker thread reaches its next check.
+        """
+
+        await self.wait_for_slot(job, is_disconnected)
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, fn, job)
+        future.add_done_callback(lambda f: self._finish(job, f))
+
+        while True:
+            done, _ = await asyncio.wait([future], timeout=POLL_INTERVAL)
+            if done:
+                return future.result()
+            await self._check(job, is_disconnected)
+
+    def release(self, job: AnalysisJob, failed: bool = False):
+        """Return the slot of a job that was run outside of run(); failed if its work raised"""
+        self._finish(job, None, failed)
+
+    def stats(self) -> Dict:
+        """Slot usage, queue depth, outcomes and queue-wait percentiles per class"""
+
+        queued = {priority: 0 for priority in PRIORITIES}
+        for _, _, job in self._queue:
+            if not job.slot.done():
+                queued[job.priority] += 1
+
+        classes = {}
+        for priority in PRIORITIES:
+            waits = np.array(self._waits[priority]) * 1000
+            classes[priority] = {
+                "queued": queued[priority],
+                **self._outcomes[priority],
+                "queueWaitMs": {
+                    "samples": int(waits.size),
+                    "p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                    "p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+                    "p99": float(np.percentile(waits, 99)) if waits.size else 0.0,
+                }
+            }
+
+        return {"workers": self.workers, "running": self.running, "classes": classes}
+
+    async def _check(self, job: AnalysisJob, is_disconnected):
+        if is_disconnected is not None and await is_disconnected():
+            job.cancel("disconnected")
+        job.check()
+
+    def _dispatch(self):
+        # Strictly in order: a multi-slot job at the head waits for enough
+        # free slots instead of being overtaken by single-slot jobs
+        while self._queue:
+            job = self._queue[0][2]
+            if job.slot.done():
+                heapq.heappop(self._queue)  # cancelled while queued
+                continue
+            if self.running + job.slots > self.workers:
+                break
+
+            heapq.heappop(self._queue)
+            self.running += job.slots
+            job.started_at = time.monotonic()
+            self._waits[job.priority].append(job.started_at - job.enqueued_at)
+            job.slot.set_result(None)
+
+    def _finish(self, job: AnalysisJob, future, failed: bool = False):
+        if future is not None and not future.cancelled():
+            # Retrieved here so cancelled runs don't log it
+            failed = future.exception() is not None
+
+        self.running -= job.slots
+        self._outcomes[job.priority][job.cancel_reason or ("failed" if failed else "completed")] += 1
+        self._dispatch()
@@ -0,0 +1,94 @@
+"""
+Loopify Live - ML Service
+Persistent store for analysis records, one JSON file per file_id.
+Records survive restarts and carry the feature and analyzer versions that
+produced them, so re-analysis can tell which parts are out of date.
+"""
+
+import base64
+import binascii
+import json
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+
+
+DEFAULT_STORE_DIR = os.environ.get(
+    "ANALYSIS_STORE_DIR", os.path.join(os.path.dirname(__file__), "analysis_store")
+)
+
+# Longest file id, in UTF-8 bytes, whose encoded file name fits in 255 bytes
+MAX_FILE_ID_BYTES = 150
+
+
+class ResultStore:
+    """Analysis records on disk; writes are atomic so readers never see partial files"""
+
+    def __init__(self, directory: str = DEFAULT_STORE_DIR):
+        self.directory = directory
+        self.records_dir = os.path.join(directory, "records")
+        os.makedirs(self.records_dir, exist_ok=True)
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(file_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, record: Dict):
+        path = self._path(record["fileId"])
+        # One temporary file per writing thread; its short name leaves the
+        # full length limit to the record's own name
+        tmp_path = os.path.join(self.records_dir, f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def ids(self) -> List[str]:
+        """Stored file ids, in directory order, from the file names alone"""
+
+        ids = []
+        for name in os.listdir(self.records_dir):
+            if name.endswith(".json"):
+                file_id = _decode_name(name[:-len(".json")])
+                if file_id is not None:
+                    ids.append(file_id)
+        return ids
+
+    def records(self) -> Iterator[Dict]:
+        """Every readable stored record, in directory order"""
+        for file_id in self.ids():
+            record = self.get(file_id)
+            if record is not None:
+                yield record
+
+    def _path(self, file_id: str) -> str:
+        return os.path.join(self.records_dir, f"{_encode_name(file_id)}.json")
+
+
+def check_file_id(file_id: str):
+    """Raise ValueError for a file id the store cannot hold"""
+
+    if not 0 < len(file_id.encode("utf-8")) <= MAX_FILE_ID_BYTES:
+        raise ValueError(f"file_id must be 1 to {MAX_FILE_ID_BYTES} bytes long (UTF-8)")
+
+
+def _encode_name(file_id: str) -> str:
+    """
+    File name of a file id. File ids come from clients: unpadded lowercase
+    base32 of the id maps every id to its own safe name, also on
+    case-insensitive file systems, and can be decoded back.
+    """
+
+    check_file_id(file_id)
+    return base64.b32encode(file_id.encode("utf-8")).decode("ascii").rstrip("=").lower()
+
+
+def _decode_name(name: str) -> Optional[str]:
+    """Inverse of _encode_name; None for names it did not produce"""
+
+    try:
+        return base64.b32decode(name.upper() + "=" * (-len(name) % 8)).decode("utf-8")
+    except (binascii.Error, ValueError):
+        return None
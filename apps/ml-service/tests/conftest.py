@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import the service modules the way main.py does
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Importing main opens the result store; keep it out of the source tree
+os.environ.setdefault("ANALYSIS_STORE_DIR", tempfile.mkdtemp(prefix="analysis_store_"))
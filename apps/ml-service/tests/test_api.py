@@ -0,0 +1,130 @@
+"""
+Service endpoints: request validation before any work is queued, the
+Server-Sent Events of /analyze/stream, and practice grading.
+"""
+
+import asyncio
+import json
+
+import numpy as np
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+
+import main  # noqa: E402
+from store import MAX_FILE_ID_BYTES, ResultStore  # noqa: E402
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "store", ResultStore(str(tmp_path / "store")))
+    monkeypatch.setattr(main, "analysis_cache", {})
+    monkeypatch.setattr(main, "chord_cache", {})
+    monkeypatch.setattr(main, "fingerprints", main.FingerprintIndex())
+    monkeypatch.setattr(main, "scheduler", main.AnalysisScheduler(workers=1))
+    audio = tmp_path / "song.wav"
+    audio.write_bytes(b"")
+    return str(audio)
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """Twelve seconds of a pulsing C major chord"""
+
+    soundfile = pytest.importorskip("soundfile")
+    pytest.importorskip("librosa")
+    t = np.arange(22050 * 12) / 22050
+    pulse = 1 + 0.5 * np.sign(np.sin(2 * np.pi * 2 * t))
+    path = tmp_path / "recording.wav"
+    soundfile.write(str(path), 0.2 * pulse * sum(np.sin(2 * np.pi * f * t) for f in (261.6, 329.6, 392.0)), 22050)
+    return str(path)
+
+
+def sse_events(text):
+    """(event, payload) pairs of a Server-Sent Events body"""
+
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def post(path, body):
+    async def request():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    return asyncio.run(request())
+
+
+@pytest.mark.parametrize("path", ["/analyze", "/analyze/stream"])
+@pytest.mark.parametrize("file_id", ["", "x" * (MAX_FILE_ID_BYTES + 1), "é" * (MAX_FILE_ID_BYTES // 2 + 1)])
+def test_unstorable_file_id_is_rejected_before_queuing(service, path, file_id):
+    response = post(path, {"file_path": service, "file_id": file_id})
+
+    assert response.status_code == 400
+    assert "file_id" in response.json()["detail"]
+    assert main.scheduler.stats()["classes"]["interactive"]["completed"] == 0
+
+
+def test_undecodable_attempt_does_not_fail_the_batch(service, tmp_path):
+    soundfile = pytest.importorskip("soundfile")
+    pytest.importorskip("librosa")
+    t = np.arange(22050) / 22050
+    played = tmp_path / "played.wav"
+    soundfile.write(str(played), 0.2 * sum(np.sin(2 * np.pi * f * t) for f in (261.6, 329.6, 392.0)), 22050)
+    broken = tmp_path / "broken.wav"
+    broken.write_bytes(b"not audio")
+
+    response = post("/practice/grade", {"attempts": [
+        {"attempt_id": "1", "file_path": str(broken), "target_chord": "C"},
+        {"attempt_id": "2", "file_path": str(played), "target_chord": "C"},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["graded"], body["correct"]) == (2, 1)
+    broken_result, played_result = body["results"]
+    assert broken_result["attemptId"] == "1" and not broken_result["correct"] and broken_result["error"]
+    assert played_result["attemptId"] == "2" and played_result["detected"] == "C"
+
+
+def test_stream_sends_each_result_as_its_stage_finishes(service, recording):
+    response = post("/analyze/stream", {"file_path": recording, "file_id": "recording"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    # rhythm, then chroma, timbre and structure stages; the full record last
+    assert [event for event, _ in events] == [
+        "tempo", "emotion", "key", "raga", "keys", "chords", "genre", "structure", "analysis"
+    ]
+
+    payloads = dict(events)
+    assert payloads["key"]["scale"] == payloads["analysis"]["scale"] == "C Major"
+    assert payloads["chords"]["timeline"]
+    assert main.store.get("recording")["analysis"] == payloads["analysis"]
+    assert main.scheduler.stats()["running"] == 0
+
+
+def test_stream_reports_a_failure_as_an_error_event(service):
+    # service is an empty file: it exists, but cannot be decoded
+    response = post("/analyze/stream", {"file_path": service, "file_id": "empty"})
+
+    assert response.status_code == 200
+    (event, payload), = sse_events(response.text)
+    assert event == "error" and payload["detail"]
+    assert main.store.get("empty") is None
+    assert main.scheduler.stats()["classes"]["interactive"]["failed"] == 1
+
+
+@pytest.mark.parametrize("option", ["profile", "reuse_duplicates"])
+def test_stream_rejects_options_it_does_not_support(service, option):
+    response = post("/analyze/stream", {"file_path": service, "file_id": "song", option: True})
+
+    assert response.status_code == 400
+    assert option in response.json()["detail"]
@@ -0,0 +1,75 @@
+"""
+ChordTimeline stores runs of the same chord and answers window queries by
+binary search; these pin down run merging and the half-open window bounds.
+"""
+
+from analyzers.chord_detector import CHORD_NOTES, ChordTimeline, detect_chord_timeline
+
+
+def progression_timeline() -> ChordTimeline:
+    """C for two slots, then G, Am and F: runs [0, 8), [8, 12), [12, 16), [16, 20)"""
+
+    timeline = ChordTimeline()
+    for i, chord in enumerate(["C", "C", "G", "Am", "F"]):
+        timeline.append(chord, i * 4.0, 4.0)
+    return timeline
+
+
+def chords(entries):
+    return [entry["chord"] for entry in entries]
+
+
+def test_consecutive_slots_of_a_chord_become_one_run():
+    timeline = progression_timeline()
+
+    assert len(timeline) == 4
+    assert timeline.query()[0] == {"chord": "C", "startTime": 0.0, "duration": 8.0, "notes": CHORD_NOTES["C"]}
+    assert timeline.end_time == 20.0
+
+
+def test_a_gap_starts_a_new_run():
+    timeline = ChordTimeline()
+    timeline.append("C", 0.0, 4.0)
+    timeline.append("C", 5.0, 4.0)
+
+    assert len(timeline) == 2
+
+
+def test_query_returns_runs_overlapping_the_window():
+    timeline = progression_timeline()
+
+    assert chords(timeline.query(5.0, 13.0)) == ["C", "G", "Am"]
+    assert chords(timeline.query(9.0, 10.0)) == ["G"]
+    assert chords(timeline.query(start=14.0)) == ["Am", "F"]
+    assert chords(timeline.query(end=1.0)) == ["C"]
+
+
+def test_query_window_is_half_open():
+    timeline = progression_timeline()
+
+    # A run ending at the window start, or starting at its end, is outside it
+    assert chords(timeline.query(8.0, 12.0)) == ["G"]
+    assert timeline.query(20.0, 30.0) == []
+
+
+def test_empty_timeline():
+    timeline = ChordTimeline()
+
+    assert timeline.query() == []
+    assert timeline.query(0.0, 10.0) == []
+    assert timeline.end_time == 0.0
+
+
+def test_from_rows_round_trips_query():
+    timeline = progression_timeline()
+
+    assert ChordTimeline.from_rows(timeline.query()).query() == timeline.query()
+
+
+def test_detected_timeline_spans_the_whole_track():
+    features = {"chroma_mean": [1, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0, 0], "tempo": 120.0,
+                "duration": 120.0, "track_duration": 300.0}
+    _, timeline = detect_chord_timeline(features)
+
+    assert timeline.end_time >= 300.0
+    assert timeline.query(290.0, 300.0)
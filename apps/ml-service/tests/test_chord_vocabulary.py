@@ -0,0 +1,48 @@
+"""
+The generated chord vocabulary: every template is its own best match,
+blocked matching agrees with matching frame by frame, and chord notes are
+spelled by degree.
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.chord_detector import (
+    CHORD_NAMES, CHORD_NOTES, CHORD_TEMPLATES, MATCH_BLOCK_FRAMES, match_chords, parse_chord
+)
+
+
+def test_every_template_matches_its_own_chord():
+    matches = match_chords(np.array([CHORD_TEMPLATES[name] for name in CHORD_NAMES]))
+
+    assert [name for name, _ in matches] == CHORD_NAMES
+    assert min(confidence for _, confidence in matches) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_blocked_matching_agrees_with_single_frames():
+    chroma = np.random.default_rng(0).random((2 * MATCH_BLOCK_FRAMES + 7, 12))
+    matches = match_chords(chroma)
+
+    assert len(matches) == len(chroma)
+    for frame, (name, confidence) in zip(chroma, matches):
+        single = match_chords(frame)[0]
+        assert name == single[0] and confidence == pytest.approx(single[1], abs=1e-6)
+
+
+def test_silent_frames_match_with_no_confidence():
+    assert [confidence for _, confidence in match_chords(np.zeros((3, 12)))] == [0.0, 0.0, 0.0]
+
+
+@pytest.mark.parametrize("chord, notes", [
+    ("C", ["C", "E", "G"]),
+    ("A#", ["A#", "C##", "E#"]),
+    ("Abm", ["Ab", "Cb", "Eb"]),
+    ("D#dim7", ["D#", "F#", "A", "C"]),
+])
+def test_notes_are_spelled_by_degree(chord, notes):
+    assert CHORD_NOTES[chord] == notes
+
+
+def test_parse_chord_accepts_flat_roots():
+    assert parse_chord("Bbm7") == parse_chord("A#m7") == (10, "m7")
+    assert parse_chord("H7") is None
@@ -0,0 +1,52 @@
+"""
+The CQT backend copies librosa's VQT scaling and multirate logic, so it is
+checked against librosa.feature.chroma_cqt: a librosa upgrade that changes
+either side fails here instead of silently changing stored results.
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+
+from analyzers.chroma import compute_chroma
+
+SR = 22050
+
+
+def triad(detune: float = 0.0, seconds: float = 8.0) -> np.ndarray:
+    """C major triad with harmonics, a pulse and some noise, detuned by a fraction of a semitone"""
+
+    t = np.arange(int(SR * seconds)) / SR
+    y = sum(np.sin(2 * np.pi * f * 2 ** (detune / 12) * h * t) / h for f in (261.63, 329.63, 392.0) for h in (1, 2, 3))
+    y = y * (0.6 + 0.4 * np.exp(-4 * (t % 0.5)))
+    return (y + 0.01 * np.random.default_rng(0).standard_normal(len(t))).astype(np.float32)
+
+
+@pytest.mark.parametrize("detune", [0.0, 0.3])
+def test_cqt_backend_matches_librosa(detune):
+    y = triad(detune)
+    ours = compute_chroma(y, SR, backend="cqt")
+    reference = librosa.feature.chroma_cqt(y=y, sr=SR)
+
+    assert ours.shape == reference.shape
+    np.testing.assert_allclose(ours, reference, atol=1e-3)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        compute_chroma(triad(seconds=1.0), SR, backend="wavelet")
+
+
+def test_unknown_default_backend_fails_at_import():
+    service_dir = os.path.join(os.path.dirname(__file__), "..")
+    result = subprocess.run(
+        [sys.executable, "-c", "import analyzers.chroma"],
+        cwd=service_dir, env=dict(os.environ, CHROMA_BACKEND="wavelet"), capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "CHROMA_BACKEND" in result.stderr
@@ -0,0 +1,116 @@
+"""
+Decoding: resampling at each quality with and without soxr, reading only
+the analyzed excerpt of a file, mixing channels down, and the resampler
+chosen per analysis tier.
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from analyzers import decoding
+from analyzers.decoding import RESAMPLER_QUALITIES, load_audio, resample, resampler_for
+
+soundfile = pytest.importorskip("soundfile")
+
+
+def sine(freq: float, sr: int, seconds: float) -> np.ndarray:
+    return np.sin(2 * np.pi * freq * np.arange(int(sr * seconds)) / sr).astype(np.float32)
+
+
+def peak_frequency(y: np.ndarray, sr: int) -> float:
+    spectrum = np.abs(np.fft.rfft(y * np.hanning(len(y))))
+    return float(np.argmax(spectrum) * sr / len(y))
+
+
+@pytest.fixture(params=[True, False], ids=["soxr", "polyphase"])
+def soxr_available(request, monkeypatch):
+    if request.param and not decoding.SOXR_AVAILABLE:
+        pytest.skip("soxr is not installed")
+    monkeypatch.setattr(decoding, "SOXR_AVAILABLE", request.param)
+
+
+@pytest.mark.parametrize("quality", RESAMPLER_QUALITIES)
+def test_resample_keeps_pitch_and_length(soxr_available, quality):
+    y = resample(sine(1000.0, 44100, 2.0), 44100, 22050, quality)
+
+    assert y.dtype == np.float32
+    assert abs(len(y) - 44100) <= 1
+    assert peak_frequency(y, 22050) == pytest.approx(1000.0, abs=1.0)
+    assert np.sqrt(np.mean(y[1000:-1000] ** 2)) == pytest.approx(np.sqrt(0.5), rel=0.02)
+
+
+def test_resample_filters_what_the_target_rate_cannot_hold(soxr_available):
+    # 15 kHz is above the 11.025 kHz Nyquist frequency of 22.05 kHz
+    y = resample(sine(15000.0, 44100, 1.0), 44100, 22050, "fast")
+
+    assert np.sqrt(np.mean(y[1000:-1000] ** 2)) < 0.05
+
+
+def test_resample_at_the_same_rate_is_a_no_op():
+    y = sine(440.0, 22050, 0.1)
+
+    assert resample(y, 22050, 22050) is y
+
+
+def test_unknown_quality_is_rejected():
+    with pytest.raises(ValueError):
+        resample(sine(440.0, 44100, 0.1), 44100, 22050, "best")
+
+
+def test_load_audio_mixes_down_and_reads_only_the_excerpt(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    left, right = sine(440.0, 44100, 3.0), sine(660.0, 44100, 3.0)
+    soundfile.write(path, np.stack([left, right], axis=1), 44100, subtype="FLOAT")
+
+    y, duration = load_audio(path, 44100, duration=1.0)
+
+    assert duration == pytest.approx(3.0)
+    assert len(y) == 44100
+    np.testing.assert_allclose(y, (left[:44100] + right[:44100]) / 2, atol=1e-6)
+
+
+def test_load_audio_resamples_to_the_requested_rate(tmp_path):
+    path = str(tmp_path / "mono.wav")
+    soundfile.write(path, sine(1000.0, 48000, 2.0), 48000)
+
+    y, duration = load_audio(path, 22050, quality="fast")
+
+    assert duration == pytest.approx(2.0)
+    assert abs(len(y) - 44100) <= 1
+    assert peak_frequency(y, 22050) == pytest.approx(1000.0, abs=1.0)
+
+
+def test_load_audio_falls_back_to_librosa(tmp_path, monkeypatch):
+    pytest.importorskip("librosa")
+    path = str(tmp_path / "mono.wav")
+    soundfile.write(path, sine(440.0, 22050, 2.0), 22050, subtype="FLOAT")
+    expected, _ = load_audio(path, duration=1.0)
+
+    monkeypatch.setattr(decoding, "SOUNDFILE_AVAILABLE", False)
+    y, duration = load_audio(path, duration=1.0)
+
+    assert duration == pytest.approx(2.0)
+    np.testing.assert_allclose(y, expected, atol=1e-6)
+
+
+def test_resampler_follows_the_tier(monkeypatch):
+    assert [resampler_for(tier) for tier in ("cqt", "cqt_decimated", "stft", None)] == [
+        "high", "balanced", "fast", "high"
+    ]
+
+    monkeypatch.setattr(decoding, "RESAMPLER_OVERRIDE", "fast")
+    assert resampler_for("cqt") == "fast"
+
+
+def test_unknown_resampler_quality_fails_at_import():
+    service_dir = os.path.join(os.path.dirname(__file__), "..")
+    result = subprocess.run(
+        [sys.executable, "-c", "import analyzers.decoding"],
+        cwd=service_dir, env=dict(os.environ, RESAMPLER_QUALITY="best"), capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "RESAMPLER_QUALITY" in result.stderr
@@ -0,0 +1,95 @@
+"""
+Content negotiation and the binary encodings of analysis results.
+"""
+
+import pytest
+
+import encoding
+from encoding import from_columnar, negotiate_format, to_columnar
+
+PAYLOAD = {
+    "key": "C",
+    "tempo": 123.456789012345,
+    "timeline": [
+        {"chord": "C", "startTime": 0.0, "duration": 3.9, "notes": ["C", "E", "G"]},
+        {"chord": "G", "startTime": 3.9, "duration": 3.9, "notes": ["G", "B", "D"]},
+        {"chord": "C", "startTime": 7.8, "duration": 0.123456789, "notes": ["C", "E", "G"]},
+    ],
+}
+
+
+@pytest.fixture
+def binary_available(monkeypatch):
+    """Negotiate as if msgpack and pyarrow were installed"""
+
+    monkeypatch.setattr(encoding, "MSGPACK_AVAILABLE", True)
+    monkeypatch.setattr(encoding, "PYARROW_AVAILABLE", True)
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("", "json"),
+    ("application/json", "json"),
+    ("text/html", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-msgpack", "msgpack"),
+    ("Application/MsgPack", "msgpack"),
+    ("application/json, application/msgpack", "json"),
+    ("application/msgpack, application/json", "msgpack"),
+])
+def test_supported_media_types(binary_available, accept, expected):
+    assert negotiate_format(accept) == expected
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/json, application/msgpack;q=0.9", "json"),
+    ("application/json;q=0.5, application/msgpack", "msgpack"),
+    ("application/json;q=0.5, application/msgpack;q=0.8", "msgpack"),
+    ("application/msgpack; q=0.2, */*; q=0.1", "msgpack"),
+    ("application/msgpack;q=0, */*", "json"),
+    ("application/msgpack;q=0", "json"),
+    ("application/msgpack;q=oops", "json"),
+])
+def test_q_values_rank_media_types(binary_available, accept, expected):
+    assert negotiate_format(accept) == expected
+
+
+def test_arrow_only_where_allowed(binary_available):
+    accept = "application/vnd.apache.arrow.stream, application/msgpack;q=0.5"
+
+    assert negotiate_format(accept, allow_arrow=True) == "arrow"
+    assert negotiate_format(accept) == "msgpack"
+
+
+def test_missing_library_falls_back(monkeypatch):
+    monkeypatch.setattr(encoding, "MSGPACK_AVAILABLE", False)
+
+    assert negotiate_format("application/msgpack") == "json"
+
+
+def test_columnar_round_trip():
+    columnar = to_columnar(PAYLOAD)
+
+    assert columnar["chordDictionary"]["chord"] == ["C", "G"]
+    assert columnar["timeline"]["chord"] == [0, 1, 0]
+    assert from_columnar(columnar) == PAYLOAD
+    assert to_columnar({"key": "C"}) == {"key": "C"}
+
+
+def test_msgpack_round_trip_is_exact():
+    pytest.importorskip("msgpack")
+
+    assert encoding.decode_msgpack(encoding.encode_msgpack(PAYLOAD)) == PAYLOAD
+
+
+def test_arrow_round_trip():
+    pytest.importorskip("pyarrow")
+    decoded = encoding.decode_arrow(encoding.encode_arrow(PAYLOAD))
+
+    # Timeline columns are float32; everything else travels as JSON
+    assert decoded["tempo"] == PAYLOAD["tempo"]
+    assert [entry["chord"] for entry in decoded["timeline"]] == ["C", "G", "C"]
+    assert [entry["notes"] for entry in decoded["timeline"]] == [entry["notes"] for entry in PAYLOAD["timeline"]]
+    assert [entry["duration"] for entry in decoded["timeline"]] == pytest.approx(
+        [entry["duration"] for entry in PAYLOAD["timeline"]], rel=1e-6
+    )
@@ -0,0 +1,149 @@
+"""
+Landmark fingerprints: encoding, offset-consistent matching in the index,
+and verification of a candidate before its analysis is reused.
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.chroma import HOP_LENGTH
+from analyzers.fingerprint import (
+    MAX_OFFSET_SECONDS, MIN_LANDMARKS, FingerprintIndex, _offset_votes, decode_fingerprint,
+    encode_fingerprint, landmarks
+)
+
+SR = 22050
+FRAME_SECONDS = HOP_LENGTH / SR
+CHROMA = [1.0, 0.1, 0.3, 0.1, 0.8, 0.4, 0.1, 0.9, 0.1, 0.4, 0.1, 0.3]
+
+
+def random_landmarks(seed: int, count: int = 400, frames: int = 2500) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.stack([rng.integers(0, 2 ** 22, count), np.sort(rng.integers(0, frames, count))], axis=1)
+    return rows.astype(np.uint32)
+
+
+def trimmed(rows: np.ndarray, frames: int) -> np.ndarray:
+    """The landmarks of a copy with its first `frames` frames cut off"""
+
+    kept = rows[rows[:, 1] >= frames].copy()
+    kept[:, 1] -= frames
+    return kept
+
+
+def features(rows: np.ndarray, **overrides) -> dict:
+    return {"fingerprint": encode_fingerprint(rows), "fingerprint_chroma": CHROMA, "tempo": 120.0,
+            "duration": 60.0, "track_duration": 60.0, "sample_rate": SR, **overrides}
+
+
+@pytest.fixture
+def index() -> FingerprintIndex:
+    index = FingerprintIndex()
+    for seed in range(5):
+        index.add(f"song-{seed}", features(random_landmarks(seed)))
+    return index
+
+
+def test_encoding_round_trip():
+    rows = random_landmarks(0)
+
+    np.testing.assert_array_equal(decode_fingerprint(encode_fingerprint(rows)), rows)
+
+
+@pytest.mark.parametrize("fingerprint", [None, "", "not base64!", "AAAA"])
+def test_unreadable_fingerprints_decode_empty(fingerprint):
+    assert decode_fingerprint(fingerprint).shape == (0, 2)
+
+
+def test_offset_votes_count_consistent_offsets():
+    slots = np.array([0, 0, 0, 0, 1, 1, 1])
+    offsets = np.array([5, 5, 6, 40, -3, 17, 90])
+
+    # Offsets 5, 5 and 6 agree within one frame; slot 1's offsets are scattered
+    assert _offset_votes(slots, offsets)[0] == (0, 3, 5)
+    assert _offset_votes(slots, offsets)[1][:2] == (1, 1)
+    assert _offset_votes(np.zeros(0, dtype=int), np.zeros(0, dtype=int)) == []
+
+
+def test_exact_copy_matches(index):
+    assert index.lookup(features(random_landmarks(3))) == ("song-3", 1.0)
+
+
+def test_trimmed_copy_matches(index):
+    rows = trimmed(random_landmarks(2), 40)
+    match = index.lookup(features(rows, track_duration=60.0 - 40 * FRAME_SECONDS))
+
+    assert match is not None and match[0] == "song-2"
+
+
+def test_partial_overlap_matches_on_the_shared_share(index):
+    # Half the landmarks replaced, as after lossy re-encoding
+    rows = random_landmarks(1)
+    rows[::2, 0] = random_landmarks(99)[::2, 0]
+    match = index.lookup(features(rows))
+
+    assert match is not None and match[0] == "song-1" and 0.45 < match[1] < 0.55
+
+
+def test_shared_hashes_at_scattered_offsets_do_not_match(index):
+    # Same hashes, but not at one consistent time offset: a different song on the same chords
+    rows = random_landmarks(4)
+    rows[:, 1] = np.random.default_rng(7).permutation(rows[:, 1])
+
+    assert index.lookup(features(rows)) is None
+
+
+def test_unrelated_recording_does_not_match(index):
+    assert index.lookup(features(random_landmarks(42))) is None
+
+
+@pytest.mark.parametrize("overrides", [
+    {"tempo": 132.0},
+    {"track_duration": 70.0},
+    {"fingerprint_chroma": list(np.roll(CHROMA, 5))},
+])
+def test_candidates_are_verified(index, overrides):
+    assert index.lookup(features(random_landmarks(0), **overrides)) is None
+
+
+def test_offset_beyond_a_trimmed_lead_in_is_rejected(index):
+    frames = int(MAX_OFFSET_SECONDS / FRAME_SECONDS) + 20
+
+    assert index.lookup(features(trimmed(random_landmarks(0), frames))) is None
+
+
+def test_excluded_ids_are_skipped(index):
+    assert index.lookup(features(random_landmarks(0)), exclude=["song-0"]) is None
+
+
+def test_re_adding_an_id_replaces_its_fingerprint(index):
+    index.add("song-0", features(random_landmarks(50)))
+
+    assert len(index) == 5
+    assert index.lookup(features(random_landmarks(0))) is None
+    assert index.lookup(features(random_landmarks(50))) == ("song-0", 1.0)
+
+
+def test_short_fingerprints_are_not_indexed():
+    index = FingerprintIndex()
+    index.add("short", features(random_landmarks(0, count=MIN_LANDMARKS - 1)))
+
+    assert len(index) == 0
+    assert index.lookup(features(random_landmarks(0, count=MIN_LANDMARKS - 1))) is None
+
+
+def test_landmarks_of_a_trimmed_recording_share_its_offset():
+    librosa = pytest.importorskip("librosa")
+
+    rng = np.random.default_rng(0)
+    t = np.arange(SR * 20) / SR
+    notes = 220.0 * 2 ** (rng.integers(0, 24, 40) / 12)
+    y = np.sin(2 * np.pi * np.repeat(notes, len(t) // 40)[:len(t)] * t) + 0.01 * rng.standard_normal(len(t))
+
+    trim = 25
+    full = landmarks(np.abs(librosa.stft(y, n_fft=2048, hop_length=HOP_LENGTH)), SR)
+    cut = landmarks(np.abs(librosa.stft(y[trim * HOP_LENGTH:], n_fft=2048, hop_length=HOP_LENGTH)), SR)
+
+    assert len(full) >= MIN_LANDMARKS
+    shared = {tuple(row) for row in full.tolist()} & {(h, frame + trim) for h, frame in cut.tolist()}
+    assert len(shared) >= 0.5 * len(cut)
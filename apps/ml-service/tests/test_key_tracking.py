@@ -0,0 +1,64 @@
+"""
+Key timelines: the Viterbi smoothing of per-block key scores, and
+track_keys on block chroma with and without a modulation.
+"""
+
+import numpy as np
+
+from analyzers.scale_detector import MAJOR_PROFILE, _viterbi, track_keys
+
+
+def test_viterbi_without_penalty_follows_the_best_state():
+    scores = np.random.default_rng(0).random((50, 24))
+
+    np.testing.assert_array_equal(_viterbi(scores, 0.0), np.argmax(scores, axis=1))
+
+
+def test_viterbi_ignores_short_excursions():
+    scores = np.zeros((20, 3))
+    scores[:, 0] = 1.0
+    scores[9:11, 1] = 1.5  # two blocks slightly favour state 1
+
+    np.testing.assert_array_equal(_viterbi(scores, 2.0), np.zeros(20))
+
+
+def test_viterbi_switches_for_a_sustained_change():
+    scores = np.zeros((20, 3))
+    scores[:10, 0] = 1.0
+    scores[10:, 2] = 1.0
+
+    np.testing.assert_array_equal(_viterbi(scores, 2.0), [0] * 10 + [2] * 10)
+
+
+def test_viterbi_penalty_is_charged_per_change():
+    # Switching to state 1 and back gains 2 x 0.8 over staying, less than two penalties
+    scores = np.array([[1.0, 0.0], [0.0, 0.8], [0.0, 0.8], [1.0, 0.0]])
+
+    np.testing.assert_array_equal(_viterbi(scores, 1.0), [0, 0, 0, 0])
+    np.testing.assert_array_equal(_viterbi(scores, 0.5), [0, 1, 1, 0])
+
+
+def test_track_keys_finds_a_modulation():
+    c_major = MAJOR_PROFILE
+    g_major = np.roll(MAJOR_PROFILE, 7)
+    features = {
+        "chroma_blocks": [c_major.tolist()] * 40 + [g_major.tolist()] * 40,
+        "chroma_block_seconds": 1.0,
+        "duration": 80.0,
+    }
+    keys = track_keys(features)
+
+    assert [segment["scale"] for segment in keys["timeline"]] == ["C Major", "G Major"]
+    assert keys["modulations"] == [{"time": 40.0, "from": "C Major", "to": "G Major"}]
+    assert keys["timeline"][-1]["startTime"] + keys["timeline"][-1]["duration"] == 80.0
+
+
+def test_track_keys_without_blocks_is_one_segment():
+    # Mock features carry empty chroma_blocks
+    features = {"chroma_mean": np.roll(MAJOR_PROFILE, 2).tolist(), "chroma_blocks": [], "duration": 30.0}
+    keys = track_keys(features)
+
+    assert len(keys["timeline"]) == 1
+    assert keys["timeline"][0]["startTime"] == 0.0
+    assert keys["timeline"][0]["duration"] == 30.0
+    assert keys["modulations"] == []
@@ -0,0 +1,131 @@
+"""
+Versioned records: which parts of a stored record are stale, refreshing
+only those, and the on-disk store the records live in.
+"""
+
+import json
+import os
+
+import pytest
+
+from analyzers.audio_features import FEATURE_STAGE_VERSIONS, FEATURE_STAGES
+from analyzers.pipeline import (
+    ANALYZERS, build_record, refresh_record, run_analyzers, stale_analyzers, stale_feature_stages
+)
+from store import MAX_FILE_ID_BYTES, ResultStore
+
+FEATURES = {
+    "chroma_mean": [1.0, 0.1, 0.3, 0.1, 0.8, 0.4, 0.1, 0.9, 0.1, 0.4, 0.1, 0.3],
+    "chroma_blocks": [],
+    "tempo": 120.0,
+    "duration": 30.0,
+    "spectral_centroid": 2000.0,
+    "spectral_rolloff": 4000.0,
+    "zero_crossing_rate": 0.05,
+    "rms_energy": 0.1,
+    "mfcc": [0.0] * 13,
+}
+
+
+def current_record(file_id: str = "song") -> dict:
+    return build_record(file_id, "/audio/song.wav", FEATURES, FEATURE_STAGES, run_analyzers(FEATURES))
+
+
+def test_current_record_is_not_stale():
+    record = current_record()
+
+    assert stale_feature_stages(record) == []
+    assert stale_analyzers(record) == []
+    assert refresh_record(record) is None
+
+
+def test_older_analyzer_version_is_stale():
+    record = current_record()
+    record["versions"]["analyzers"]["chords"] -= 1
+
+    assert stale_analyzers(record) == ["chords"]
+
+
+def test_stale_stage_marks_its_readers():
+    record = current_record()
+
+    readers = [name for name, (_, _, inputs) in ANALYZERS.items() if "rhythm" in inputs]
+    assert stale_analyzers(record, ["rhythm"]) == readers
+    assert {"emotion", "genre", "chords"} <= set(readers)
+
+
+def test_missing_or_older_stage_is_stale():
+    record = current_record()
+    del record["versions"]["features"]["timbre"]
+    record["versions"]["features"]["rhythm"] = FEATURE_STAGE_VERSIONS["rhythm"] - 1
+
+    assert stale_feature_stages(record) == ["rhythm", "timbre"]
+
+
+def test_refresh_reruns_only_stale_analyzers():
+    record = current_record()
+    record["versions"]["analyzers"]["chords"] -= 1
+    record["results"]["scale"] = "kept"
+
+    refreshed = refresh_record(record)
+
+    assert refreshed["versions"] == current_record()["versions"]
+    assert refreshed["results"]["scale"] == "kept"
+    assert refreshed["results"]["chords"] == run_analyzers(FEATURES, ["chords"])["chords"]
+
+
+def test_refresh_keeps_duplicate_marker():
+    record = current_record()
+    record["versions"]["analyzers"]["chords"] -= 1
+    record["duplicateOf"] = "original"
+
+    assert refresh_record(record)["duplicateOf"] == "original"
+
+
+def test_record_without_extracted_stages_is_marked_mock():
+    record = build_record("song", "/audio/song.wav", FEATURES, [], {})
+
+    assert record["mockFeatures"] is True
+    assert "mockFeatures" not in current_record()
+
+
+def test_store_round_trip(tmp_path):
+    store = ResultStore(str(tmp_path))
+    record = current_record("uploads/42/song.mp3")
+    store.put(record)
+
+    assert store.get("uploads/42/song.mp3") == json.loads(json.dumps(record))
+    assert store.get("missing") is None
+    assert store.ids() == ["uploads/42/song.mp3"]
+
+    # A new store on the same directory sees the record
+    assert [r["fileId"] for r in ResultStore(str(tmp_path)).records()] == ["uploads/42/song.mp3"]
+
+
+def test_store_keeps_distinct_ids_apart(tmp_path):
+    # Ids that a sanitizing or case-insensitive file name would conflate
+    ids = ["Song", "song", "a/b", "a_b", "a b", "ünïcode", "..", "x" * MAX_FILE_ID_BYTES]
+    store = ResultStore(str(tmp_path))
+    for file_id in ids:
+        store.put({"fileId": file_id})
+
+    assert sorted(store.ids()) == sorted(ids)
+    assert len(os.listdir(store.records_dir)) == len(ids)
+    for file_id in ids:
+        assert store.get(file_id) == {"fileId": file_id}
+
+
+@pytest.mark.parametrize("file_id", ["", "x" * (MAX_FILE_ID_BYTES + 1)])
+def test_store_rejects_unusable_ids(tmp_path, file_id):
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path)).put({"fileId": file_id})
+
+
+def test_store_ignores_foreign_files(tmp_path):
+    store = ResultStore(str(tmp_path))
+    store.put({"fileId": "song"})
+    open(os.path.join(store.records_dir, "not-base32!.json"), "w").close()
+    open(os.path.join(store.records_dir, "notes.txt"), "w").close()
+
+    assert store.ids() == ["song"]
+
@@ -0,0 +1,79 @@
+"""
+Practice grading: synthesized attempts graded against their target chords,
+and the batched chroma they are graded on.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("librosa")
+
+from analyzers.chord_detector import CHORD_NAMES, CHORD_TEMPLATES  # noqa: E402
+from analyzers.practice import PRACTICE_SAMPLE_RATE as SR, batch_chroma, grade_attempts, grade_chroma  # noqa: E402
+
+MIDI = {"C": 60, "E": 64, "G": 67, "A": 69, "B": 71, "D": 62, "F#": 66}
+
+
+def chord_clip(notes, seconds: float = 1.0) -> np.ndarray:
+    """Notes with decaying overtones, the way an instrument would play them"""
+
+    t = np.arange(int(SR * seconds)) / SR
+    clip = np.zeros(len(t))
+    for note in notes:
+        f0 = 440.0 * 2 ** ((MIDI[note] - 69) / 12)
+        for harmonic in range(1, 5):
+            clip += 0.5 ** harmonic * np.sin(2 * np.pi * f0 * harmonic * t)
+    return (0.2 * clip / len(notes)).astype(np.float32)
+
+
+def test_played_chord_is_correct():
+    grade, = grade_attempts([chord_clip(["C", "E", "G"])], ["C"])
+
+    assert grade["correct"] and grade["detected"] == "C"
+    assert grade["score"] >= 0.8 and grade["confidence"] > 0.0
+
+
+def test_wrong_chord_is_not_correct():
+    grade, = grade_attempts([chord_clip(["E", "G", "B"])], ["C"])
+
+    assert not grade["correct"]
+    assert grade["detected"] != "C"
+
+
+def test_silent_attempt_is_not_graded_as_a_chord():
+    grades = grade_attempts([np.zeros(SR, dtype=np.float32), np.zeros(0, dtype=np.float32)], ["C", "G"])
+
+    for grade in grades:
+        assert grade == {**grade, "detected": None, "correct": False, "confidence": 0.0, "score": 0.0}
+
+
+def test_unknown_target_is_rejected():
+    with pytest.raises(ValueError):
+        grade_attempts([chord_clip(["C", "E", "G"])], ["H7"])
+
+
+def test_flat_targets_grade_like_their_sharp_names():
+    clip = chord_clip(["D", "F#", "A"])
+    grade_flat, = grade_attempts([clip], ["Gb"])
+    grade_sharp, = grade_attempts([clip], ["F#"])
+
+    assert {**grade_flat, "target": "F#"} == grade_sharp
+
+
+def test_batch_chroma_does_not_depend_on_the_batch():
+    clips = [chord_clip(["C", "E", "G"], 0.5), chord_clip(["D", "F#", "A"], 2.0), chord_clip(["A", "C", "E"], 1.0)]
+    together = batch_chroma(clips)
+
+    assert together.shape == (3, 12)
+    # Only the last frame differs: the STFT's end padding reflects zeros in a batch
+    for clip, row in zip(clips, together):
+        np.testing.assert_allclose(batch_chroma([clip])[0], row, atol=1e-2)
+
+
+def test_grade_chroma_of_templates():
+    targets = ["C", "Am7", "G#dim", "Bbmaj7"]
+    chroma = np.array([CHORD_TEMPLATES[name] for name in ["C", "Am7", "G#dim", "A#maj7"]])
+
+    assert [grade["correct"] for grade in grade_chroma(chroma, targets)] == [True] * 4
+    assert [grade["detected"] for grade in grade_chroma(chroma[::-1], targets)][0] != "C"
+    assert set(grade["detected"] for grade in grade_chroma(chroma, targets)) <= set(CHORD_NAMES)
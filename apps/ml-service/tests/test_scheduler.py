@@ -0,0 +1,155 @@
+"""
+AnalysisScheduler: slots are granted in priority order, multi-slot jobs
+wait for enough free slots, and a job that is cancelled never keeps one.
+"""
+
+import asyncio
+
+import pytest
+
+import scheduler as scheduler_module
+from scheduler import PRIORITY_OFFSETS, AnalysisCancelled, AnalysisScheduler
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def granted(*jobs):
+    return [job.slot.done() and not job.slot.cancelled() for job in jobs]
+
+
+class Clock:
+    """Stand-in for the time module, advanced by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_interactive_jobs_go_before_bulk():
+    async def scenario():
+        scheduler = AnalysisScheduler(1)
+        holder = scheduler.submit("interactive")
+        bulk = scheduler.submit("bulk")
+        interactive = scheduler.submit("interactive")
+
+        scheduler.release(holder)
+        assert granted(bulk, interactive) == [False, True]
+        scheduler.release(interactive)
+        assert granted(bulk) == [True]
+
+    run(scenario())
+
+
+def test_bulk_is_not_overtaken_by_much_later_interactive_work(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module, "time", clock)
+
+    async def scenario():
+        scheduler = AnalysisScheduler(1)
+        holder = scheduler.submit("interactive")
+        bulk = scheduler.submit("bulk")
+        clock.now += PRIORITY_OFFSETS["bulk"] + 1
+        interactive = scheduler.submit("interactive")
+
+        scheduler.release(holder)
+        assert granted(bulk, interactive) == [True, False]
+
+    run(scenario())
+
+
+def test_deadline_expires_while_queued():
+    async def scenario():
+        scheduler = AnalysisScheduler(1)
+        holder = scheduler.submit("interactive")
+        late = scheduler.submit("interactive", deadline=0.05)
+
+        with pytest.raises(AnalysisCancelled) as cancelled:
+            await scheduler.wait_for_slot(late)
+        assert cancelled.value.reason == "deadline"
+
+        # The expired job leaves the queue: the next one gets the freed slot
+        after = scheduler.submit("interactive")
+        scheduler.release(holder)
+        assert granted(late, after) == [False, True]
+
+        stats = scheduler.stats()["classes"]["interactive"]
+        assert (stats["deadline"], stats["completed"], stats["queued"]) == (1, 1, 0)
+
+    run(scenario())
+
+
+def test_multi_slot_job_waits_for_enough_slots():
+    async def scenario():
+        scheduler = AnalysisScheduler(4)
+        small = scheduler.submit("interactive")
+        wide = scheduler.submit("interactive", slots=4)
+        behind = scheduler.submit("interactive")
+
+        # Three slots are free, but the wide job at the head needs four and
+        # the job behind it does not overtake it
+        assert granted(small, wide, behind) == [True, False, False]
+        assert scheduler.running == 1
+
+        scheduler.release(small)
+        assert granted(wide, behind) == [True, False]
+        assert scheduler.running == 4
+
+        scheduler.release(wide)
+        assert granted(behind) == [True]
+        assert scheduler.running == 1
+
+    run(scenario())
+
+
+def test_slots_are_capped_to_the_workers():
+    async def scenario():
+        scheduler = AnalysisScheduler(2)
+        job = scheduler.submit("interactive", slots=8)
+
+        assert job.slots == 2 and granted(job) == [True]
+
+    run(scenario())
+
+
+def test_slot_granted_during_disconnect_check_is_released():
+    async def scenario():
+        scheduler = AnalysisScheduler(1)
+        holder = scheduler.submit("interactive")
+        waiting = scheduler.submit("interactive")
+
+        async def is_disconnected():
+            # The slot is handed to the waiting job while the check is awaited
+            scheduler.release(holder)
+            await asyncio.sleep(0)
+            return True
+
+        with pytest.raises(AnalysisCancelled):
+            await scheduler.wait_for_slot(waiting, is_disconnected)
+
+        assert scheduler.running == 0
+        assert granted(scheduler.submit("interactive")) == [True]
+        assert scheduler.stats()["classes"]["interactive"]["disconnected"] == 1
+
+    run(scenario())
+
+
+def test_run_counts_completed_and_failed_jobs():
+    def fail(job):
+        raise RuntimeError("decode failed")
+
+    async def scenario():
+        scheduler = AnalysisScheduler(1)
+        assert await scheduler.run(scheduler.submit("bulk"), lambda job: 42) == 42
+        with pytest.raises(RuntimeError):
+            await scheduler.run(scheduler.submit("bulk"), fail)
+        await asyncio.sleep(0)
+
+        stats = scheduler.stats()
+        assert stats["running"] == 0
+        assert (stats["classes"]["bulk"]["completed"], stats["classes"]["bulk"]["failed"]) == (1, 1)
+
+    run(scenario())
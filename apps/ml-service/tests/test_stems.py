@@ -0,0 +1,115 @@
+"""
+Stem alignment and aggregation: per-beat energy and onset timing of each
+stem against the mix's beats, and the song-level result built from them.
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.scale_detector import MAJOR_PROFILE
+from analyzers.stems import aggregate_stems, align_to_beats, stem_threads
+
+SR = 22050
+C_MAJOR = MAJOR_PROFILE / MAJOR_PROFILE.max()
+
+
+def stem(rms, onsets=(), chroma=C_MAJOR, duration=10.0) -> dict:
+    """Features of one stem, as stem_features returns them"""
+
+    return {
+        "rms": np.asarray(rms, dtype=float),
+        "onsets": np.asarray(onsets, dtype=int),
+        "onset_env": np.ones(len(rms)),
+        "chroma_mean": np.asarray(chroma, dtype=float),
+        "duration": duration,
+    }
+
+
+def test_beat_energy_is_the_mean_between_beats():
+    aligned = align_to_beats(stem([1.0] * 10 + [3.0] * 10), np.array([0, 10]), SR)
+
+    assert aligned["beatEnergy"] == [1.0, 3.0]
+    assert aligned["rmsEnergy"] == 2.0
+    assert aligned["activeRatio"] == 1.0
+
+
+def test_frames_before_the_first_beat_are_not_a_beat():
+    aligned = align_to_beats(stem([9.0] * 5 + [1.0] * 10 + [2.0] * 5), np.array([5, 15]), SR)
+
+    assert aligned["beatEnergy"] == [1.0, 2.0]
+
+
+def test_beats_past_a_shorter_stem_are_silent():
+    aligned = align_to_beats(stem([1.0] * 20), np.array([0, 10, 20, 30]), SR)
+
+    assert aligned["beatEnergy"] == [1.0, 1.0, 0.0, 0.0]
+    assert aligned["activeRatio"] == 0.5
+
+
+def test_quiet_beats_are_inactive():
+    # -20 dB below the loudest beat is still active, anything quieter is not
+    aligned = align_to_beats(stem([1.0] * 10 + [0.1] * 10 + [0.05] * 10), np.array([0, 10, 20]), SR)
+
+    assert aligned["activeRatio"] == round(2 / 3, 3)
+
+
+def test_without_beats_the_stem_is_one_span():
+    aligned = align_to_beats(stem([1.0, 2.0, 3.0], onsets=[1]), np.array([], dtype=int), SR)
+
+    assert aligned["beatEnergy"] == [2.0]
+    assert aligned["onBeatRatio"] == 0.0
+
+
+def test_empty_stem():
+    aligned = align_to_beats(stem([]), np.array([0, 10]), SR)
+
+    assert aligned["beatEnergy"] == [0.0, 0.0]
+    assert aligned["rmsEnergy"] == 0.0 and aligned["onsetStrength"] == 0.0
+
+
+def test_onsets_near_a_beat_are_on_the_beat():
+    # BEAT_TOLERANCE (70 ms) is three 512-sample frames at 22.05 kHz
+    beats = np.array([0, 20, 40, 60])
+    aligned = align_to_beats(stem([1.0] * 80, onsets=[0, 22, 45, 70], duration=2.0), beats, SR)
+
+    assert aligned["onBeatRatio"] == 0.5
+    assert aligned["onsetRate"] == 2.0
+
+
+def test_chroma_is_peak_normalized_with_tonality():
+    tonal = align_to_beats(stem([1.0], chroma=np.roll(C_MAJOR, 7) * 4), np.array([0]), SR)
+    flat = align_to_beats(stem([1.0], chroma=np.ones(12)), np.array([0]), SR)
+
+    assert max(tonal["chroma"]) == 1.0 and tonal["dominantPitchClass"] == "G"
+    assert flat["tonality"] == 0.0 < tonal["tonality"]
+
+
+def test_aggregate_weights_the_key_by_tonal_energy():
+    pytest.importorskip("librosa")
+    beats = np.array([0, 22, 43])
+    stems = {
+        # Loud but atonal drums, and a quieter bass line in G major
+        "drums": align_to_beats(stem([4.0] * 60, chroma=np.ones(12)), beats, SR),
+        "bass": align_to_beats(stem([1.0] * 60, chroma=np.roll(MAJOR_PROFILE, 7)), beats, SR),
+    }
+    song = aggregate_stems(stems, np.array([120.0]), beats, 1.4, SR)
+
+    assert song["tempo"] == 120.0
+    assert song["beats"] == [0.0, 0.511, 0.998]
+    assert song["scale"] == "G Major"
+    assert song["leadStem"] == "bass"
+    assert [song["stems"][name]["energyShare"] for name in ("drums", "bass")] == [0.8, 0.2]
+
+
+def test_aggregate_without_stems():
+    pytest.importorskip("librosa")
+    song = aggregate_stems({}, 120.0, np.array([], dtype=int), 0.0, SR)
+
+    assert song["leadStem"] is None and song["stems"] == {}
+    assert song["chroma"] == [1.0] * 12
+
+
+def test_stem_threads_are_bounded():
+    assert stem_threads(1) == 1
+    assert stem_threads(1, mix=True) == min(2, stem_threads(64))
+    assert stem_threads(64) >= 1
@@ -0,0 +1,110 @@
+"""
+Song structure: the banded novelty curve against the full self-similarity
+matrix, section grouping and naming, and segment_structure on a track
+whose harmony and timbre change halfway.
+"""
+
+import numpy as np
+import pytest
+
+librosa = pytest.importorskip("librosa")
+
+from analyzers.structure import (  # noqa: E402
+    KERNEL_BEATS, MIN_SECTION_BEATS, group_sections, name_sections, novelty_curve, segment_structure
+)
+
+SR = 22050
+HOP = 512
+
+
+def full_matrix_novelty(features: np.ndarray, width: int) -> np.ndarray:
+    """Foote novelty from the whole self-similarity matrix, as the band should reproduce"""
+
+    half = width // 2
+    n = features.shape[1]
+    padded = np.pad(features, ((0, 0), (half, half)))
+    similarity = padded.T @ padded
+
+    taper = np.exp(-0.5 * ((np.arange(-half, half) + 0.5) / (0.5 * half)) ** 2)
+    side = np.arange(width) < half
+    kernel = np.where(side[:, None] == side[None, :], 1.0, -1.0) * np.outer(taper, taper)
+
+    novelty = np.array([np.sum(kernel * similarity[i:i + width, i:i + width]) for i in range(n)])
+    novelty -= novelty.min()
+    return novelty / max(novelty.max(), 1e-10)
+
+
+def blocks(*lengths) -> np.ndarray:
+    """Unit-norm beat features, one random direction per block of beats"""
+
+    rng = np.random.default_rng(0)
+    columns = []
+    for length in lengths:
+        direction = rng.standard_normal(20)
+        columns.append(np.repeat(direction[:, None], length, axis=1) + 0.05 * rng.standard_normal((20, length)))
+    features = np.hstack(columns)
+    return features / np.linalg.norm(features, axis=0)
+
+
+@pytest.mark.parametrize("width", [8, KERNEL_BEATS])
+def test_banded_novelty_matches_the_full_matrix(width):
+    features = np.random.default_rng(1).standard_normal((25, 120))
+
+    np.testing.assert_allclose(novelty_curve(features, width), full_matrix_novelty(features, width), atol=1e-9)
+
+
+def test_novelty_peaks_at_a_change():
+    novelty = novelty_curve(blocks(60, 60))
+
+    assert abs(int(np.argmax(novelty)) - 60) <= 1
+    assert novelty.min() == 0.0 and novelty.max() == 1.0
+
+
+def test_repeated_sections_share_a_group():
+    features = blocks(20, 20, 20, 20)
+    features[:, 40:60] = features[:, :20]
+
+    assert group_sections(features, [0, 20, 40, 60, 80]) == [0, 1, 0, 2]
+
+
+def test_sections_are_named_from_their_groups():
+    loudness = np.array([0.0] * 10 + [1.0] * 10 + [0.0] * 10 + [1.0] * 10 + [0.5] * 10)
+    bounds = [0, 10, 20, 30, 40, 50]
+
+    assert name_sections([0, 1, 0, 1, 2], loudness, bounds) == ["verse", "chorus", "verse", "chorus", "outro"]
+    assert name_sections([0, 1, 2], loudness, [0, 10, 20, 30]) == ["intro", "bridge", "outro"]
+    assert name_sections([0], loudness, [0, 50]) == ["verse"]
+
+
+def spectrograms(y: np.ndarray):
+    S = np.abs(librosa.stft(y, n_fft=2048, hop_length=HOP))
+    mel_db = librosa.power_to_db(librosa.feature.melspectrogram(S=S ** 2, sr=SR))
+    return S, mel_db
+
+
+def test_too_few_beats_is_one_section():
+    S, mel_db = spectrograms(np.random.default_rng(0).standard_normal(SR * 4).astype(np.float32))
+    sections = segment_structure(S, mel_db, SR, HOP, np.arange(0, S.shape[1], 20))
+
+    assert len(sections) == 1
+    assert sections[0]["startTime"] == 0.0
+    assert sections[0]["duration"] == round(S.shape[1] * HOP / SR, 2)
+
+
+def test_change_of_harmony_and_timbre_starts_a_section():
+    half = SR * 24
+    t = np.arange(half) / SR
+    rng = np.random.default_rng(0)
+    soft_c_major = sum(np.sin(2 * np.pi * f * t) for f in (261.6, 329.6, 392.0)) / 3
+    loud_f_sharp = sum(np.sign(np.sin(2 * np.pi * f * t)) for f in (185.0, 233.1, 277.2)) / 3
+    y = np.concatenate([0.2 * soft_c_major, 0.5 * loud_f_sharp]) + 0.01 * rng.standard_normal(2 * half)
+    S, mel_db = spectrograms(y.astype(np.float32))
+
+    beat_frames = np.arange(0, S.shape[1], int(0.5 * SR / HOP))
+    sections = segment_structure(S, mel_db, SR, HOP, beat_frames)
+
+    assert len(beat_frames) > 4 * MIN_SECTION_BEATS
+    assert len(sections) == 2
+    assert sections[0]["group"] != sections[1]["group"]
+    assert abs(sections[1]["startTime"] - 24.0) <= 1.0
+    assert sections[1]["startTime"] + sections[1]["duration"] == pytest.approx(S.shape[1] * HOP / SR, abs=0.02)